@@ -0,0 +1,83 @@
+"""
+Замер накладных расходов БД на один callback.
+
+"before" - как раньше: новый engine, пул и проверка схемы на каждое нажатие.
+"after"  - общий engine и пул соединений DatabaseManager.
+
+Запуск:
+    python -m benchmarks.db_overhead --iterations 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from config import Config  # noqa: E402
+from database.manager import DatabaseManager  # noqa: E402
+from bot.models.task import Task  # noqa: E402
+
+
+def _callback_before():
+    engine = create_engine(Config.DB_URL)
+    inspector = inspect(engine)
+    if inspector.has_table('tasks'):
+        inspector.get_columns('tasks')
+    session = sessionmaker(bind=engine)()
+    try:
+        session.query(Task).filter(Task.status == False).first()  # noqa: E712
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _callback_after():
+    with DatabaseManager().session() as db:
+        db.query(Task).filter(Task.status == False).first()  # noqa: E712
+
+
+def _measure(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings),
+        'p50': timings[len(timings) // 2],
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--db-url', default=None, help="По умолчанию временная SQLite БД")
+    args = parser.parse_args()
+
+    if args.db_url:
+        Config.DB_URL = args.db_url
+    else:
+        Config.DB_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    DatabaseManager.setup()
+
+    for name, func in (('before', _callback_before), ('after', _callback_after)):
+        result = _measure(func, args.iterations)
+        print(
+            f"{name:>6}: mean={result['mean']:.3f}ms "
+            f"p50={result['p50']:.3f}ms p95={result['p95']:.3f}ms"
+        )
+
+    DatabaseManager.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Локальная замена VK Teams Bot API для нагрузочных тестов.
+
+Поддерживает методы, которые использует бот: events/get (long polling),
+messages/sendText, messages/answerCallbackQuery, self/get, chats/getInfo.
+События добавляются через push_message / push_callback, отправленные
+ботом сообщения складываются в очередь чата получателя.
+
+Запуск отдельно (для ручной проверки бота):
+    python -m benchmarks.fake_api --port 8081
+"""
+import argparse
+import itertools
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BOT_USER_ID = 'review_bot'
+
+
+class SentMessage:
+    __slots__ = ('chat_id', 'text', 'keyboard', 'sent_at')
+
+    def __init__(self, chat_id, text, keyboard, sent_at):
+        self.chat_id = chat_id
+        self.text = text
+        self.keyboard = keyboard
+        self.sent_at = sent_at
+
+    def callback_data(self):
+        """Все callbackData кнопок сообщения"""
+        return [button.get('callbackData') for row in self.keyboard or [] for button in row]
+
+
+class FakeVkTeamsApi:
+    def __init__(self, host='127.0.0.1', port=0, max_poll_time=1.0, max_events=100):
+        self.max_poll_time = max_poll_time
+        self.max_events = max_events
+
+        self._events = []
+        self._event_ids = itertools.count(1)
+        self._msg_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._inboxes = {}
+        self._inbox_lock = threading.Lock()
+        self._closing = False
+        self.calls = {}
+
+        handler = type('FakeApiRequestHandler', (_RequestHandler,), {'api': self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # События для бота
+
+    def push_message(self, user_id, text):
+        return self._push_event('newMessage', {
+            'msgId': str(next(self._msg_ids)),
+            'text': text,
+            'timestamp': int(time.time()),
+            'chat': {'chatId': user_id, 'type': 'private'},
+            'from': self._user(user_id)
+        })
+
+    def push_callback(self, user_id, callback_data):
+        return self._push_event('callbackQuery', {
+            'queryId': f"SVR:{user_id}:{next(self._msg_ids)}",
+            'callbackData': callback_data,
+            'from': self._user(user_id),
+            'message': {
+                'msgId': str(next(self._msg_ids)),
+                'chat': {'chatId': user_id, 'type': 'private'},
+                'from': {'userId': BOT_USER_ID, 'firstName': 'Review bot'}
+            }
+        })
+
+    def _push_event(self, event_type, payload):
+        with self._cond:
+            event_id = next(self._event_ids)
+            self._events.append({'eventId': event_id, 'type': event_type, 'payload': payload})
+            self._cond.notify_all()
+        return event_id
+
+    @staticmethod
+    def _user(user_id):
+        return {'userId': user_id, 'firstName': user_id.capitalize(), 'lastName': 'Bench'}
+
+    # Сообщения от бота
+
+    def inbox(self, chat_id):
+        with self._inbox_lock:
+            inbox = self._inboxes.get(chat_id)
+            if inbox is None:
+                inbox = self._inboxes[chat_id] = queue.Queue()
+            return inbox
+
+    def drain(self, chat_id):
+        inbox = self.inbox(chat_id)
+        while True:
+            try:
+                inbox.get_nowait()
+            except queue.Empty:
+                return
+
+    def wait_message(self, chat_id, predicate=None, timeout=10.0):
+        """Ждет сообщение в чат, подходящее под predicate; None по таймауту"""
+        inbox = self.inbox(chat_id)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                message = inbox.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if predicate is None or predicate(message):
+                return message
+
+    # Обработка запросов
+
+    def handle(self, method, params):
+        with self._inbox_lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'events/get':
+            return {'ok': True, 'events': self._poll(params)}
+        if method == 'messages/sendText':
+            keyboard = params.get('inlineKeyboardMarkup')
+            message = SentMessage(
+                params.get('chatId'), params.get('text', ''),
+                json.loads(keyboard) if keyboard else None, time.monotonic()
+            )
+            self.inbox(message.chat_id).put(message)
+            return {'ok': True, 'msgId': str(next(self._msg_ids))}
+        if method == 'messages/answerCallbackQuery':
+            return {'ok': True}
+        if method == 'self/get':
+            return {'ok': True, 'userId': BOT_USER_ID, 'nick': BOT_USER_ID, 'firstName': 'Review bot'}
+        if method == 'chats/getInfo':
+            user = self._user(params.get('chatId', ''))
+            return {'ok': True, 'type': 'private', **user}
+        return None
+
+    def _poll(self, params):
+        last_event_id = int(params.get('lastEventId') or 0)
+        poll_time = min(float(params.get('pollTime') or 0), self.max_poll_time)
+        deadline = time.monotonic() + poll_time
+
+        with self._cond:
+            while True:
+                events = [event for event in self._events if event['eventId'] > last_event_id]
+                # Подтвержденные ботом события больше не нужны
+                self._events = events
+                remaining = deadline - time.monotonic()
+                if events or self._closing or remaining <= 0:
+                    return events[:self.max_events]
+                self._cond.wait(remaining)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    api = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        method = url.path.rsplit('/bot/v1/', 1)[-1].strip('/')
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        result = self.api.handle(method, params)
+        if result is None:
+            self._reply(404, {'ok': False, 'description': f"Unknown method {method}"})
+        else:
+            self._reply(200, result)
+
+    do_POST = do_GET
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    api = FakeVkTeamsApi(args.host, args.port, max_poll_time=30).start()
+    print(f"Fake VK Teams API listening on {api.url} (API_URL = {api.url}/bot/v1)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == '__main__':
+    main()
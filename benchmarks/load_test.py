@@ -0,0 +1,272 @@
+"""
+Нагрузочный тест бота на локальной замене VK Teams API.
+
+Бот запускается целиком (polling, диспетчер, outbox) против
+benchmarks.fake_api. N виртуальных пользователей параллельно создают
+задачи и проверяют чужие: открывают список, задачу и одобряют ее или
+отправляют на доработку. Время ответа - от публикации события до
+сообщения бота в чат пользователя.
+
+Отчет: события в секунду, p50/p95/p99 времени ответа по действиям,
+время обработчиков и число запросов к БД на событие. --output сохраняет
+результат в JSON, --baseline сравнивает с сохраненным ранее.
+После остановки бота проверяется, что все соединения возвращены в пул.
+
+Запуск:
+    python -m benchmarks.load_test --users 20 --rounds 5
+    python -m benchmarks.load_test --users 50 --output baseline.json
+    python -m benchmarks.load_test --users 50 --baseline baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from config import Config  # noqa: E402
+from database.manager import DatabaseManager  # noqa: E402
+from bot.core import ReviewBot  # noqa: E402
+from bot.keyboards.callback_data import decode_callback, encode_callback  # noqa: E402
+from bot.utils import metrics  # noqa: E402
+from benchmarks.fake_api import FakeVkTeamsApi  # noqa: E402
+
+REPLY_TIMEOUT = 10
+
+
+def _percentile(sorted_values, quantile):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(quantile * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class VirtualUser:
+    """Сценарий одного пользователя: создать задачу, проверить чужие"""
+
+    def __init__(self, api, user_id, rounds, reviews_per_round, reject_share, rng):
+        self.api = api
+        self.user_id = user_id
+        self.rounds = rounds
+        self.reviews_per_round = reviews_per_round
+        self.reject_share = reject_share
+        self.rng = rng
+        self.timings = {}
+        self.events = 0
+        self.timeouts = 0
+
+    def run(self):
+        for round_no in range(self.rounds):
+            self._create_task(round_no)
+            for _ in range(self.reviews_per_round):
+                self._review_one()
+
+    def _create_task(self, round_no):
+        self._callback('on_review', encode_callback('on_review'))
+        self._message('youtrack_url', f"https://youtrack.example.com/issue/{self.user_id}-{round_no}")
+        self._message('description', f"Нагрузочная задача {self.user_id} #{round_no}, проверить")
+        self._message('confluence_url', f"https://confluence.example.com/{self.user_id}/{round_no}")
+        self._callback('confirm_task', encode_callback('confirm_task'))
+
+    def _review_one(self):
+        reply = self._callback(
+            'do_review', encode_callback('do_review'),
+            predicate=lambda message: 'задач' in message.text
+        )
+        if reply is None:
+            return
+        task_ids = [
+            data.task_id for data in map(decode_callback, reply.callback_data())
+            if data and data.action == 'review_task'
+        ]
+        if not task_ids:
+            return
+
+        task_id = self.rng.choice(task_ids)
+        self._callback('review_task', encode_callback('review_task', task_id))
+        if self.rng.random() < self.reject_share:
+            self._callback('confirm_revision', encode_callback('confirm_revision', task_id))
+        else:
+            self._callback('confirm_approve', encode_callback('confirm_approve', task_id))
+
+    def _callback(self, action, data, predicate=None):
+        return self._roundtrip(action, lambda: self.api.push_callback(self.user_id, data), predicate)
+
+    def _message(self, action, text):
+        return self._roundtrip(action, lambda: self.api.push_message(self.user_id, text))
+
+    def _roundtrip(self, action, push, predicate=None):
+        # Уведомления, пришедшие между действиями, не считаются ответом
+        self.api.drain(self.user_id)
+        started = time.monotonic()
+        push()
+        self.events += 1
+        reply = self.api.wait_message(self.user_id, predicate, timeout=REPLY_TIMEOUT)
+        if reply is None:
+            self.timeouts += 1
+            return None
+        self.timings.setdefault(action, []).append((reply.sent_at - started) * 1000)
+        return reply
+
+
+def _configure(args, api):
+    Config.API_URL = f"{api.url}/bot/v1"
+    Config.GROUP_CHAT_ID = 'bench_group'
+    Config.DB_URL = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    if not args.keep_rate_limits:
+        # Ограничения outbox не должны маскировать время обработки
+        Config.OUTBOX_GLOBAL_RATE = Config.OUTBOX_GLOBAL_BURST = 10 ** 6
+        Config.OUTBOX_CHAT_RATE = Config.OUTBOX_CHAT_BURST = 10 ** 6
+    if args.verbose:
+        logging.getLogger().setLevel(logging.INFO)
+
+
+def _db_statements():
+    return sum(count for count, _, _ in metrics.DB_QUERY_LATENCY.summary().values())
+
+
+def _handler_stats():
+    result = {}
+    for quantile in (0.5, 0.95, 0.99):
+        summary = metrics.EVENT_LATENCY.summary(quantile).get((), (0, 0, 0))
+        result[f"p{int(quantile * 100)}_ms"] = summary[2] * 1000
+    count, total, _ = metrics.EVENT_LATENCY.summary().get((), (0, 0, 0))
+    result['count'] = count
+    result['mean_ms'] = total / count * 1000 if count else 0.0
+    return result
+
+
+def run_load(args):
+    api = FakeVkTeamsApi(max_poll_time=0.5).start()
+    _configure(args, api)
+    DatabaseManager.setup()
+    bot = ReviewBot(token='001.bench:review_bot')
+    bot.bot.start_polling()
+
+    rng = random.Random(args.seed)
+    users = [
+        VirtualUser(
+            api, f"user{index:04d}", args.rounds, args.reviews,
+            args.reject_share, random.Random(rng.random())
+        )
+        for index in range(args.users)
+    ]
+    threads = [threading.Thread(target=user.run, name=user.user_id) for user in users]
+
+    statements_before = _db_statements()
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    statements = _db_statements() - statements_before
+
+    bot.stop()
+    api.stop()
+    leaked_connections = bot.db.pool_stats()['checked_out']
+    DatabaseManager.dispose()
+
+    events = sum(user.events for user in users)
+    timings = {}
+    for user in users:
+        for action, values in user.timings.items():
+            timings.setdefault(action, []).extend(values)
+
+    all_values = sorted(value for values in timings.values() for value in values)
+    result = {
+        'users': args.users,
+        'events': events,
+        'timeouts': sum(user.timeouts for user in users),
+        'elapsed_s': elapsed,
+        'events_per_sec': events / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            action: {
+                'count': len(values),
+                'p50': _percentile(sorted(values), 0.50),
+                'p95': _percentile(sorted(values), 0.95),
+                'p99': _percentile(sorted(values), 0.99),
+            }
+            for action, values in sorted(timings.items())
+        },
+        'handler': _handler_stats(),
+        'db_statements': statements,
+        'db_statements_per_event': statements / events if events else 0.0,
+        'leaked_connections': leaked_connections,
+    }
+    result['latency_ms']['all'] = {
+        'count': len(all_values),
+        'p50': _percentile(all_values, 0.50),
+        'p95': _percentile(all_values, 0.95),
+        'p99': _percentile(all_values, 0.99),
+    }
+    return result
+
+
+def _print_report(result, baseline=None):
+    def delta(path, value):
+        if baseline is None:
+            return ''
+        base = baseline
+        for key in path:
+            base = base.get(key, {}) if isinstance(base, dict) else {}
+        if not isinstance(base, (int, float)) or not base:
+            return ''
+        return f"  ({(value - base) / base * 100:+.1f}% vs baseline)"
+
+    print(f"users: {result['users']}, events: {result['events']}, timeouts: {result['timeouts']}")
+    print(f"elapsed: {result['elapsed_s']:.2f}s, "
+          f"events/sec: {result['events_per_sec']:.1f}{delta(['events_per_sec'], result['events_per_sec'])}")
+    print("\nround-trip latency, ms:")
+    print(f"  {'action':<18}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for action, stats in result['latency_ms'].items():
+        print(f"  {action:<18}{stats['count']:>7}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}"
+              f"{delta(['latency_ms', action, 'p95'], stats['p95'])}")
+
+    handler = result['handler']
+    print(f"\nhandler time (histogram bounds), ms: mean {handler['mean_ms']:.2f}, "
+          f"p50 <= {handler['p50_ms']:g}, p95 <= {handler['p95_ms']:g}, p99 <= {handler['p99_ms']:g}")
+    print(f"db statements: {result['db_statements']}, per event: {result['db_statements_per_event']:.2f}"
+          f"{delta(['db_statements_per_event'], result['db_statements_per_event'])}")
+    print(f"connections still checked out: {result['leaked_connections']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help="Виртуальных пользователей")
+    parser.add_argument('--rounds', type=int, default=3, help="Задач на пользователя")
+    parser.add_argument('--reviews', type=int, default=2, help="Проверок на каждую задачу")
+    parser.add_argument('--reject-share', type=float, default=0.2, help="Доля отправок на доработку")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db-url', default=None, help="По умолчанию временная SQLite БД")
+    parser.add_argument('--keep-rate-limits', action='store_true', help="Не отключать лимиты outbox")
+    parser.add_argument('--output', help="Сохранить результат в JSON")
+    parser.add_argument('--baseline', help="Сравнить с сохраненным результатом")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    result = run_load(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    _print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(result, output_file, indent=2, ensure_ascii=False)
+        print(f"\nresult saved to {args.output}")
+
+    sys.exit(1 if result['timeouts'] or result['leaked_connections'] else 0)
+
+
+if __name__ == '__main__':
+    main()
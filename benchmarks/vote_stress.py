@@ -0,0 +1,109 @@
+"""
+Стресс-проверка TaskService.record_vote: много параллельных одобрений одной задачи.
+
+Проверяет, что ни один голос не потерян, счетчик совпадает с таблицей
+review_votes, задачу завершает ровно один голос, агрегаты статистики
+совпадают с пересчетом, а после обработки все соединения возвращены в пул.
+
+Запуск:
+    python -m benchmarks.vote_stress --reviewers 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from database.manager import DatabaseManager  # noqa: E402
+from bot.models import Task, ReviewVote, VERDICT_APPROVE  # noqa: E402
+from bot.services.tasks import TaskService  # noqa: E402
+from bot.services.stats import StatsService  # noqa: E402
+
+
+def _create_task(service):
+    with service.db.session_scope() as db:
+        task = service.create_task(db, {
+            'user_id': 'author',
+            'creator': 'Author',
+            'description': 'Stress test task',
+            'youtrack_url': 'https://youtrack.example/T-1',
+            'confluence_url': 'https://confluence.example/T-1'
+        })
+        return task.id
+
+
+def _run(service, reviewers, required):
+    Config.REQUIRED_APPROVALS = required
+    task_id = _create_task(service)
+    barrier = threading.Barrier(reviewers)
+
+    def vote(n):
+        barrier.wait()
+        # Как при обработке события: одна сессия и один commit на голос
+        with service.db.event_session() as db:
+            return service.record_vote(db, task_id, f"reviewer-{n}", VERDICT_APPROVE)
+
+    with ThreadPoolExecutor(max_workers=reviewers) as pool:
+        results = list(pool.map(vote, range(reviewers)))
+
+    with service.db.session() as db:
+        task = db.query(Task).filter(Task.id == task_id).one()
+        votes = db.query(ReviewVote).filter(ReviewVote.task_id == task_id).count()
+
+    recorded = sum(1 for r in results if r.recorded)
+    completed = sum(1 for r in results if r.completed)
+    return task, votes, recorded, completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviewers', type=int, default=50)
+    parser.add_argument('--db-url', default=None, help="По умолчанию временная SQLite БД")
+    args = parser.parse_args()
+
+    Config.DB_URL = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+    DatabaseManager.setup()
+    service = TaskService(stats=StatsService())
+    failures = []
+
+    # 1. Лимит недостижим: все голоса должны быть засчитаны
+    task, votes, recorded, completed = _run(service, args.reviewers, args.reviewers + 1)
+    if not (task.approve_count == votes == recorded == args.reviewers) or completed or task.status:
+        failures.append(
+            f"lost votes: approve_count={task.approve_count} votes={votes} "
+            f"recorded={recorded} completed={completed}"
+        )
+
+    # 2. Лимит 2: задачу завершает ровно один голос
+    task, votes, recorded, completed = _run(service, args.reviewers, 2)
+    if completed != 1 or not task.status or task.approve_count != votes:
+        failures.append(
+            f"completion race: completed={completed} status={task.status} "
+            f"approve_count={task.approve_count} votes={votes}"
+        )
+
+    # 3. Инкрементальные агрегаты при параллельных голосах не расходятся с исходными данными
+    with service.db.session() as db:
+        differences = service.stats.rebuild(db, apply=False)
+    if differences:
+        failures.append(f"stats drift: {'; '.join(differences[:5])}")
+
+    checked_out = service.db.pool_stats()['checked_out']
+    if checked_out:
+        failures.append(f"connection leak: {checked_out} connections checked out")
+
+    DatabaseManager.dispose()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: {args.reviewers} parallel approvals, no lost votes, single completion, consistent stats, no leaked connections")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
 from .bot import ReviewBot
+from .dispatcher import EventDispatcher
 
-__all__ = ['ReviewBot']
\ No newline at end of file
+__all__ = ['ReviewBot', 'EventDispatcher']
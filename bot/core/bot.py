@@ -2,9 +2,25 @@ from vkteams.bot import Bot as VkTeamsBot
 from bot.handlers.commands import CommandHandler
 from bot.handlers.messages import MessageHandler
 from bot.handlers.callbacks import CallbackHandler
+from bot.handlers.router import CallbackError
+from bot.keyboards.builder import KeyboardBuilder
 from bot.services.tasks import TaskService
 from bot.services.notifications import NotificationService
+from bot.services.outbox import MessageOutbox
+from bot.services.users import UserDirectory
+from bot.services.scheduler import Scheduler
+from bot.services.reviewable import ReviewableCache
+from bot.services.idempotency import CallbackDeduplicator
+from bot.services.audit import AuditLog
+from bot.services.archive import TaskArchive
+from bot.services.stats import StatsService
+from bot.services.assignment import ReviewerAssigner
+from bot.services.sla import SlaMonitor
 from bot.states.user import UserStateManager
+from bot.states.backends import create_state_backend
+from bot.core.dispatcher import EventDispatcher
+from bot.utils.metrics import REGISTRY, summary_line
+from database.manager import DatabaseManager
 from config import Config
 import logging
 
@@ -17,11 +33,31 @@ class ReviewBot:
             token=token,
             api_url_base=Config.API_URL
         )
-        self.state_manager = UserStateManager()
-        self.task_service = TaskService()
+        self.db = DatabaseManager()
+        self.outbox = MessageOutbox(self.bot)
+        self.user_directory = UserDirectory(self.bot)
+        self.state_manager = UserStateManager(create_state_backend(self.db))
+        self.reviewable_cache = ReviewableCache(self.db) if Config.REVIEW_CACHE_ENABLED else None
+        self.audit = AuditLog(self.db)
+        self.stats = StatsService()
+        self.assigner = ReviewerAssigner(self.db) if Config.ASSIGNMENT_ENABLED else None
+        self.task_service = TaskService(self.db, self.reviewable_cache, self.audit, self.stats, self.assigner)
+        self.archive = TaskArchive(self.db)
+        self.sla_monitor = SlaMonitor(self.db, self.outbox, self.audit)
         self.notification_service = NotificationService(self)
+        self.dispatcher = EventDispatcher()
+        self.callback_dedup = CallbackDeduplicator()
+        self.scheduler = Scheduler(self.db)
 
         self._setup_handlers()
+        self._setup_jobs()
+        self._setup_metrics()
+        self.outbox.start()
+        self.audit.start()
+        self.dispatcher.start()
+        self.scheduler.start()
+        if self.reviewable_cache:
+            self.reviewable_cache.start()
         logger.info("Bot initialized")
 
     def _setup_handlers(self):
@@ -29,14 +65,106 @@ class ReviewBot:
         message_handler = MessageHandler(self)
         callback_handler = CallbackHandler(self)
 
+        # Обработчики выполняются в пуле потоков диспетчера,
+        # поток polling только раскладывает события по очередям
         @self.bot.command_handler(command="start")
         def handle_start(bot, event):
-            command_handler.handle_start(event)
+            self._dispatch(event, command_handler.handle_start)
+
+        @self.bot.command_handler(command="stats")
+        def handle_stats(bot, event):
+            self._dispatch(event, command_handler.handle_stats)
+
+        @self.bot.command_handler(command="history")
+        def handle_history(bot, event):
+            self._dispatch(event, command_handler.handle_history)
 
         @self.bot.message_handler()
         def handle_message(bot, event):
-            message_handler.handle(event)
+            self._dispatch(event, message_handler.handle)
 
         @self.bot.button_handler()
         def handle_button(bot, event):
-            callback_handler.handle(event)
\ No newline at end of file
+            self._dispatch(event, callback_handler.handle)
+
+    def _setup_jobs(self):
+        self.scheduler.register('state_sweep', lambda payload: self.state_manager.sweep())
+        self.scheduler.schedule_every('state_sweep', Config.STATE_SWEEP_INTERVAL, key='state_sweep')
+
+        self.scheduler.register('archive_tasks', lambda payload: self.archive.run())
+        self.scheduler.schedule_every('archive_tasks', Config.ARCHIVE_INTERVAL, key='archive_tasks')
+
+        if Config.SLA_ENABLED:
+            self.scheduler.register('sla_check', lambda payload: self.sla_monitor.run())
+            self.scheduler.schedule_every('sla_check', Config.SLA_CHECK_INTERVAL, key='sla_check')
+        else:
+            self.scheduler.cancel_key('sla_check')
+
+        # Ленту изменений кеша чистит одна реплика - задание общее для всех
+        if self.reviewable_cache and self.reviewable_cache.change_feed:
+            self.scheduler.register('review_cache_prune', lambda payload: self.reviewable_cache.prune_feed())
+            self.scheduler.schedule_every(
+                'review_cache_prune', Config.REVIEW_CACHE_FEED_RETENTION, key='review_cache_prune'
+            )
+        else:
+            self.scheduler.cancel_key('review_cache_prune')
+
+    def _setup_metrics(self):
+        REGISTRY.register_source('dispatcher', self.dispatcher.stats)
+        REGISTRY.register_source('outbox', self.outbox.stats)
+        REGISTRY.register_source('user_directory', self.user_directory.stats)
+        REGISTRY.register_source('states', self.state_manager.stats)
+        REGISTRY.register_source('scheduler', self.scheduler.stats)
+        REGISTRY.register_source('db_pool', self.db.pool_stats)
+        REGISTRY.register_source('callback_dedup', self.callback_dedup.stats)
+        REGISTRY.register_source('audit', self.audit.stats)
+        if self.reviewable_cache:
+            REGISTRY.register_source('reviewable_cache', self.reviewable_cache.stats)
+        if self.assigner:
+            REGISTRY.register_source('assignment', self.assigner.stats)
+
+        if Config.METRICS_LOG_INTERVAL:
+            self.scheduler.register('metrics_summary', lambda payload: logger.info("Metrics: %s", summary_line()))
+            self.scheduler.schedule_every('metrics_summary', Config.METRICS_LOG_INTERVAL, key='metrics_summary')
+        else:
+            self.scheduler.cancel_key('metrics_summary')
+
+    def _dispatch(self, event, handler):
+        user = event.data.get('from') or {}
+        # Имя автора события прогревает справочник пользователей
+        self.user_directory.remember(user)
+        # userId автора события - ключ упорядочивания в диспетчере
+        key = user.get('userId') or getattr(event, 'from_chat', None)
+        self.dispatcher.submit(key, self._handle_event, handler, event)
+
+    def _handle_event(self, handler, event):
+        """
+        Обертка каждого события: одна сессия БД на событие с одним
+        commit в конце; ответы уходят в outbox только после commit.
+        При ошибке транзакция и ответы из нее отбрасываются, а
+        пользователь получает только сообщение об ошибке.
+        """
+        try:
+            with self.outbox.deferred(), self.db.event_session():
+                handler(event)
+        except CallbackError as e:
+            self._reply_error(event, str(e), inline_keyboard_markup=KeyboardBuilder().get_main_keyboard())
+        except Exception as e:
+            logger.error("Event transaction failed: %s", e, exc_info=True)
+            self._reply_error(event, "❌ Произошла ошибка при обработке запроса")
+
+    def _reply_error(self, event, text, **kwargs):
+        chat = event.data.get('chat') or (event.data.get('message') or {}).get('chat') or {}
+        if chat.get('chatId'):
+            self.outbox.reply(chat_id=chat['chatId'], text=text, **kwargs)
+
+    def stop(self):
+        """Останавливает polling и дожидается обработки принятых событий и отправки сообщений"""
+        self.bot.stop()
+        self.scheduler.stop()
+        self.dispatcher.stop()
+        if self.reviewable_cache:
+            self.reviewable_cache.stop()
+        self.outbox.stop()
+        self.audit.stop()
+        self.user_directory.close()
\ No newline at end of file
@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+
+from bot.utils.metrics import track_event
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_IDLE_CHECK_INTERVAL = 0.5  # Как часто простаивающий поток проверяет флаг остановки, секунд
+
+
+class EventDispatcher:
+    """
+    Выполняет обработчики событий в пуле потоков.
+
+    События одного пользователя всегда попадают в одну и ту же очередь
+    (по хешу userId) и обрабатываются строго по порядку - на этом
+    держится пошаговый сценарий UserStateManager. События разных
+    пользователей обрабатываются параллельно.
+
+    Очереди ограничены: при переполнении поток polling ждет
+    put_timeout секунд (backpressure), после чего событие отбрасывается.
+    """
+
+    def __init__(self, workers=None, queue_size=None, put_timeout=None):
+        self.workers = workers or Config.DISPATCHER_WORKERS
+        self.queue_size = queue_size or Config.DISPATCHER_QUEUE_SIZE
+        self.put_timeout = Config.DISPATCHER_PUT_TIMEOUT if put_timeout is None else put_timeout
+
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._threads = []
+        self._accepting = False
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # Проверка _accepting и постановка в очередь атомарны относительно stop():
+        # принятое событие оказывается в очереди раньше маркера остановки
+        self._submit_lock = threading.Lock()
+        self._counters = {'submitted': 0, 'processed': 0, 'failed': 0, 'rejected': 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index, worker_queue in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(worker_queue,),
+                    name=f"event-worker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            with self._submit_lock:
+                self._accepting = True
+        logger.info("Event dispatcher started with %s workers", self.workers)
+
+    def submit(self, key, handler, *args):
+        """
+        Ставит обработчик в очередь, закрепленную за key (userId).
+        Возвращает False, если событие отброшено.
+        """
+        with self._submit_lock:
+            if not self._accepting:
+                logger.warning("Dispatcher is stopped, event for %s dropped", key)
+                return False
+
+            worker_queue = self._queues[self._shard(key)]
+            try:
+                worker_queue.put((handler, args), timeout=self.put_timeout)
+                accepted = True
+            except queue.Full:
+                accepted = False
+
+        # Счетчики - под self._lock, уже после освобождения _submit_lock
+        if not accepted:
+            self._count('rejected')
+            logger.warning("Event queue is full, event for %s dropped", key)
+            return False
+
+        self._count('submitted')
+        return True
+
+    def stop(self, timeout=None):
+        """Прекращает прием событий и дожидается обработки уже принятых"""
+        timeout = Config.DISPATCHER_DRAIN_TIMEOUT if timeout is None else timeout
+        # Ждет submit(), уже ставящего событие в очередь
+        with self._submit_lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            self._stopping.set()
+
+        # Маркер только ускоряет выход; в полную очередь он не ставится -
+        # поток дообработает очередь и увидит флаг остановки, когда она опустеет
+        for worker_queue in self._queues:
+            try:
+                worker_queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+        pending = self.queue_depth()
+        if pending:
+            logger.warning("Dispatcher stopped with %s unprocessed events", pending)
+        else:
+            logger.info("Event dispatcher drained")
+
+    def queue_depth(self):
+        return sum(worker_queue.qsize() for worker_queue in self._queues)
+
+    def stats(self):
+        """Метрики очередей и счетчики событий"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self.queue_depth()
+        stats['max_queue_depth'] = max(worker_queue.qsize() for worker_queue in self._queues)
+        return stats
+
+    def _shard(self, key):
+        return zlib.crc32(str(key).encode('utf-8')) % self.workers
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _worker(self, worker_queue):
+        while True:
+            try:
+                item = worker_queue.get(timeout=_IDLE_CHECK_INTERVAL)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is _STOP:
+                break
+
+            handler, args = item
+            try:
+                with track_event():
+                    handler(*args)
+                self._count('processed')
+            except Exception as e:
+                self._count('failed')
+                logger.error("Unhandled error in event handler: %s", e, exc_info=True)
@@ -1,23 +1,90 @@
 import logging
 from bot.keyboards.builder import KeyboardBuilder
+from bot.models.audit import (
+    AUDIT_TASK_CREATED, AUDIT_VOTE, AUDIT_TASK_COMPLETED, AUDIT_TASK_REMOVED, AUDIT_TASK_AUTO_REMOVED
+)
+from bot.models.vote import VERDICT_APPROVE
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Действия в истории задачи; уведомления из журнала не показываются
+HISTORY_ACTIONS = (
+    AUDIT_TASK_CREATED, AUDIT_VOTE, AUDIT_TASK_COMPLETED, AUDIT_TASK_REMOVED, AUDIT_TASK_AUTO_REMOVED
+)
+
 
 class BaseHandler:
     def __init__(self, bot):
         self.bot = bot
         self.state = bot.state_manager
+        self.db = bot.db
         self.tasks = bot.task_service
         self.notifier = bot.notification_service
+        self.outbox = bot.outbox
+        self.users = bot.user_directory
+        self.audit = bot.audit
+        self.assigner = bot.assigner
+        self.archive = bot.archive
         self.keyboards = KeyboardBuilder()
 
     def _get_user_name(self, event):
         try:
-            user_data = event.data['from'] if event.type == 'callbackQuery' else event.message_author
-            first_name = user_data.get('firstName', '')
-            last_name = user_data.get('lastName', '')
-            return f"{first_name} {last_name}".strip() or user_data.get('userId', 'Unknown')
+            user_data = event.data.get('from') or {}
+            return self.users.format_name(user_data) or user_data.get('userId', 'Unknown')
         except Exception as e:
-            logger.error(f"Error getting user name: {str(e)}")
-            return 'Unknown'
\ No newline at end of file
+            logger.error("Error getting user name: %s", e)
+            return 'Unknown'
+
+    def _notify_task(self, task_id, kind, chat_id, text, **kwargs):
+        """Уведомление по задаче с записью в журнал действий"""
+        self.outbox.notify(chat_id=chat_id, text=text, **kwargs)
+        self.audit.notification(task_id, kind, chat_id)
+
+    def _join_user_names(self, user_ids):
+        """Имена пользователей через запятую (одним пакетным запросом)"""
+        names = self.users.resolve_many(user_ids)
+        return ", ".join(names[user_id] for user_id in user_ids)
+
+    def _send_task_history(self, chat_id, task_id, cursor=None):
+        """Страница истории задачи из журнала действий (переживает архивацию задачи)"""
+        with self.db.session_scope() as db:
+            page = self.audit.history(db, task_id, cursor, actions=HISTORY_ACTIONS)
+            events = [(row.created_at, row.action, row.actor_id, row.details or {}) for row in page.items]
+
+        if not events:
+            self.outbox.reply(
+                chat_id=chat_id,
+                text=f"История задачи #{task_id} пуста",
+                inline_keyboard_markup=self.keyboards.get_main_keyboard()
+            )
+            return
+
+        names = self.users.resolve_many([actor_id for _, _, actor_id, _ in events if actor_id])
+        lines = [f"📜 История задачи #{task_id}\n"]
+        for created_at, action, actor_id, details in events:
+            actor = names.get(actor_id, actor_id)
+            lines.append(f"{created_at.strftime('%d.%m.%Y %H:%M')} {self._describe_history(action, actor, details)}")
+
+        self.outbox.reply(
+            chat_id=chat_id,
+            text="\n".join(lines),
+            inline_keyboard_markup=self.keyboards.get_task_history_keyboard(task_id, page.next_cursor)
+        )
+
+    @staticmethod
+    def _describe_history(action, actor, details):
+        if action == AUDIT_TASK_CREATED:
+            return f"🚀 {actor}: задача создана"
+        if action == AUDIT_VOTE:
+            verdict = "одобрение" if details.get('verdict') == VERDICT_APPROVE else "на доработку"
+            return (f"🗳 {actor}: {verdict} "
+                    f"(✅ {details.get('approve_count', 0)}/{Config.REQUIRED_APPROVALS}, "
+                    f"❌ {details.get('reject_count', 0)}/{Config.MAX_REJECTIONS})")
+        if action == AUDIT_TASK_COMPLETED:
+            return "🎉 задача завершена"
+        if action == AUDIT_TASK_REMOVED:
+            return f"🗑 {actor}: задача снята с ревью"
+        if action == AUDIT_TASK_AUTO_REMOVED:
+            return "🚨 задача снята по лимиту отклонений"
+        return action
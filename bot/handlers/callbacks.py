@@ -1,12 +1,14 @@
 from .base import BaseHandler
+from .router import CallbackRouter, CallbackError
 from vkteams.types import InlineKeyboardMarkup, KeyboardButton
-from database.manager import DatabaseManager
 from config import Config
 import logging
 import json
 from datetime import datetime
 
-from ..models.task import Task
+from ..models.archive import ArchivedTask
+from ..models.vote import VERDICT_APPROVE, VERDICT_REJECT
+from ..keyboards.callback_data import decode_callback, encode_callback
 
 logger = logging.getLogger(__name__)
 
@@ -17,25 +19,36 @@ class CallbackHandler(BaseHandler):
     Реализует всю бизнес-логику взаимодействия с кнопками
     """
 
-    def _get_user_name_by_id(self, user_id):
-        """Получает имя пользователя по ID (кеширует запросы)"""
-        if not hasattr(self, '_user_cache'):
-            self._user_cache = {}
-
-        if user_id not in self._user_cache:
-            try:
-                user_info = self.bot.bot.get_user_info(user_id)
-                name = f"{user_info.get('firstName', '')} {user_info.get('lastName', '')}".strip()
-                self._user_cache[user_id] = name or user_id
-            except Exception:
-                self._user_cache[user_id] = user_id
-
-        return self._user_cache[user_id]
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.api = bot.bot
+        self.dedup = bot.callback_dedup
+        self.router = CallbackRouter()
+        routes = {
+            'on_review': self._start_new_review_process,
+            'my_tasks': self._show_my_tasks,
+            'confirm_task': self._confirm_task,
+            'cancel_task': self._cancel_task,
+            'remove_review': self._start_remove_process,
+            'do_review': self._start_review_process,
+            'review_task': self._show_task_for_review,
+            'approve_task': self._approve_task,
+            'request_revision': self._request_revision,
+            'confirm_approve': self._confirm_approve,
+            'confirm_revision': self._confirm_revision,
+            'select_task': self._show_task_for_removal,
+            'confirm_remove': self._confirm_removal,
+            'cancel_remove': self._cancel_removal,
+            'cancel_action': self._cancel_action,
+            'task_history': self._show_task_history,
+        }
+        for action, handler in routes.items():
+            self.router.register(action, handler)
 
     def handle(self, event):
         """
         Главный обработчик callback-событий от inline-кнопок
-        Обрабатывает все типы нажатий на кнопки и делегирует выполнение соответствующим методам
+        Разбирает callbackData один раз и передает CallbackData обработчику маршрута
 
         Args:
             event: Объект события от VK Teams Bot API
@@ -46,64 +59,64 @@ class CallbackHandler(BaseHandler):
                 return
 
             callback_data = event.data['callbackData']
-            logger.debug(f"Обработка callback: {callback_data}")
-
-            # Основной роутер callback-событий
-            if callback_data == "on_review":
-                self._start_new_review_process(event)
-            elif callback_data == "my_tasks":
-                self._show_my_tasks(event)
-            elif callback_data == "confirm_task":
-                self._confirm_task(event)
-            elif callback_data == "cancel_task":
-                self._cancel_task(event)
-            elif callback_data == "remove_review":
-                self._start_remove_process(event)
-            elif callback_data == "do_review":
-                self._start_review_process(event)
-            elif callback_data.startswith("review_task_"):
-                self._show_task_for_review(event)
-            elif callback_data.startswith("approve_task_"):
-                self._approve_task(event)
-            elif callback_data.startswith("request_revision_"):
-                self._request_revision(event)
-            elif callback_data.startswith("confirm_approve_"):
-                self._confirm_approve(event)
-            elif callback_data.startswith("confirm_revision_"):
-                self._confirm_revision(event)
-            elif callback_data.startswith("select_task_"):
-                self._show_task_for_removal(event)
-            elif callback_data.startswith("confirm_remove_"):
-                self._confirm_removal(event)
-            elif callback_data == "cancel_remove":
-                self._cancel_removal(event)
-            elif callback_data == "cancel_action":
-                self._cancel_action(event)
-            else:
-                logger.warning(f"Неизвестный callback: {callback_data}")
+            logger.debug("Обработка callback: %s", callback_data)
+
+            data = decode_callback(callback_data)
+            if data is None or not self.router.has_route(data.action):
+                logger.warning("Неизвестный callback: %s", callback_data)
                 self._handle_unknown_callback(event)
+                return
+
+            query_id = event.data.get('queryId')
+            user_id = event.data['from']['userId']
+            message = event.data['message']
+            result = self.dedup.lookup(query_id, user_id, data, message.get('msgId'))
+            if result is not None:
+                logger.info("Повторный callback %s от %s, ответ из кеша", callback_data, user_id)
+                self._answer_duplicate(query_id, result)
+                return
 
+            # CallbackError уходит в ReviewBot._handle_event: транзакция события
+            # откатывается, а ошибка не запоминается - повторное нажатие
+            # выполнит действие заново
+            self.router.dispatch(event, data)
+
+            # Результат запоминается только если транзакция события зафиксирована
+            replies = self.outbox.deferred_replies(message['chat']['chatId'])
+            result = replies[0] if replies else ''
+            with self.db.session_scope() as db:
+                self.db.after_commit(
+                    db, lambda: self.dedup.remember(query_id, user_id, data, result, message.get('msgId'))
+                )
+
+        except CallbackError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка обработки callback: %s", e, exc_info=True)
+            raise CallbackError("❌ Произошла ошибка при обработке запроса") from e
+
+    def _answer_duplicate(self, query_id, result):
+        """Отвечает на повторное нажатие всплывающим текстом без нового сообщения"""
+        if not query_id:
+            return
+        text = result or "Запрос уже обработан"
+        try:
+            self.api.answer_callback_query(
+                query_id=query_id,
+                text=text[:Config.CALLBACK_ANSWER_LENGTH]
+            )
         except Exception as e:
-            logger.error(f"Ошибка обработки callback: {str(e)}", exc_info=True)
-            self._send_error_message(event)
+            logger.warning("Не удалось ответить на callback %s: %s", query_id, e)
 
     def _handle_unknown_callback(self, event):
         """Обработка неизвестных callback-событий"""
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.data['message']['chat']['chatId'],
             text="⚠️ Неизвестная команда",
             inline_keyboard_markup=self.keyboards.get_main_keyboard()
         )
 
-    def _send_error_message(self, event):
-        """Отправка сообщения об ошибке"""
-        self.bot.bot.send_text(
-            chat_id=event.data['message']['chat']['chatId'],
-            text="❌ Произошла ошибка при обработке запроса",
-            inline_keyboard_markup=self.keyboards.get_main_keyboard()
-        )
-
-    def _start_new_review_process(self, event):
+    def _start_new_review_process(self, event, data):
         """
         Начинает процесс добавления новой задачи на ревью
         Устанавливает начальное состояние пользователя
@@ -112,7 +125,7 @@ class CallbackHandler(BaseHandler):
             user_id = event.data['from']['userId']
             chat_id = event.data['message']['chat']['chatId']
 
-            logger.info(f"Starting new review process for user {user_id}")
+            logger.info("Starting new review process for user %s", user_id)
 
             self.state.set_state(
                 user_id=user_id,
@@ -123,16 +136,16 @@ class CallbackHandler(BaseHandler):
                 }
             )
 
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=chat_id,
                 text="Введите ссылку на задачу в YouTrack:"
             )
 
         except Exception as e:
-            logger.error(f"Error starting review process: {str(e)}", exc_info=True)
+            logger.error("Error starting review process: %s", e, exc_info=True)
             raise
 
-    def _confirm_task(self, event):
+    def _confirm_task(self, event, data):
         """Подтверждает и сохраняет новую задачу"""
         try:
             user_id = event.data['from']['userId']
@@ -155,15 +168,19 @@ class CallbackHandler(BaseHandler):
                 'rejected_by': []
             }
 
-            with DatabaseManager().session() as db:
+            with self.db.session_scope() as db:
                 task = self.tasks.create_task(db, task_data)
-                db.commit()
 
                 # Отправляем уведомления
                 self._notify_task_creation(task, event.data['message']['chat']['chatId'])
+                if self.assigner:
+                    self._notify_assignees(
+                        task.id, task.creator, task.description, task.youtrack_url,
+                        self.assigner.assign(db, task.id, user_id)
+                    )
 
                 # Отправляем подтверждение
-                self.bot.bot.send_text(
+                self.outbox.reply(
                     chat_id=state['data']['chat_id'],
                     text=f"✅ Задача #{task.id} успешно создана!",
                     inline_keyboard_markup=self.keyboards.get_main_keyboard()
@@ -173,8 +190,8 @@ class CallbackHandler(BaseHandler):
                 self.state.clear_state(user_id)
 
         except Exception as e:
-            logger.error(f"Ошибка создания задачи: {str(e)}", exc_info=True)
-            self._send_error(event, "Ошибка при сохранении задачи")
+            logger.error("Ошибка создания задачи: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при сохранении задачи") from e
 
     def _notify_task_creation(self, task, chat_id):
         """Отправляет уведомления о новой задаче"""
@@ -188,27 +205,29 @@ class CallbackHandler(BaseHandler):
                 f"Confluence: {task.confluence_url}"
             )
 
-            self.bot.bot.send_text(
-                chat_id=Config.GROUP_CHAT_ID,
-                text=group_message
-            )
+            self._notify_task(task.id, 'task_created_group', Config.GROUP_CHAT_ID, group_message)
 
             # Уведомление создателю
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=chat_id,
                 text=f"Ваша задача отправлена на ревью (ID: {task.id})"
             )
 
         except Exception as e:
-            logger.error(f"Ошибка отправки уведомления: {str(e)}")
-
-    def _send_error(self, event, message):
-        """Отправляет сообщение об ошибке"""
-        self.bot.bot.send_text(
-            chat_id=event.data['message']['chat']['chatId'],
-            text=f"❌ {message}",
-            inline_keyboard_markup=self.keyboards.get_main_keyboard()
-        )
+            logger.error("Ошибка отправки уведомления: %s", e)
+
+    def _notify_assignees(self, task_id, creator, description, youtrack_url, reviewer_ids):
+        """Личное сообщение назначенным ревьюерам с кнопками голосования"""
+        for reviewer_id in reviewer_ids:
+            self._notify_task(
+                task_id, 'assigned_reviewer', reviewer_id,
+                "📌 Вам назначено ревью задачи\n\n"
+                f"ID: #{task_id}\n"
+                f"Автор: {creator}\n"
+                f"Описание: {description}\n"
+                f"YouTrack: {youtrack_url}",
+                inline_keyboard_markup=self.keyboards.get_task_keyboard(task_id)
+            )
 
     def _format_user_name(self, user_info):
         """Форматирует имя пользователя из данных события"""
@@ -223,451 +242,407 @@ class CallbackHandler(BaseHandler):
             return last_name
         return user_info.get('userId', 'Unknown')
 
-    def _show_task_for_review(self, event):
-        """Отображает полную информацию о задаче для ревью"""
-        try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
-            chat_id = event.data['message']['chat']['chatId']
-            user_id = event.data['from']['userId']
-
-            with DatabaseManager().session() as db:
-                task = db.query(Task).filter(Task.id == task_id).first()
-
-                if not task:
-                    raise ValueError(f"Task {task_id} not found")
-
-                # Проверка, что пользователь не ревьюит свою задачу
-                if task.user_id == user_id:
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="⚠️ Вы не можете ревьюить свои задачи!",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
-
-                # Формирование сообщения с информацией о задаче
-                approved_by = ", ".join(task.approved_by) if task.approved_by else "пока нет"
-                rejected_by = ", ".join(task.rejected_by) if task.rejected_by else "пока нет"
-
-                response = (
-                    "📝 Задача на ревью\n\n"
-                    f"ID: #{task.id}\n"
-                    f"Автор: {task.creator}\n"
-                    f"Дата создания: {task.created_at.strftime('%d.%m.%Y')}\n\n"
-                    f"Описание:\n{task.description}\n\n"
-                    f"Ссылки:\n"
-                    f"YouTrack: {task.youtrack_url}\n"
-                    f"Confluence: {task.confluence_url}\n\n"
-                    f"Одобрений: {task.approve_count}\n"
-                    f"Одобрили: {approved_by}\n\n"
-                    f"Отклонений: {task.reject_count}\n"
-                    f"Отклонили: {rejected_by}"
-                )
-
-                # Отправка сообщения с кнопками действий
-                self.bot.bot.send_text(
-                    chat_id=chat_id,
-                    text=response,
-                    inline_keyboard_markup=self.keyboards.get_task_keyboard(task.id)
-                )
-
-        except Exception as e:
-            logger.error(f"Error showing task: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при загрузке задачи"
-            )
-
-    def _approve_task(self, event):
+    def _approve_task(self, event, data):
         """
         Инициирует процесс одобрения задачи
         Запрашивает подтверждение перед одобрением
         """
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             chat_id = event.data['message']['chat']['chatId']
 
-            logger.info(f"Approval requested for task {task_id}")
+            logger.info("Approval requested for task %s", task_id)
 
             # Создаем клавиатуру для подтверждения
             keyboard = InlineKeyboardMarkup()
             keyboard.row(
                 KeyboardButton(
                     text="✅ Подтвердить одобрение",
-                    callbackData=f"confirm_approve_{task_id}",
+                    callbackData=encode_callback('confirm_approve', task_id),
                     style="primary"
                 ),
                 KeyboardButton(
                     text="❌ Отмена",
-                    callbackData="cancel_action",
+                    callbackData=encode_callback('cancel_action'),
                     style="attention"
                 )
             )
 
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=chat_id,
                 text="Вы уверены, что хотите одобрить эту задачу?",
                 inline_keyboard_markup=keyboard
             )
 
         except Exception as e:
-            logger.error(f"Error initiating approval: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при обработке запроса"
-            )
+            logger.error("Error initiating approval: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при обработке запроса") from e
 
-    def _confirm_approve(self, event):
+    def _confirm_approve(self, event, data):
         """Подтверждает одобрение задачи и проверяет достижение лимита"""
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             user_id = event.data['from']['userId']
             chat_id = event.data['message']['chat']['chatId']
-            reviewer_name = self._get_user_name(event)
-
-            with DatabaseManager().session() as db:
-                task = db.query(Task).filter(Task.id == task_id).first()
-
-                if not task:
-                    raise ValueError(f"Task {task_id} not found")
 
-                # Проверяем, не одобрял ли уже пользователь
-                approved_by = task.approved_by if task.approved_by else []
-                if user_id in approved_by:
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="ℹ️ Вы уже одобряли эту задачу",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
+            with self.db.session_scope() as db:
+                result = self.tasks.record_vote(db, task_id, user_id, VERDICT_APPROVE)
 
-                # Добавляем одобрение
-                approved_by.append(user_id)
-                task.approved_by = approved_by
-                task.approve_count = len(approved_by)
-
-                # Проверяем достижение лимита одобрений
-                if task.approve_count >= Config.REQUIRED_APPROVALS:
-                    task.status = True
-                    task.completed_at = datetime.now()
-
-                    # Уведомление в групповой чат
-                    approvers = ", ".join([self._get_user_name_by_id(u) for u in approved_by])
-                    group_message = (
-                        "🎉 Задача успешно завершена!\n\n"
-                        f"ID: #{task.id}\n"
-                        f"Автор: {task.creator}\n"
-                        f"Описание: {task.description}\n\n"
-                        f"Одобрений: {task.approve_count}/{Config.REQUIRED_APPROVALS}\n"
-                        f"Одобрили: {approvers}"
-                    )
+            if result.duplicate:
+                self.outbox.reply(
+                    chat_id=chat_id,
+                    text="ℹ️ Вы уже голосовали за эту задачу",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
 
-                    self.bot.bot.send_text(
-                        chat_id=Config.GROUP_CHAT_ID,
-                        text=group_message
-                    )
+            if result.closed:
+                self.outbox.reply(
+                    chat_id=chat_id,
+                    text=f"ℹ️ Задача #{task_id} уже закрыта",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
 
-                    # Уведомление автору
-                    self.bot.bot.send_text(
-                        chat_id=task.user_id,
-                        text=f"✅ Ваша задача #{task.id} успешно прошла ревью!"
-                    )
+            # Лимит одобрений достигнут этим голосом
+            if result.completed:
+                # Уведомление в групповой чат
+                approvers = self._join_user_names(result.approvers)
+                group_message = (
+                    "🎉 Задача успешно завершена!\n\n"
+                    f"ID: #{task_id}\n"
+                    f"Автор: {result.creator}\n"
+                    f"Описание: {result.description}\n\n"
+                    f"Одобрений: {result.approve_count}/{Config.REQUIRED_APPROVALS}\n"
+                    f"Одобрили: {approvers}"
+                )
 
-                db.commit()
+                self._notify_task(task_id, 'task_completed_group', Config.GROUP_CHAT_ID, group_message)
 
-                # Ответ ревьюеру
-                self.bot.bot.send_text(
-                    chat_id=chat_id,
-                    text=f"✅ Вы одобрили задачу #{task_id}\n"
-                         f"Текущий статус: {task.approve_count}/{Config.REQUIRED_APPROVALS}",
-                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                # Уведомление автору
+                self._notify_task(
+                    task_id, 'task_completed_author', result.author_id,
+                    f"✅ Ваша задача #{task_id} успешно прошла ревью!"
                 )
 
-        except Exception as e:
-            logger.error(f"Error confirming approval: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при одобрении задачи"
+            # Ответ ревьюеру
+            self.outbox.reply(
+                chat_id=chat_id,
+                text=f"✅ Вы одобрили задачу #{task_id}\n"
+                     f"Текущий статус: {result.approve_count}/{Config.REQUIRED_APPROVALS}",
+                inline_keyboard_markup=self.keyboards.get_main_keyboard()
             )
 
-    def _request_revision(self, event):
+        except Exception as e:
+            logger.error("Error confirming approval: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при одобрении задачи") from e
+
+    def _request_revision(self, event, data):
         """Отправляет задачу на доработку"""
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             chat_id = event.data['message']['chat']['chatId']
 
-            logger.info(f"Revision requested for task {task_id}")
+            logger.info("Revision requested for task %s", task_id)
 
             # Создаем клавиатуру для подтверждения
             keyboard = InlineKeyboardMarkup()
             keyboard.row(
                 KeyboardButton(
                     text="✅ Подтвердить доработку",
-                    callbackData=f"confirm_revision_{task_id}",
+                    callbackData=encode_callback('confirm_revision', task_id),
                     style="primary"
                 ),
                 KeyboardButton(
                     text="❌ Отмена",
-                    callbackData="cancel_action",
+                    callbackData=encode_callback('cancel_action'),
                     style="attention"
                 )
             )
 
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=chat_id,
                 text="Вы уверены, что хотите отправить задачу на доработку?",
                 inline_keyboard_markup=keyboard
             )
 
         except Exception as e:
-            logger.error(f"Error requesting revision: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при обработке запроса"
-            )
+            logger.error("Error requesting revision: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при обработке запроса") from e
 
-    def _confirm_revision(self, event):
+    def _confirm_revision(self, event, data):
         """Обрабатывает отправку на доработку с проверкой лимита отклонений"""
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             chat_id = event.data['message']['chat']['chatId']
             reviewer_id = event.data['from']['userId']
             reviewer_name = self._get_user_name(event)
 
-            with DatabaseManager().session() as db:
-                task = db.query(Task).filter(Task.id == task_id).first()
+            with self.db.session_scope() as db:
+                result = self.tasks.record_vote(db, task_id, reviewer_id, VERDICT_REJECT)
 
-                if not task:
-                    raise ValueError("Задача не найдена")
+            if result.duplicate:
+                self.outbox.reply(
+                    chat_id=chat_id,
+                    text="ℹ️ Вы уже голосовали за эту задачу",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
 
-                # Добавляем в список отклонивших
-                rejected_by = task.rejected_by if task.rejected_by else []
-                if reviewer_id not in rejected_by:
-                    rejected_by.append(reviewer_id)
-                    task.rejected_by = rejected_by
-                    task.reject_count = len(rejected_by)
-
-                # Проверяем достижение лимита отклонений
-                if task.reject_count >= Config.MAX_REJECTIONS:
-                    # Уведомление автору
-                    rejecters = ", ".join([self._get_user_name_by_id(u) for u in rejected_by])
-                    author_message = (
-                        f"🚨 Ваша задача #{task_id} снята с ревью!\n\n"
-                        f"Причина: достигнут лимит отклонений ({task.reject_count}/{Config.MAX_REJECTIONS})\n"
-                        f"Отклонили: {rejecters}\n\n"
-                        f"Название: {task.description}\n"
-                        f"YouTrack: {task.youtrack_url}"
-                    )
+            if result.closed:
+                self.outbox.reply(
+                    chat_id=chat_id,
+                    text=f"ℹ️ Задача #{task_id} уже закрыта",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
 
-                    self.bot.bot.send_text(
-                        chat_id=task.user_id,
-                        text=author_message
-                    )
+            # Проверяем достижение лимита отклонений (задача уже удалена)
+            if result.removed:
+                # Уведомление автору
+                rejecters = self._join_user_names(result.rejecters)
+                author_message = (
+                    f"🚨 Ваша задача #{task_id} снята с ревью!\n\n"
+                    f"Причина: достигнут лимит отклонений ({result.reject_count}/{Config.MAX_REJECTIONS})\n"
+                    f"Отклонили: {rejecters}\n\n"
+                    f"Название: {result.description}\n"
+                    f"YouTrack: {result.youtrack_url}"
+                )
 
-                    # Уведомление ревьюерам
-                    for user_id in rejected_by:
-                        if user_id != reviewer_id:  # Текущему ревьюеру отправим отдельное сообщение
-                            self.bot.bot.send_text(
-                                chat_id=user_id,
-                                text=f"Задача #{task_id} снята с ревью (достигнут лимит отклонений)"
-                            )
+                self._notify_task(task_id, 'task_auto_removed_author', result.author_id, author_message)
 
-                    # Удаляем задачу
-                    db.delete(task)
-                    db.commit()
+                # Уведомление ревьюерам
+                for user_id in result.rejecters:
+                    if user_id != reviewer_id:  # Текущему ревьюеру отправим отдельное сообщение
+                        self._notify_task(
+                            task_id, 'task_auto_removed_reviewer', user_id,
+                            f"Задача #{task_id} снята с ревью (достигнут лимит отклонений)"
+                        )
 
-                    # Ответ текущему ревьюеру
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="Спасибо за ревью! Задача снята по достижению лимита отклонений.",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
+                # Ответ текущему ревьюеру
+                self.outbox.reply(
+                    chat_id=chat_id,
+                    text="Спасибо за ревью! Задача снята по достижению лимита отклонений.",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
 
-                # Если лимит не достигнут - стандартная процедура
-                db.commit()
+            # Уведомление автору о доработке
+            author_message = (
+                f"🔧 {reviewer_name} отправил задачу на доработку\n\n"
+                f"ID: #{task_id}\n"
+                f"Текущие отклонения: {result.reject_count}/{Config.MAX_REJECTIONS}\n\n"
+                f"Описание: {result.description}\n"
+                f"YouTrack: {result.youtrack_url}"
+            )
 
-                # Уведомление автору о доработке
-                author_message = (
-                    f"🔧 {reviewer_name} отправил задачу на доработку\n\n"
-                    f"ID: #{task.id}\n"
-                    f"Текущие отклонения: {task.reject_count}/{Config.MAX_REJECTIONS}\n\n"
-                    f"Описание: {task.description}\n"
-                    f"YouTrack: {task.youtrack_url}"
-                )
+            self._notify_task(task_id, 'revision_author', result.author_id, author_message)
 
-                self.bot.bot.send_text(
-                    chat_id=task.user_id,
-                    text=author_message
+            # Отклонивший не одобрит задачу - его место занимает другой ревьюер
+            if self.assigner:
+                with self.db.session_scope() as db:
+                    replacements = self.assigner.assign(db, task_id, result.author_id)
+                self._notify_assignees(
+                    task_id, result.creator, result.description, result.youtrack_url, replacements
                 )
 
-                # Ответ ревьюеру
-                self.bot.bot.send_text(
-                    chat_id=chat_id,
-                    text=f"✅ Задача #{task_id} отправлена на доработку\n"
-                         f"Текущие отклонения: {task.reject_count}/{Config.MAX_REJECTIONS}",
-                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                )
+            # Ответ ревьюеру
+            self.outbox.reply(
+                chat_id=chat_id,
+                text=f"✅ Задача #{task_id} отправлена на доработку\n"
+                     f"Текущие отклонения: {result.reject_count}/{Config.MAX_REJECTIONS}",
+                inline_keyboard_markup=self.keyboards.get_main_keyboard()
+            )
 
         except Exception as e:
-            logger.error(f"Error confirming revision: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при отправке на доработку"
-            )
+            logger.error("Error confirming revision: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при отправке на доработку") from e
 
-    def _cancel_task(self, event):
+    def _cancel_task(self, event, data):
         """Отменяет процесс создания задачи"""
         user_id = event.data['from']['userId']
         self.state.clear_state(user_id)
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.data['message']['chat']['chatId'],
             text="❌ Добавление задачи отменено",
             inline_keyboard_markup=self.keyboards.get_main_keyboard()
         )
 
-    def _cancel_action(self, event):
+    def _cancel_action(self, event, data):
         """Отменяет текущее действие"""
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.data['message']['chat']['chatId'],
             text="❌ Действие отменено",
             inline_keyboard_markup=self.keyboards.get_main_keyboard()
         )
 
-    def _show_my_tasks(self, event):
+    def _show_my_tasks(self, event, data):
         try:
             user_id = event.data['from']['userId']
             chat_id = event.data['message']['chat']['chatId']
+            cursor, direction = data.cursor, data.direction
 
-            with DatabaseManager().session() as db:
-                tasks = self.tasks.get_user_tasks(db, user_id)
-
-                if not tasks:
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="У вас нет активных задач на ревью",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
-
-                message = "Ваши задачи на ревью:\n\n"
-                for task in tasks:
-                    message += (
-                        f"ID: {task.id}\n"
-                        f"Описание: {task.description}\n"
-                        f"Статус: {'Завершена' if task.status else 'На ревью'}\n"
-                        f"Одобрений: {task.approve_count}\n\n"
-                    )
+            with self.db.session_scope() as db:
+                page = self.tasks.get_user_tasks_page(db, user_id, cursor, direction)
+                if not page.items and cursor is not None:
+                    page = self.tasks.get_user_tasks_page(db, user_id)
 
-                self.bot.bot.send_text(
+            if not page.items:
+                self.outbox.reply(
                     chat_id=chat_id,
-                    text=message,
+                    text="У вас нет активных задач на ревью",
                     inline_keyboard_markup=self.keyboards.get_main_keyboard()
                 )
+                return
 
-        except Exception as e:
-            logger.error(f"Error showing tasks: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="Ошибка при получении списка задач"
+            lines = ["Ваши задачи на ревью:\n"]
+            for task in page.items:
+                lines.append(
+                    f"ID: {task.id}\n"
+                    f"Описание: {task.title}...\n"
+                    f"Одобрений: {task.approve_count}/{Config.REQUIRED_APPROVALS}\n"
+                    f"Отклонений: {task.reject_count}/{Config.MAX_REJECTIONS}\n"
+                )
+
+            self.outbox.reply(
+                chat_id=chat_id,
+                text="\n".join(lines),
+                inline_keyboard_markup=self.keyboards.get_paged_main_keyboard(page, 'my_tasks')
             )
 
-    def _start_review_process(self, event):
+        except Exception as e:
+            logger.error("Error showing tasks: %s", e, exc_info=True)
+            raise CallbackError("Ошибка при получении списка задач") from e
+
+    def _start_review_process(self, event, data):
         try:
             user_id = event.data['from']['userId']
             chat_id = event.data['message']['chat']['chatId']
+            cursor, direction = data.cursor, data.direction
 
-            with DatabaseManager().session() as db:
-                tasks = self.tasks.get_reviewable_tasks(db, user_id)
-
-                if not tasks:
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="Нет доступных задач для ревью",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
-
-                keyboard = InlineKeyboardMarkup(buttons_in_row=1)
-                for task in tasks:
-                    keyboard.row(
-                        KeyboardButton(
-                            text=f"Задача #{task.id}: {task.description[:30]}...",
-                            callbackData=f"review_task_{task.id}"
-                        )
-                    )
+            with self.db.session_scope() as db:
+                page = self.tasks.get_reviewable_page(db, user_id, cursor, direction)
+                if not page.items and cursor is not None:
+                    page = self.tasks.get_reviewable_page(db, user_id)
 
-                self.bot.bot.send_text(
+            if not page.items:
+                self.outbox.reply(
                     chat_id=chat_id,
-                    text="Выберите задачу для ревью:",
-                    inline_keyboard_markup=keyboard
+                    text="Нет доступных задач для ревью",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
                 )
+                return
 
-        except Exception as e:
-            logger.error(f"Error starting review: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="Ошибка при получении списка задач"
+            self.outbox.reply(
+                chat_id=chat_id,
+                text="Выберите задачу для ревью:",
+                inline_keyboard_markup=self.keyboards.get_task_list_keyboard(
+                    page, 'review_task', 'do_review'
+                )
             )
 
-    def _start_remove_process(self, event):
+        except Exception as e:
+            logger.error("Error starting review: %s", e, exc_info=True)
+            raise CallbackError("Ошибка при получении списка задач") from e
+
+    def _start_remove_process(self, event, data):
         """Начинает процесс снятия задачи с ревью"""
         try:
             user_id = event.data['from']['userId']
             chat_id = event.data['message']['chat']['chatId']
+            cursor, direction = data.cursor, data.direction
 
-            with DatabaseManager().session() as db:
-                tasks = db.query(Task).filter(
-                    Task.user_id == user_id,
-                    Task.status == False
-                ).all()
+            with self.db.session_scope() as db:
+                page = self.tasks.get_user_tasks_page(db, user_id, cursor, direction)
+                if not page.items and cursor is not None:
+                    page = self.tasks.get_user_tasks_page(db, user_id)
 
-                if not tasks:
-                    self.bot.bot.send_text(
-                        chat_id=chat_id,
-                        text="У вас нет активных задач для снятия",
-                        inline_keyboard_markup=self.keyboards.get_main_keyboard()
-                    )
-                    return
-
-                keyboard = InlineKeyboardMarkup(buttons_in_row=1)
-                for task in tasks:
-                    keyboard.row(
-                        KeyboardButton(
-                            text=f"Задача #{task.id}: {task.description[:30]}...",
-                            callbackData=f"select_task_{task.id}"
-                        )
-                    )
-
-                self.bot.bot.send_text(
+            if not page.items:
+                self.outbox.reply(
                     chat_id=chat_id,
-                    text="Выберите задачу для снятия с ревью:",
-                    inline_keyboard_markup=keyboard
+                    text="У вас нет активных задач для снятия",
+                    inline_keyboard_markup=self.keyboards.get_main_keyboard()
+                )
+                return
+
+            self.outbox.reply(
+                chat_id=chat_id,
+                text="Выберите задачу для снятия с ревью:",
+                inline_keyboard_markup=self.keyboards.get_task_list_keyboard(
+                    page, 'select_task', 'remove_review'
                 )
+            )
 
         except Exception as e:
-            logger.error(f"Error starting remove process: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="Ошибка при получении списка задач"
+            logger.error("Error starting remove process: %s", e, exc_info=True)
+            raise CallbackError("Ошибка при получении списка задач") from e
+
+    def _show_task_for_removal(self, event, data):
+        """Показывает задачу автору и запрашивает подтверждение снятия"""
+        try:
+            task_id = data.task_id
+            chat_id = event.data['message']['chat']['chatId']
+            user_id = event.data['from']['userId']
+
+            with self.db.session_scope() as db:
+                task = self.tasks.get_task_for_removal(db, task_id, user_id)
+
+                if not task:
+                    if self._reply_if_closed(db, chat_id, task_id, user_id):
+                        return
+                    raise ValueError("Задача не найдена")
+
+                response = (
+                    "Снять задачу с ревью?\n\n"
+                    f"ID: #{task.id}\n"
+                    f"Описание: {task.description}\n"
+                    f"Одобрений: {task.approve_count}/{Config.REQUIRED_APPROVALS}\n"
+                    f"Отклонений: {task.reject_count}/{Config.MAX_REJECTIONS}"
+                )
+
+            keyboard = InlineKeyboardMarkup()
+            keyboard.row(
+                KeyboardButton(
+                    text="✅ Снять с ревью",
+                    callbackData=encode_callback('confirm_remove', task_id),
+                    style="attention"
+                ),
+                KeyboardButton(
+                    text="❌ Отмена",
+                    callbackData=encode_callback('cancel_remove'),
+                    style="primary"
+                )
             )
 
-    def _show_task_for_review(self, event):
+            self.outbox.reply(
+                chat_id=chat_id,
+                text=response,
+                inline_keyboard_markup=keyboard
+            )
+
+        except Exception as e:
+            logger.error("Error showing task for removal: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при загрузке задачи") from e
+
+    def _show_task_for_review(self, event, data):
         """Отображает полную информацию о задаче для ревью"""
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             chat_id = event.data['message']['chat']['chatId']
             user_id = event.data['from']['userId']
 
-            with DatabaseManager().session() as db:
-                task = db.query(Task).filter(Task.id == task_id).first()
+            with self.db.session_scope() as db:
+                # Кнопка могла остаться в чате после закрытия и архивации задачи
+                task = self.archive.get_task(db, task_id)
 
                 if not task:
                     raise ValueError(f"Task {task_id} not found")
 
+                closed = isinstance(task, ArchivedTask) or task.status
+
                 # Проверка, что пользователь не ревьюит свою задачу
-                if task.user_id == user_id:
-                    self.bot.bot.send_text(
+                if task.user_id == user_id and not closed:
+                    self.outbox.reply(
                         chat_id=chat_id,
                         text="⚠️ Вы не можете ревьюить свои задачи!",
                         inline_keyboard_markup=self.keyboards.get_main_keyboard()
@@ -675,11 +650,12 @@ class CallbackHandler(BaseHandler):
                     return
 
                 # Формирование сообщения с информацией о задаче
-                approved_by = ", ".join(task.approved_by) if task.approved_by else "пока нет"
-                rejected_by = ", ".join(task.rejected_by) if task.rejected_by else "пока нет"
+                approvers, rejecters = self.archive.get_task_voters(db, task.id)
+                approved_by = self._join_user_names(approvers) or "пока нет"
+                rejected_by = self._join_user_names(rejecters) or "пока нет"
 
                 response = (
-                    "📝 Задача на ревью\n\n"
+                    f"{'📁 Задача закрыта' if closed else '📝 Задача на ревью'}\n\n"
                     f"ID: #{task.id}\n"
                     f"Автор: {task.creator}\n"
                     f"Дата создания: {task.created_at.strftime('%d.%m.%Y')}\n\n"
@@ -692,56 +668,77 @@ class CallbackHandler(BaseHandler):
                     f"Отклонений: {task.reject_count}/{Config.MAX_REJECTIONS}\n"
                     f"Отклонили: {rejected_by}"
                 )
+                if closed:
+                    response += f"\n\n{self._closed_status(task)}"
 
-                # Отправка сообщения с кнопками действий
-                self.bot.bot.send_text(
+                # Открытая задача - кнопки голосования, закрытая - история
+                self.outbox.reply(
                     chat_id=chat_id,
                     text=response,
-                    inline_keyboard_markup=self.keyboards.get_task_keyboard(task.id)
+                    inline_keyboard_markup=(
+                        self.keyboards.get_closed_task_keyboard(task.id) if closed
+                        else self.keyboards.get_task_keyboard(task.id)
+                    )
                 )
 
         except Exception as e:
-            logger.error(f"Error showing task: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при загрузке задачи"
-            )
+            logger.error("Error showing task: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при загрузке задачи") from e
+
+    @staticmethod
+    def _closed_status(task):
+        if task.removed_at:
+            return f"Статус: снята с ревью {task.removed_at.strftime('%d.%m.%Y')}"
+        if task.completed_at:
+            return f"Статус: завершена {task.completed_at.strftime('%d.%m.%Y')}"
+        return "Статус: завершена"
+
+    def _show_task_history(self, event, data):
+        """Страница истории задачи по кнопке"""
+        try:
+            self._send_task_history(event.data['message']['chat']['chatId'], data.task_id, data.cursor)
+        except Exception as e:
+            logger.error("Error showing task history: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при загрузке истории задачи") from e
 
-    def _confirm_removal(self, event):
+    def _confirm_removal(self, event, data):
         """Подтверждает снятие задачи с ревью"""
         try:
-            task_id = int(event.data['callbackData'].split('_')[-1])
+            task_id = data.task_id
             chat_id = event.data['message']['chat']['chatId']
             user_id = event.data['from']['userId']
 
-            with DatabaseManager().session() as db:
-                task = db.query(Task).filter(
-                    Task.id == task_id,
-                    Task.user_id == user_id
-                ).first()
+            with self.db.session_scope() as db:
+                task = self.tasks.get_task_for_removal(db, task_id, user_id)
 
-                if task:
-                    db.delete(task)
-                    db.commit()
-
-                    self.bot.bot.send_text(
+                if task and self.tasks.remove_task(db, task):
+                    self.outbox.reply(
                         chat_id=chat_id,
                         text="✅ Задача успешно снята с ревью!",
                         inline_keyboard_markup=self.keyboards.get_main_keyboard()
                     )
-                else:
+                elif not self._reply_if_closed(db, chat_id, task_id, user_id):
                     raise ValueError("Задача не найдена")
 
         except Exception as e:
-            logger.error(f"Error confirming removal: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
-                chat_id=event.data['message']['chat']['chatId'],
-                text="❌ Ошибка при снятии задачи"
-            )
+            logger.error("Error confirming removal: %s", e, exc_info=True)
+            raise CallbackError("❌ Ошибка при снятии задачи") from e
+
+    def _reply_if_closed(self, db, chat_id, task_id, user_id):
+        """Сообщает автору, что задача уже закрыта (в том числе перенесена в архив)"""
+        task = self.archive.get_task(db, task_id)
+        if task is None or task.user_id != user_id:
+            return False
+        self.outbox.reply(
+            chat_id=chat_id,
+            text=f"ℹ️ Задача #{task_id} уже закрыта",
+            inline_keyboard_markup=self.keyboards.get_closed_task_keyboard(task_id)
+        )
+        return True
 
-    def _cancel_removal(self, event):
+    def _cancel_removal(self, event, data):
         """Отменяет процесс снятия задачи"""
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.data['message']['chat']['chatId'],
             text="❌ Снятие задачи отменено",
             inline_keyboard_markup=self.keyboards.get_main_keyboard()
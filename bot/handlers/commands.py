@@ -1,4 +1,6 @@
 from .base import BaseHandler
+from bot.services.stats import format_turnaround
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,14 +13,70 @@ class CommandHandler(BaseHandler):
                 return
 
             user_name = self._get_user_name(event)
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text=f"Привет, {user_name}! Выберите действие:",
                 inline_keyboard_markup=self.keyboards.get_main_keyboard()
             )
         except Exception as e:
-            logger.error(f"Error in start handler: {str(e)}")
-            self.bot.bot.send_text(
+            logger.error("Error in start handler: %s", e)
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text="Произошла ошибка. Попробуйте позже."
-            )
\ No newline at end of file
+            )
+
+    def handle_stats(self, event):
+        """Личная статистика: голоса ревьюера, задачи автора и общая медиана до завершения"""
+        try:
+            if event.data['chat']['type'] != 'private':
+                return
+
+            user_id = event.message_author['userId']
+            stats = self.bot.stats
+            with self.db.session_scope() as db:
+                reviewer = stats.reviewer(db, user_id)
+                author = stats.author(db, user_id)
+                median, completed = stats.median_turnaround(db)
+
+            lines = [
+                "📊 Ваша статистика",
+                "",
+                "Ревью:",
+                f"✅ Одобрено: {reviewer.approvals if reviewer else 0}",
+                f"❌ Отклонено: {reviewer.rejections if reviewer else 0}",
+                "",
+                "Ваши задачи:",
+                f"⏳ На ревью: {author.open_tasks if author else 0}",
+                f"🏁 Завершено: {author.completed if author else 0}",
+                f"🗑 Снято: {author.removed if author else 0}",
+            ]
+            if completed:
+                lines += ["", f"Медиана времени до {Config.REQUIRED_APPROVALS} одобрений: {format_turnaround(median)}"]
+
+            self.outbox.reply(chat_id=event.from_chat, text="\n".join(lines))
+        except Exception as e:
+            logger.error("Error in stats handler: %s", e)
+            self.outbox.reply(
+                chat_id=event.from_chat,
+                text="Произошла ошибка. Попробуйте позже."
+            )
+
+    def handle_history(self, event):
+        """История задачи: /history <id задачи>"""
+        try:
+            if event.data['chat']['type'] != 'private':
+                return
+
+            _, _, argument = (event.text or '').strip().partition(' ')
+            argument = argument.strip().lstrip('#')
+            if not argument.isdigit():
+                self.outbox.reply(chat_id=event.from_chat, text="Укажите номер задачи: /history 42")
+                return
+
+            self._send_task_history(event.from_chat, int(argument))
+        except Exception as e:
+            logger.error("Error in history handler: %s", e)
+            self.outbox.reply(
+                chat_id=event.from_chat,
+                text="Произошла ошибка. Попробуйте позже."
+            )
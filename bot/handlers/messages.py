@@ -28,15 +28,15 @@ class MessageHandler(BaseHandler):
                 self._handle_confluence_url(event, user_id, text)
 
         except Exception as e:
-            logger.error(f"Message handling error: {str(e)}", exc_info=True)
-            self.bot.bot.send_text(
+            logger.error("Message handling error: %s", e, exc_info=True)
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text="Произошла ошибка. Попробуйте снова."
             )
 
     def _handle_youtrack_url(self, event, user_id, text):
         if not self._is_valid_url(text):
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text="Некорректная ссылка. Введите правильный URL YouTrack:"
             )
@@ -48,14 +48,14 @@ class MessageHandler(BaseHandler):
             data={'youtrack_url': text}
         )
 
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.from_chat,
             text="Введите описание задачи:"
         )
 
     def _handle_description(self, event, user_id, text):
         if len(text) < 10:
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text="Описание слишком короткое. Введите подробнее:"
             )
@@ -67,21 +67,21 @@ class MessageHandler(BaseHandler):
             data={'description': text}
         )
 
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.from_chat,
             text="Введите ссылку на Confluence:"
         )
 
     def _handle_confluence_url(self, event, user_id, text):
         if not self._is_valid_url(text):
-            self.bot.bot.send_text(
+            self.outbox.reply(
                 chat_id=event.from_chat,
                 text="Некорректная ссылка. Введите правильный URL Confluence:"
             )
             return
 
+        self.state.update_state(user_id=user_id, data={'confluence_url': text})
         state = self.state.get_state(user_id)
-        state['data']['confluence_url'] = text
 
         response = (
             "Проверьте данные задачи:\n\n"
@@ -90,7 +90,7 @@ class MessageHandler(BaseHandler):
             f"Confluence: {state['data']['confluence_url']}"
         )
 
-        self.bot.bot.send_text(
+        self.outbox.reply(
             chat_id=event.from_chat,
             text=response,
             inline_keyboard_markup=self.keyboards.get_confirmation_keyboard()
@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+
+from bot.utils.metrics import CALLBACK_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackError(Exception):
+    """
+    Обработчик маршрута не выполнил действие; текст исключения -
+    ответ пользователю. Транзакция события откатывается вместе с
+    ответами и уведомлениями из нее, результат не попадает в кеш
+    повторных нажатий и учитывается в счетчике ошибок маршрута.
+    """
+
+
+class CallbackRouter:
+    """
+    Таблица маршрутов callback-кнопок: действие -> обработчик.
+    Выбор маршрута - один поиск в словаре, по каждому маршруту
+    ведутся счетчики вызовов, ошибок и время выполнения.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, action, handler):
+        if action in self._routes:
+            raise ValueError(f"Route for '{action}' is already registered")
+        self._routes[action] = handler
+        self._stats[action] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+    def has_route(self, action):
+        return action in self._routes
+
+    def dispatch(self, event, data):
+        """Вызывает обработчик действия data.action; False, если маршрута нет"""
+        handler = self._routes.get(data.action)
+        if handler is None:
+            return False
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(data.action, (time.perf_counter() - started) * 1000, failed)
+        return True
+
+    def _record(self, action, elapsed_ms, failed):
+        CALLBACK_LATENCY.observe(elapsed_ms / 1000, route=action)
+        with self._lock:
+            stats = self._stats[action]
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def stats(self):
+        with self._lock:
+            return {action: dict(stats) for action, stats in self._stats.items()}
@@ -1,4 +1,5 @@
 from vkteams.types import InlineKeyboardMarkup, KeyboardButton
+from .callback_data import encode_callback
 
 class KeyboardBuilder:
     def get_main_keyboard(self):
@@ -6,24 +7,24 @@ class KeyboardBuilder:
         keyboard.row(
             KeyboardButton(
                 text="На ревью",
-                callbackData="on_review",
+                callbackData=encode_callback('on_review'),
                 style="primary"
             ),
             KeyboardButton(
                 text="Мои задачи",
-                callbackData="my_tasks",
+                callbackData=encode_callback('my_tasks'),
                 style="secondary"
             )
         )
         keyboard.row(
             KeyboardButton(
                 text="Снять с ревью",
-                callbackData="remove_review",
+                callbackData=encode_callback('remove_review'),
                 style="attention"
             ),
             KeyboardButton(
                 text="Провести ревью",
-                callbackData="do_review",
+                callbackData=encode_callback('do_review'),
                 style="primary"
             )
         )
@@ -34,12 +35,12 @@ class KeyboardBuilder:
         keyboard.row(
             KeyboardButton(
                 text="Подтвердить",
-                callbackData="confirm_task",
+                callbackData=encode_callback('confirm_task'),
                 style="primary"
             ),
             KeyboardButton(
                 text="Отменить",
-                callbackData="cancel_task",
+                callbackData=encode_callback('cancel_task'),
                 style="attention"
             )
         )
@@ -50,13 +51,77 @@ class KeyboardBuilder:
         keyboard.row(
             KeyboardButton(
                 text="Одобрить",
-                callbackData=f"approve_task_{task_id}",
+                callbackData=encode_callback('approve_task', task_id),
                 style="primary"
             ),
             KeyboardButton(
                 text="На доработку",
-                callbackData=f"request_revision_{task_id}",
+                callbackData=encode_callback('request_revision', task_id),
                 style="attention"
             )
         )
-        return keyboard
\ No newline at end of file
+        return keyboard
+
+    def get_task_list_keyboard(self, page, item_action, page_action):
+        """Список задач страницы с кнопками навигации"""
+        keyboard = InlineKeyboardMarkup(buttons_in_row=1)
+        for task in page.items:
+            keyboard.row(
+                KeyboardButton(
+                    text=f"Задача #{task.id}: {task.title}...",
+                    callbackData=encode_callback(item_action, task.id)
+                )
+            )
+
+        navigation = self._get_page_buttons(page, page_action)
+        if navigation:
+            keyboard.row(*navigation)
+        return keyboard
+
+    def get_paged_main_keyboard(self, page, page_action):
+        """Главное меню с кнопками навигации по странице"""
+        keyboard = self.get_main_keyboard()
+        navigation = self._get_page_buttons(page, page_action)
+        if navigation:
+            keyboard.keyboard.insert(0, [button.to_dic() for button in navigation])
+        return keyboard
+
+    def get_closed_task_keyboard(self, task_id):
+        """Главное меню с кнопкой истории закрытой задачи"""
+        return self._with_top_button(
+            self.get_main_keyboard(),
+            KeyboardButton(text="📜 История задачи", callbackData=encode_callback('task_history', task_id))
+        )
+
+    def get_task_history_keyboard(self, task_id, next_cursor=None):
+        """Главное меню; кнопка следующей страницы, если история не поместилась"""
+        keyboard = self.get_main_keyboard()
+        if next_cursor is None:
+            return keyboard
+        return self._with_top_button(
+            keyboard,
+            KeyboardButton(text="Далее ➡️", callbackData=encode_callback('task_history', task_id, next_cursor))
+        )
+
+    @staticmethod
+    def _with_top_button(keyboard, button):
+        keyboard.keyboard.insert(0, [button.to_dic()])
+        return keyboard
+
+    def _get_page_buttons(self, page, page_action):
+        buttons = []
+        if page.prev_cursor is not None:
+            buttons.append(
+                KeyboardButton(
+                    text="⬅️ Назад",
+                    callbackData=encode_callback(page_action, cursor=page.prev_cursor, direction='prev')
+                )
+            )
+        if page.next_cursor is not None:
+            buttons.append(
+                KeyboardButton(
+                    text="Далее ➡️",
+                    callbackData=encode_callback(page_action, cursor=page.next_cursor, direction='next')
+                )
+            )
+        return buttons
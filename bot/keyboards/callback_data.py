@@ -0,0 +1,102 @@
+"""
+Компактная версионированная кодировка callbackData кнопок.
+
+Формат v1: "1|<код действия>|<task_id>|<n|p><cursor>", пустые хвостовые
+поля опускаются, например "1|ca|42" или "1|dr||n17". Разбор выполняется
+один раз в CallbackData; старые строки вида "confirm_approve_42"
+(кнопки в истории чатов) по-прежнему распознаются.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+CALLBACK_VERSION = '1'
+
+# Действие -> короткий код
+ACTION_CODES = {
+    'on_review': 'nr',
+    'my_tasks': 'mt',
+    'confirm_task': 'ct',
+    'cancel_task': 'xt',
+    'remove_review': 'rr',
+    'do_review': 'dr',
+    'review_task': 'rt',
+    'approve_task': 'at',
+    'request_revision': 'rv',
+    'confirm_approve': 'ca',
+    'confirm_revision': 'cv',
+    'select_task': 'st',
+    'confirm_remove': 'cr',
+    'cancel_remove': 'xr',
+    'cancel_action': 'xa',
+    'task_history': 'th',
+}
+_ACTIONS_BY_CODE = {code: action for action, code in ACTION_CODES.items()}
+
+# Старый формат: точное совпадение или "<префикс><task_id>"
+_LEGACY_EXACT = {
+    'on_review', 'my_tasks', 'confirm_task', 'cancel_task',
+    'remove_review', 'do_review', 'cancel_remove', 'cancel_action',
+}
+_LEGACY_TASK_PREFIXES = {
+    'review_task_': 'review_task',
+    'approve_task_': 'approve_task',
+    'request_revision_': 'request_revision',
+    'confirm_approve_': 'confirm_approve',
+    'confirm_revision_': 'confirm_revision',
+    'select_task_': 'select_task',
+    'confirm_remove_': 'confirm_remove',
+}
+
+
+@dataclass(frozen=True)
+class CallbackData:
+    action: str
+    task_id: Optional[int] = None
+    cursor: Optional[int] = None
+    direction: str = 'next'
+
+    def encode(self):
+        return encode_callback(self.action, self.task_id, self.cursor, self.direction)
+
+
+def encode_callback(action, task_id=None, cursor=None, direction='next'):
+    fields = [CALLBACK_VERSION, ACTION_CODES[action]]
+    if task_id is not None or cursor is not None:
+        fields.append('' if task_id is None else str(task_id))
+    if cursor is not None:
+        fields.append(f"{'p' if direction == 'prev' else 'n'}{cursor}")
+    return '|'.join(fields)
+
+
+def decode_callback(raw):
+    """Разбирает callbackData; None для неизвестного формата"""
+    if not raw:
+        return None
+    try:
+        if raw.startswith(CALLBACK_VERSION + '|'):
+            return _decode_v1(raw)
+        return _decode_legacy(raw)
+    except (ValueError, KeyError, IndexError):
+        return None
+
+
+def _decode_v1(raw):
+    fields = raw.split('|')
+    action = _ACTIONS_BY_CODE[fields[1]]
+    task_id = int(fields[2]) if len(fields) > 2 and fields[2] else None
+    cursor, direction = None, 'next'
+    if len(fields) > 3 and fields[3]:
+        direction = 'prev' if fields[3][0] == 'p' else 'next'
+        cursor = int(fields[3][1:])
+    return CallbackData(action, task_id, cursor, direction)
+
+
+def _decode_legacy(raw):
+    if raw in _LEGACY_EXACT:
+        return CallbackData(raw)
+
+    prefix, _, value = raw.rpartition('_')
+    prefix += '_'
+    if prefix in _LEGACY_TASK_PREFIXES:
+        return CallbackData(_LEGACY_TASK_PREFIXES[prefix], task_id=int(value))
+    return None
@@ -0,0 +1,15 @@
+from .task import Base, Task
+from .vote import ReviewVote, VERDICT_APPROVE, VERDICT_REJECT
+from .state import UserState
+from .job import ScheduledJob
+from .cache_event import ReviewCacheEvent
+from .audit import AuditEvent
+from .archive import ArchivedTask, ArchivedVote
+from .stats import ReviewerStats, AuthorStats, WeeklyStats, TurnaroundStats
+from .assignment import TaskAssignment
+from .sla import SlaReminder
+
+__all__ = ['Base', 'Task', 'ReviewVote', 'VERDICT_APPROVE', 'VERDICT_REJECT', 'UserState', 'ScheduledJob',
+           'ReviewCacheEvent', 'AuditEvent',
+           'ArchivedTask', 'ArchivedVote', 'ReviewerStats', 'AuthorStats', 'WeeklyStats',
+           'TurnaroundStats', 'TaskAssignment', 'SlaReminder']
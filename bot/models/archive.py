@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+
+from .task import Base
+
+
+class ArchivedTask(Base):
+    """
+    Завершенные и снятые задачи, перенесенные из tasks архиватором.
+    id совпадает с id в tasks; устаревшие JSON-колонки не переносятся.
+    """
+    __tablename__ = 'tasks_archive'
+    __table_args__ = (
+        Index('ix_tasks_archive_user_id', 'user_id', 'id'),
+        Index('ix_tasks_archive_closed_at', 'closed_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(String(50), nullable=False)
+    creator = Column(String(100), nullable=False)
+    description = Column(String(500), nullable=False)
+    youtrack_url = Column(String(200))
+    confluence_url = Column(String(200))
+    approve_count = Column(Integer, default=0)
+    reject_count = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    completed_at = Column(DateTime, nullable=True)
+    removed_at = Column(DateTime, nullable=True)
+    closed_at = Column(DateTime, nullable=True)  # removed_at или completed_at - для отчетов по периоду
+    archived_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedTask(id={self.id}, description='{self.description[:20]}...')>"
+
+
+class ArchivedVote(Base):
+    __tablename__ = 'review_votes_archive'
+    __table_args__ = (
+        Index('ix_review_votes_archive_task_id', 'task_id'),
+        Index('ix_review_votes_archive_reviewer_id', 'reviewer_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    task_id = Column(Integer, nullable=False)
+    reviewer_id = Column(String(50), nullable=False)
+    verdict = Column(String(10), nullable=False)
+    comment = Column(String(500), nullable=True)
+    created_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ArchivedVote(task_id={self.task_id}, reviewer_id='{self.reviewer_id}', verdict='{self.verdict}')>"
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+
+from .task import Base
+
+
+class TaskAssignment(Base):
+    """Назначение ревьюера на задачу; completed_at - голос ревьюера или закрытие задачи"""
+    __tablename__ = 'task_assignments'
+    __table_args__ = (
+        UniqueConstraint('task_id', 'reviewer_id', name='uq_task_assignments_task_reviewer'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    reviewer_id = Column(String(50), nullable=False)
+    assigned_at = Column(DateTime, nullable=False, default=datetime.now)
+    completed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<TaskAssignment(task_id={self.task_id}, reviewer_id='{self.reviewer_id}')>"
+
+
+# Открытые назначения: нагрузка ревьюеров при загрузке ReviewerAssigner
+Index(
+    'ix_task_assignments_open_reviewer', TaskAssignment.reviewer_id,
+    sqlite_where=TaskAssignment.completed_at.is_(None),
+    postgresql_where=TaskAssignment.completed_at.is_(None)
+)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
+from datetime import datetime
+
+from .task import Base
+
+AUDIT_TASK_CREATED = 'task_created'
+AUDIT_VOTE = 'vote'
+AUDIT_TASK_COMPLETED = 'task_completed'
+AUDIT_TASK_REMOVED = 'task_removed'  # Снята автором
+AUDIT_TASK_AUTO_REMOVED = 'task_auto_removed'  # Снята по лимиту отклонений
+AUDIT_NOTIFICATION = 'notification'
+
+
+class AuditEvent(Base):
+    """
+    Журнал действий по задачам, только добавление.
+    Без внешнего ключа на tasks: история остается после удаления задачи.
+    """
+    __tablename__ = 'audit_events'
+    __table_args__ = (
+        # История задачи по порядку записи (keyset-пагинация по id)
+        Index('ix_audit_events_task_id', 'task_id', 'id'),
+        Index('ix_audit_events_created_at', 'created_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=True)
+    actor_id = Column(String(50), nullable=True)  # Пользователь; None - сам бот
+    action = Column(String(30), nullable=False)
+    details = Column(JSON, default=dict)
+    created_at = Column(DateTime, nullable=False)  # Время действия, а не записи пачки
+
+    def __repr__(self):
+        return f"<AuditEvent(id={self.id}, task_id={self.task_id}, action='{self.action}')>"
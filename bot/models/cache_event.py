@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+
+from .task import Base
+
+CACHE_EVENT_CREATED = 'created'  # Новая задача - доступна всем, кроме автора
+CACHE_EVENT_VOTED = 'voted'  # Голос - задача пропадает из списка проголосовавшего
+CACHE_EVENT_CLOSED = 'closed'  # Задача завершена или снята - пропадает у всех
+
+
+class ReviewCacheEvent(Base):
+    """Лента изменений списков задач для ревью между репликами"""
+    __tablename__ = 'review_cache_events'
+    __table_args__ = (
+        Index('ix_review_cache_events_created_at', 'created_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(10), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    user_id = Column(String(50), nullable=True)  # Автор (created) или голосующий (voted)
+    title = Column(Text, nullable=True)  # Начало описания (created)
+    origin = Column(String(32), nullable=False)  # Реплика, записавшая событие
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<ReviewCacheEvent(id={self.id}, kind='{self.kind}', task_id={self.task_id})>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
+from datetime import datetime
+
+from .task import Base
+
+
+class ScheduledJob(Base):
+    __tablename__ = 'scheduled_jobs'
+    __table_args__ = (
+        Index('ix_scheduled_jobs_run_at', 'run_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(100), unique=True, nullable=True)  # Уникальное имя для повторной регистрации
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, default=dict)
+    run_at = Column(DateTime, nullable=False)  # UTC
+    interval_seconds = Column(Integer, nullable=True)  # Повтор через N секунд
+    daily_at = Column(String(5), nullable=True)  # Повтор ежедневно в HH:MM (NOTIFICATION_TZ)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<ScheduledJob(id={self.id}, kind='{self.kind}', run_at={self.run_at})>"
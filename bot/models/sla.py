@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from .task import Base
+
+
+class SlaReminder(Base):
+    """Последнее напоминание по правилу SLA для задачи - повторно не отправляется"""
+    __tablename__ = 'sla_reminders'
+    __table_args__ = (
+        # Анти-join "задачи, по которым напоминание еще не отправлялось"
+        UniqueConstraint('task_id', 'rule', name='uq_sla_reminders_task_rule'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    rule = Column(String(50), nullable=False)
+    sent_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_count = Column(Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<SlaReminder(task_id={self.task_id}, rule='{self.rule}')>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text, DateTime, Index
+
+from .task import Base
+
+
+class UserState(Base):
+    __tablename__ = 'user_states'
+    __table_args__ = (
+        Index('ix_user_states_expires_at', 'expires_at'),
+    )
+
+    user_id = Column(String(50), primary_key=True)
+    payload = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<UserState(user_id='{self.user_id}', expires_at={self.expires_at})>"
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Date
+
+from .task import Base
+
+
+class ReviewerStats(Base):
+    """Голоса ревьюера за все время"""
+    __tablename__ = 'reviewer_stats'
+
+    reviewer_id = Column(String(50), primary_key=True)
+    approvals = Column(Integer, nullable=False, default=0)
+    rejections = Column(Integer, nullable=False, default=0)
+
+
+class AuthorStats(Base):
+    """Задачи автора: открытые сейчас и закрытые за все время"""
+    __tablename__ = 'author_stats'
+
+    author_id = Column(String(50), primary_key=True)
+    open_tasks = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)  # Автором и по лимиту отклонений
+
+
+class WeeklyStats(Base):
+    """Счетчики за неделю (понедельник week_start, локальное время)"""
+    __tablename__ = 'weekly_stats'
+
+    week_start = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)  # Сняты автором
+    auto_removed = Column(Integer, nullable=False, default=0)  # Сняты по лимиту отклонений
+
+
+class TurnaroundStats(Base):
+    """Гистограмма времени от создания до завершения задачи"""
+    __tablename__ = 'turnaround_stats'
+
+    bucket = Column(Integer, primary_key=True)  # Верхняя граница корзины, секунд; 0 - больше последней
+    count = Column(Integer, nullable=False, default=0)
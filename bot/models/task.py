@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, JSON, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -6,6 +6,8 @@ Base = declarative_base()
 
 class Task(Base):
     __tablename__ = 'tasks'
+    # AUTOINCREMENT: SQLite не выдает повторно id задач, перенесенных в архив
+    __table_args__ = {'sqlite_autoincrement': True}
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String(50), nullable=False)
@@ -15,11 +17,42 @@ class Task(Base):
     confluence_url = Column(String(200))
     status = Column(Boolean, default=False)
     approve_count = Column(Integer, default=0)
-    approved_by = Column(JSON, default=list)
+    approved_by = Column(JSON, default=list)  # Устарело: голоса хранятся в review_votes
     reject_count = Column(Integer, default=0)  # Новое поле - счетчик отклонений
-    rejected_by = Column(JSON, default=list)  # Новое поле - список отклонивших
+    rejected_by = Column(JSON, default=list)  # Устарело: голоса хранятся в review_votes
     created_at = Column(DateTime, default=datetime.now)
     completed_at = Column(DateTime, nullable=True)
+    removed_at = Column(DateTime, nullable=True)  # Снята автором или по лимиту отклонений (status = True)
 
     def __repr__(self):
-        return f"<Task(id={self.id}, description='{self.description[:20]}...')>"
\ No newline at end of file
+        return f"<Task(id={self.id}, description='{self.description[:20]}...')>"
+
+
+# Частичные индексы по открытым задачам (status = false): горячие запросы
+# работают только с ними, а завершенные задачи не раздувают индекс
+Index(
+    'ix_tasks_open_id', Task.id,
+    sqlite_where=Task.status == False,
+    postgresql_where=Task.status == False
+)
+Index(
+    'ix_tasks_open_user_id', Task.user_id, Task.id,
+    sqlite_where=Task.status == False,
+    postgresql_where=Task.status == False
+)
+# Закрытые задачи, ожидающие переноса в архив (TaskArchive)
+Index(
+    'ix_tasks_closed_id', Task.id,
+    sqlite_where=Task.status == True,
+    postgresql_where=Task.status == True
+)
+# Открытые задачи по времени создания: поиск нарушений SLA (SlaMonitor)
+Index(
+    'ix_tasks_open_created_at', Task.created_at,
+    sqlite_where=Task.status == False,
+    postgresql_where=Task.status == False
+)
+# Открытые задачи в соединении с участниками персонального дайджеста
+# (TaskService.iter_reviewer_digest): без него SQLite на каждый запрос
+# строит автоматический индекс по status
+Index('ix_tasks_status_id', Task.status, Task.id)
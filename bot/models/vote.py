@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+
+from .task import Base
+
+VERDICT_APPROVE = 'approve'
+VERDICT_REJECT = 'reject'
+
+
+class ReviewVote(Base):
+    __tablename__ = 'review_votes'
+    __table_args__ = (
+        # Один голос ревьюера на задачу, подсчет голосов по задаче
+        UniqueConstraint('task_id', 'reviewer_id', name='uq_review_votes_task_reviewer'),
+        # Анти-join "задачи, которые пользователь еще может проверить"
+        Index('ix_review_votes_reviewer_task', 'reviewer_id', 'task_id'),
+        Index('ix_review_votes_task_verdict', 'task_id', 'verdict'),
+        # id архивных голосов не выдаются повторно (SQLite)
+        {'sqlite_autoincrement': True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    reviewer_id = Column(String(50), nullable=False)
+    verdict = Column(String(10), nullable=False)
+    comment = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<ReviewVote(task_id={self.task_id}, reviewer_id='{self.reviewer_id}', verdict='{self.verdict}')>"
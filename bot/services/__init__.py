@@ -1,4 +1,12 @@
 from .tasks import TaskService
 from .notifications import NotificationService
+from .scheduler import Scheduler
+from .reviewable import ReviewableCache
+from .idempotency import CallbackDeduplicator
+from .audit import AuditLog
+from .archive import TaskArchive
+from .stats import StatsService
+from .assignment import ReviewerAssigner
+from .sla import SlaMonitor
 
-__all__ = ['TaskService', 'NotificationService']
\ No newline at end of file
+__all__ = ['TaskService', 'NotificationService', 'Scheduler', 'ReviewableCache', 'CallbackDeduplicator', 'AuditLog', 'TaskArchive', 'StatsService', 'ReviewerAssigner', 'SlaMonitor']
\ No newline at end of file
@@ -0,0 +1,113 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, union_all
+
+from bot.models.task import Task
+from bot.models.vote import ReviewVote, VERDICT_APPROVE
+from bot.models.archive import ArchivedTask, ArchivedVote
+from bot.models.assignment import TaskAssignment
+from bot.models.sla import SlaReminder
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_TASK_COLUMNS = (
+    'id', 'user_id', 'creator', 'description', 'youtrack_url', 'confluence_url',
+    'approve_count', 'reject_count', 'created_at', 'completed_at', 'removed_at'
+)
+_VOTE_COLUMNS = ('id', 'task_id', 'reviewer_id', 'verdict', 'comment', 'created_at')
+
+
+class TaskArchive:
+    """
+    Горячая/холодная схема хранения задач.
+
+    В tasks остаются открытые задачи и недавно закрытые (завершенные
+    или снятые). Задачи, закрытые больше ARCHIVE_AFTER_DAYS назад,
+    переносятся вместе с голосами в tasks_archive / review_votes_archive
+    пачками по ARCHIVE_BATCH_SIZE, каждая пачка - отдельная транзакция.
+    Методы чтения ищут задачу в обеих таблицах.
+    """
+
+    def __init__(self, db_manager=None, batch_size=None, after_days=None):
+        self.db = db_manager or DatabaseManager()
+        self.batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+        self.after_days = Config.ARCHIVE_AFTER_DAYS if after_days is None else after_days
+
+    # Перенос
+
+    def run(self, max_batches=None):
+        """Переносит до max_batches пачек; возвращает число перенесенных задач"""
+        max_batches = max_batches or Config.ARCHIVE_MAX_BATCHES
+        cutoff = datetime.now() - timedelta(days=self.after_days)
+        moved = 0
+        for _ in range(max_batches):
+            count = self.archive_batch(cutoff)
+            moved += count
+            if count < self.batch_size:
+                break
+        if moved:
+            logger.info("Archived %s closed tasks", moved)
+        return moved
+
+    def archive_batch(self, cutoff):
+        """Одна пачка: INSERT ... SELECT в архив и DELETE из живых таблиц"""
+        closed_at = func.coalesce(Task.removed_at, Task.completed_at, Task.created_at)
+
+        with self.db.session() as db:
+            task_ids = db.execute(
+                select(Task.id).where(
+                    Task.status == True,
+                    closed_at < cutoff
+                ).order_by(Task.id).limit(self.batch_size)
+            ).scalars().all()
+            if not task_ids:
+                return 0
+
+            now = datetime.now()
+            db.execute(insert(ArchivedTask).from_select(
+                _TASK_COLUMNS + ('closed_at', 'archived_at'),
+                select(
+                    *(getattr(Task, name) for name in _TASK_COLUMNS),
+                    func.coalesce(Task.removed_at, Task.completed_at),
+                    literal(now)
+                ).where(Task.id.in_(task_ids))
+            ))
+            db.execute(insert(ArchivedVote).from_select(
+                _VOTE_COLUMNS,
+                select(*(getattr(ReviewVote, name) for name in _VOTE_COLUMNS)).where(
+                    ReviewVote.task_id.in_(task_ids)
+                )
+            ))
+            db.execute(delete(ReviewVote).where(ReviewVote.task_id.in_(task_ids)))
+            # Назначения и напоминания закрытой задачи больше не нужны и в архив не переносятся
+            db.execute(delete(TaskAssignment).where(TaskAssignment.task_id.in_(task_ids)))
+            db.execute(delete(SlaReminder).where(SlaReminder.task_id.in_(task_ids)))
+            db.execute(delete(Task).where(Task.id.in_(task_ids)))
+            db.commit()
+        return len(task_ids)
+
+    # Чтение с учетом архива
+
+    def get_task(self, db, task_id):
+        """Задача из tasks или tasks_archive (общие атрибуты одинаковы)"""
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if task is None:
+            task = db.query(ArchivedTask).filter(ArchivedTask.id == task_id).first()
+        return task
+
+    def get_task_voters(self, db, task_id):
+        """(одобрившие, отклонившие) в порядке голосования, из живых или архивных голосов"""
+        votes = union_all(
+            select(*(getattr(ReviewVote, name) for name in _VOTE_COLUMNS)).where(ReviewVote.task_id == task_id),
+            select(*(getattr(ArchivedVote, name) for name in _VOTE_COLUMNS)).where(ArchivedVote.task_id == task_id)
+        ).subquery()
+        rows = db.execute(
+            select(votes.c.reviewer_id, votes.c.verdict)
+            .order_by(votes.c.created_at, votes.c.id)
+        ).all()
+        approvers = [row.reviewer_id for row in rows if row.verdict == VERDICT_APPROVE]
+        rejecters = [row.reviewer_id for row in rows if row.verdict != VERDICT_APPROVE]
+        return approvers, rejecters
@@ -0,0 +1,214 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from bot.models.task import Task
+from bot.models.vote import ReviewVote
+from bot.models.assignment import TaskAssignment
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_NEVER = datetime.min
+
+
+class ReviewerAssigner:
+    """
+    Автоматическое назначение ревьюеров на задачи.
+
+    Пул - ревьюеры из REVIEWERS и все, кто голосовал за последние
+    ASSIGNMENT_ACTIVE_DAYS дней. В памяти лежит куча
+    (открытые назначения, время последнего назначения, ревьюер):
+    задаче достаются наименее загруженные, при равенстве - дольше всех
+    не получавшие задач. Устаревшие элементы кучи пропускаются при
+    извлечении, поэтому выбор k ревьюеров стоит O((k + исключенные) log n).
+
+    Новое назначение учитывается в памяти сразу, чтобы параллельные
+    события не выбрали одного и того же ревьюера; освобождение после
+    голоса или закрытия задачи - после commit. Раз в
+    ASSIGNMENT_REFRESH_INTERVAL нагрузка перечитывается из БД: так
+    учитываются откатившиеся транзакции и назначения других реплик.
+    """
+
+    def __init__(self, db_manager=None, reviewers=None, active_days=None, refresh_interval=None):
+        self.db = db_manager or DatabaseManager()
+        self.reviewers = frozenset(Config.REVIEWERS if reviewers is None else reviewers)
+        self.active_days = active_days or Config.ASSIGNMENT_ACTIVE_DAYS
+        self.refresh_interval = refresh_interval or Config.ASSIGNMENT_REFRESH_INTERVAL
+
+        self._lock = threading.Lock()
+        self._load = {}  # reviewer_id -> (открытые назначения, время последнего назначения)
+        self._heap = []
+        self._loaded_at = None
+        self._counters = {'assigned': 0, 'released': 0, 'unfilled': 0, 'refreshes': 0}
+
+    # Назначение
+
+    def assign(self, db, task_id, author_id):
+        """
+        Доназначает ревьюеров открытой задаче, пока одобрений и открытых
+        назначений вместе меньше REQUIRED_APPROVALS. Автор, уже
+        голосовавшие и уже назначенные исключаются. Возвращает id
+        назначенных ревьюеров (меньше нужного, если пул исчерпан).
+        """
+        self._ensure_loaded()
+        if not self._load:
+            return []
+
+        approvals = db.query(Task.approve_count).filter(
+            Task.id == task_id,
+            Task.status == False
+        ).scalar()
+        if approvals is None:
+            return []
+
+        assigned = dict(db.execute(
+            select(TaskAssignment.reviewer_id, TaskAssignment.completed_at).where(TaskAssignment.task_id == task_id)
+        ).all())
+        needed = Config.REQUIRED_APPROVALS - approvals - sum(1 for done in assigned.values() if done is None)
+        if needed <= 0:
+            return []
+
+        voters = db.scalars(select(ReviewVote.reviewer_id).where(ReviewVote.task_id == task_id)).all()
+        exclude = {author_id, *assigned, *voters}
+
+        now = datetime.now()
+        with self._lock:
+            picked = self._pick(needed, exclude)
+            for reviewer_id in picked:
+                open_count, _ = self._load[reviewer_id]
+                self._set(reviewer_id, open_count + 1, now)
+            self._counters['assigned'] += len(picked)
+            if len(picked) < needed:
+                self._counters['unfilled'] += 1
+
+        for reviewer_id in picked:
+            db.add(TaskAssignment(task_id=task_id, reviewer_id=reviewer_id, assigned_at=now))
+        if len(picked) < needed:
+            logger.info("Task %s: assigned %s of %s reviewers, pool exhausted", task_id, len(picked), needed)
+        return picked
+
+    def _pick(self, count, exclude):
+        picked = []
+        skipped = []
+        while self._heap and len(picked) < count:
+            item = heapq.heappop(self._heap)
+            open_count, assigned_at, reviewer_id = item
+            if self._load.get(reviewer_id) != (open_count, assigned_at):
+                continue  # Устаревший элемент: нагрузка ревьюера с тех пор изменилась
+            if reviewer_id in exclude:
+                skipped.append(item)
+                continue
+            picked.append(reviewer_id)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return picked
+
+    def _set(self, reviewer_id, open_count, assigned_at):
+        self._load[reviewer_id] = (open_count, assigned_at)
+        heapq.heappush(self._heap, (open_count, assigned_at, reviewer_id))
+        if len(self._heap) > 4 * len(self._load) + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(open_count, at, reviewer_id) for reviewer_id, (open_count, at) in self._load.items()]
+        heapq.heapify(self._heap)
+
+    # Завершение назначений (вызывается из TaskService)
+
+    def vote_recorded(self, db, result, reviewer_id):
+        """Голос закрывает назначение ревьюера, завершение или снятие задачи - все назначения"""
+        if result.completed or result.removed:
+            self.complete(db, result.task_id)
+        else:
+            self.complete(db, result.task_id, reviewer_id)
+        # Проголосовавший активен - попадает в пул, даже если его там не было
+        self.db.after_commit(db, lambda: self._activate(reviewer_id))
+
+    def task_closed(self, db, task_id):
+        self.complete(db, task_id)
+
+    def complete(self, db, task_id, reviewer_id=None):
+        """Закрывает открытые назначения задачи (одного ревьюера или все)"""
+        query = db.query(TaskAssignment).filter(
+            TaskAssignment.task_id == task_id,
+            TaskAssignment.completed_at.is_(None)
+        )
+        if reviewer_id is not None:
+            query = query.filter(TaskAssignment.reviewer_id == reviewer_id)
+        reviewers = [row.reviewer_id for row in query.with_entities(TaskAssignment.reviewer_id)]
+        if not reviewers:
+            return
+        query.update({TaskAssignment.completed_at: datetime.now()}, synchronize_session=False)
+        self.db.after_commit(db, lambda: self._release(reviewers))
+
+    def _release(self, reviewers):
+        with self._lock:
+            for reviewer_id in reviewers:
+                if reviewer_id in self._load:
+                    open_count, assigned_at = self._load[reviewer_id]
+                    self._set(reviewer_id, max(open_count - 1, 0), assigned_at)
+            self._counters['released'] += len(reviewers)
+
+    def _activate(self, reviewer_id):
+        with self._lock:
+            if reviewer_id not in self._load:
+                self._set(reviewer_id, 0, _NEVER)
+
+    # Чтение
+
+    def assignees(self, db, task_id):
+        """Ревьюеры с открытым назначением на задачу"""
+        return db.scalars(
+            select(TaskAssignment.reviewer_id).where(
+                TaskAssignment.task_id == task_id,
+                TaskAssignment.completed_at.is_(None)
+            ).order_by(TaskAssignment.id)
+        ).all()
+
+    # Синхронизация с БД
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.refresh_interval:
+            self.refresh()
+
+    def refresh(self):
+        """Перечитывает пул и открытые назначения из БД"""
+        since = datetime.now() - timedelta(days=self.active_days)
+        with self.db.session() as db:
+            # Закрытые задачи уходят в архив, поэтому живая review_votes невелика
+            active = db.scalars(
+                select(ReviewVote.reviewer_id).where(ReviewVote.created_at >= since).distinct()
+            ).all()
+            open_rows = db.execute(
+                select(
+                    TaskAssignment.reviewer_id,
+                    func.count(),
+                    func.max(TaskAssignment.assigned_at)
+                ).where(TaskAssignment.completed_at.is_(None)).group_by(TaskAssignment.reviewer_id)
+            ).all()
+
+        load = {reviewer_id: (0, _NEVER) for reviewer_id in self.reviewers.union(active)}
+        for reviewer_id, open_count, assigned_at in open_rows:
+            if reviewer_id in load:
+                load[reviewer_id] = (open_count, assigned_at or _NEVER)
+
+        with self._lock:
+            self._load = load
+            self._rebuild_heap()
+            self._loaded_at = time.monotonic()
+            self._counters['refreshes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pool_size'] = len(self._load)
+            stats['open_assignments'] = sum(open_count for open_count, _ in self._load.values())
+            stats['heap_size'] = len(self._heap)
+        return stats
@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from bot.models.audit import (
+    AuditEvent, AUDIT_TASK_CREATED, AUDIT_VOTE, AUDIT_TASK_COMPLETED,
+    AUDIT_TASK_REMOVED, AUDIT_TASK_AUTO_REMOVED, AUDIT_NOTIFICATION
+)
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AuditPage:
+    """Страница истории задачи по возрастанию id"""
+    items: List[AuditEvent]
+    next_cursor: Optional[int] = None  # id последней записи, если есть следующая страница
+
+
+class AuditLog:
+    """
+    Журнал действий в таблице audit_events.
+
+    Обработчик только кладет запись в буфер в памяти (после commit
+    транзакции события - откатившиеся действия в журнал не попадают).
+    Фоновый поток пишет буфер одним многострочным INSERT, когда в нем
+    набралось AUDIT_BATCH_SIZE записей или прошло AUDIT_FLUSH_INTERVAL
+    секунд. Сверх AUDIT_MAX_BUFFER записи отбрасываются со счетчиком,
+    чтобы недоступная БД не съела память.
+    """
+
+    def __init__(self, db_manager=None, batch_size=None, flush_interval=None, max_buffer=None):
+        self.db = db_manager or DatabaseManager()
+        self.batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.AUDIT_FLUSH_INTERVAL
+        self.max_buffer = max_buffer or Config.AUDIT_MAX_BUFFER
+
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._counters = {'recorded': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Останавливает поток и записывает остаток буфера"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread:
+            thread.join(self.flush_interval + 5)
+        self.flush()
+
+    # Запись событий
+
+    def task_created(self, task):
+        self.record(AUDIT_TASK_CREATED, task.id, task.user_id, {
+            'description': task.description,
+            'youtrack_url': task.youtrack_url,
+            'confluence_url': task.confluence_url
+        })
+
+    def vote(self, result, reviewer_id):
+        """Засчитанный голос (VoteResult) и его последствия для задачи"""
+        self.record(AUDIT_VOTE, result.task_id, reviewer_id, {
+            'verdict': result.verdict,
+            'approve_count': result.approve_count,
+            'reject_count': result.reject_count
+        })
+        if result.completed:
+            self.record(AUDIT_TASK_COMPLETED, result.task_id, reviewer_id, {'approvers': result.approvers})
+        elif result.removed:
+            self.record(AUDIT_TASK_AUTO_REMOVED, result.task_id, reviewer_id, {
+                'reject_count': result.reject_count,
+                'approvers': result.approvers,
+                'rejecters': result.rejecters
+            })
+
+    def task_removed(self, task, actor_id):
+        self.record(AUDIT_TASK_REMOVED, task.id, actor_id, {
+            'approve_count': task.approve_count,
+            'reject_count': task.reject_count
+        })
+
+    def notification(self, task_id, kind, chat_id):
+        """Уведомление по задаче поставлено в outbox"""
+        self.record(AUDIT_NOTIFICATION, task_id, None, {'kind': kind, 'chat_id': chat_id})
+
+    def record(self, action, task_id=None, actor_id=None, details=None):
+        """
+        Ставит запись в буфер после commit текущей транзакции
+        (события или отдельной, если событие не обрабатывается).
+        """
+        row = {
+            'task_id': task_id,
+            'actor_id': actor_id,
+            'action': action,
+            'details': details or {},
+            'created_at': datetime.now()
+        }
+        with self.db.session_scope() as db:
+            self.db.after_commit(db, lambda: self._enqueue(row))
+
+    def _enqueue(self, row):
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                self._counters['dropped'] += 1
+                return
+            self._buffer.append(row)
+            self._counters['recorded'] += 1
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    # Фоновая запись
+
+    def _run(self):
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            with self._cond:
+                while not self._stopping and len(self._buffer) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленный буфер; возвращает число записанных строк"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            written = 0
+            try:
+                with self.db.session() as db:
+                    for start in range(0, len(rows), self.batch_size):
+                        batch = rows[start:start + self.batch_size]
+                        db.execute(insert(AuditEvent), batch)
+                        written += len(batch)
+                    db.commit()
+            except Exception as e:
+                logger.error("Audit flush of %s events failed: %s", len(rows), e)
+                with self._cond:
+                    # Вернуть в начало буфера в пределах лимита, порядок сохраняется
+                    keep = max(self.max_buffer - len(self._buffer), 0)
+                    self._counters['dropped'] += max(len(rows) - keep, 0)
+                    self._buffer[:0] = rows[-keep:] if keep else []
+                    self._counters['failed_flushes'] += 1
+                return 0
+
+            with self._cond:
+                self._counters['written'] += written
+                self._counters['flushes'] += 1
+            return written
+
+    # Чтение
+
+    def history(self, db, task_id, cursor=None, limit=None, actions=None):
+        """Страница истории задачи: записи с id > cursor по порядку; actions - только эти действия"""
+        limit = limit or Config.AUDIT_PAGE_SIZE
+        query = db.query(AuditEvent).filter(AuditEvent.task_id == task_id)
+        if actions is not None:
+            query = query.filter(AuditEvent.action.in_(actions))
+        if cursor is not None:
+            query = query.filter(AuditEvent.id > cursor)
+        rows = query.order_by(AuditEvent.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return AuditPage(items=rows, next_cursor=rows[-1].id if has_more else None)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats['queue_depth'] = len(self._buffer)
+        return stats
@@ -0,0 +1,76 @@
+import threading
+
+from bot.utils.cache import TTLCache
+from config import Config
+
+# Действия, повтор которых меняет данные или рассылает уведомления:
+# повторное нажатие той же кнопки в окне дедупликации не выполняется
+IDEMPOTENT_ACTIONS = frozenset({'confirm_task', 'confirm_approve', 'confirm_revision', 'confirm_remove'})
+
+
+class CallbackDeduplicator:
+    """
+    Защита от повторной обработки callback-событий.
+
+    Два уровня ключей, оба в ограниченных TTL-кешах:
+    - queryId события - повторная доставка того же события long polling'ом
+      (CALLBACK_QUERY_TTL);
+    - (пользователь, действие, задача) для IDEMPOTENT_ACTIONS - двойное
+      нажатие кнопки (CALLBACK_DEDUP_WINDOW). У confirm_task задачи еще
+      нет, ее место занимает msgId сообщения с кнопкой: следующая задача,
+      подтвержденная из нового сообщения, дубликатом не считается.
+
+    Значение - результат первой обработки (текст ответа), им отвечают
+    на дубликат без обращения к БД и без повторных уведомлений.
+    События одного пользователя обрабатываются диспетчером по очереди,
+    поэтому дубликат всегда приходит после завершения оригинала.
+    """
+
+    def __init__(self, window=None, query_ttl=None, max_size=None):
+        max_size = max_size or Config.CALLBACK_DEDUP_MAX_SIZE
+        self._queries = TTLCache(max_size=max_size, ttl=query_ttl or Config.CALLBACK_QUERY_TTL)
+        self._actions = TTLCache(max_size=max_size, ttl=window or Config.CALLBACK_DEDUP_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = {'duplicate_queries': 0, 'duplicate_actions': 0}
+
+    @staticmethod
+    def _action_key(user_id, data, message_id):
+        if data.action not in IDEMPOTENT_ACTIONS:
+            return None
+        target = data.task_id if data.task_id is not None else message_id
+        return user_id, data.action, target
+
+    def lookup(self, query_id, user_id, data, message_id=None):
+        """Результат первой обработки, если событие - дубликат, иначе None"""
+        if query_id:
+            result = self._queries.get(query_id)
+            if result is not None:
+                self._count('duplicate_queries')
+                return result
+
+        key = self._action_key(user_id, data, message_id)
+        if key is not None:
+            result = self._actions.get(key)
+            if result is not None:
+                self._count('duplicate_actions')
+                return result
+        return None
+
+    def remember(self, query_id, user_id, data, result, message_id=None):
+        """Запоминает результат обработки; вызывается после commit события"""
+        if query_id:
+            self._queries.set(query_id, result)
+        key = self._action_key(user_id, data, message_id)
+        if key is not None:
+            self._actions.set(key, result)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['tracked_queries'] = len(self._queries)
+        stats['tracked_actions'] = len(self._actions)
+        return stats
@@ -1,35 +1,159 @@
+from itertools import groupby
+from operator import itemgetter
+
 from vkteams.constant import ParseMode
+from bot.services.stats import format_turnaround
+from bot.utils.markdown import escape_markdown, escape_url, split_messages
 from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+DIGEST_HEADER = "📅 *Доброе утро, сегодня у нас следующие задачи:*\n\n"
+WEEKLY_REPORT_HEADER = "📊 *Статистика ревью*\n\n"
+
 
 class NotificationService:
     def __init__(self, bot):
         self.bot = bot
 
     def send_daily_notification(self):
+        """
+        Дайджест открытых задач в групповой чат.
+        Задачи читаются из БД потоком и разбиваются на сообщения
+        не длиннее MAX_MESSAGE_LENGTH, которые уходят через outbox.
+        """
         try:
-            tasks = self.bot.task_service.get_pending_tasks()
+            blocks = (
+                self._render_task(task)
+                for task in self.bot.task_service.iter_pending_digest()
+            )
+            sent = 0
+            for text in split_messages(blocks, header=DIGEST_HEADER):
+                if text == DIGEST_HEADER:
+                    break
+                self.bot.outbox.notify(
+                    chat_id=Config.GROUP_CHAT_ID,
+                    text=text,
+                    parse_mode=ParseMode.MARKDOWNV2.value
+                )
+                sent += 1
 
-            if not tasks:
+            if not sent:
                 logger.info("No tasks for notification")
                 return
+            logger.info("Daily notification queued in %s messages", sent)
+        except Exception as e:
+            logger.error("Notification error: %s", e)
 
-            message = "📅 *Доброе утро, сегодня у нас следующие задачи:*\n\n"
-            for task in tasks:
-                message += (
-                    f"• *Создатель:* {task.creator}\n"
-                    f"• *Описание:* {task.description}\n"
-                    f"• [YouTrack]({task.youtrack_url})\n"
-                    f"• [Confluence]({task.confluence_url})\n\n"
-                )
+    def send_personal_digests(self):
+        """
+        Личные дайджесты: ревьюеру - задачи, которые он еще может проверить,
+        автору - голоса по его открытым задачам. Данные для всех
+        пользователей берутся двумя потоковыми запросами.
+        """
+        try:
+            reviewers = self._send_grouped(
+                self.bot.task_service.iter_reviewer_digest(),
+                "👀 *Ждут вашего ревью: {count}*\n\n",
+                self._render_reviewable
+            )
+            authors = self._send_grouped(
+                self.bot.task_service.iter_author_digest(),
+                "📊 *Ваши задачи на ревью: {count}*\n\n",
+                self._render_own_task
+            )
+            logger.info("Personal digests queued: %s reviewers, %s authors", reviewers, authors)
+        except Exception as e:
+            logger.error("Personal digest error: %s", e)
 
-            self.bot.bot.send_text(
-                chat_id=Config.GROUP_CHAT_ID,
-                text=message,
-                parse_mode=ParseMode.MARKDOWNV2.value
+    def send_weekly_report(self):
+        """
+        Отчет по статистике ревью в групповой чат: рейтинг ревьюеров,
+        очередь открытых задач, медиана времени до завершения и
+        закрытые/снятые задачи по неделям. Читает только агрегаты
+        StatsService.
+        """
+        try:
+            stats = self.bot.stats
+            with self.bot.db.session_scope() as db:
+                reviewers = stats.top_reviewers(db)
+                open_total, authors = stats.backlog(db)
+                median, completed = stats.median_turnaround(db)
+                weeks = stats.weeks(db)
+
+            names = self.bot.user_directory.resolve_many(
+                [row.reviewer_id for row in reviewers] + [row.author_id for row in authors]
             )
+            blocks = []
+            if reviewers:
+                blocks.append("*Активные ревьюеры:*\n" + "".join(
+                    f"{position}\\. {escape_markdown(names[row.reviewer_id])} \\- "
+                    f"✅ {row.approvals}, ❌ {row.rejections}\n"
+                    for position, row in enumerate(reviewers, 1)
+                ) + "\n")
+            blocks.append(f"*На ревью:* {open_total}\n" + "".join(
+                f"• {escape_markdown(names[row.author_id])}: {row.open_tasks}\n" for row in authors
+            ) + "\n")
+            if completed:
+                blocks.append(f"*Медиана до завершения:* {escape_markdown(format_turnaround(median))}\n\n")
+            if weeks:
+                blocks.append("*По неделям:*\n" + "".join(
+                    f"• {escape_markdown(row.week_start.strftime('%d.%m'))}: создано {row.created}, завершено {row.completed}, "
+                    f"снято {row.removed + row.auto_removed} \\(по отклонениям {row.auto_removed}\\)\n"
+                    for row in weeks
+                ))
+
+            sent = 0
+            for text in split_messages(blocks, header=WEEKLY_REPORT_HEADER):
+                self.bot.outbox.notify(
+                    chat_id=Config.GROUP_CHAT_ID,
+                    text=text,
+                    parse_mode=ParseMode.MARKDOWNV2.value
+                )
+                sent += 1
+            logger.info("Weekly report queued in %s messages", sent)
         except Exception as e:
-            logger.error(f"Notification error: {str(e)}")
\ No newline at end of file
+            logger.error("Weekly report error: %s", e)
+
+    def _send_grouped(self, rows, header, render):
+        """Отправляет по сообщению на каждую группу строк с одинаковым user_id (первая колонка)"""
+        recipients = 0
+        for user_id, group in groupby(rows, key=itemgetter(0)):
+            blocks = []
+            count = 0
+            for row in group:
+                count += 1
+                if count <= Config.DIGEST_MAX_TASKS:
+                    blocks.append(render(row))
+            if count > Config.DIGEST_MAX_TASKS:
+                blocks.append(f"…и еще {count - Config.DIGEST_MAX_TASKS}\n")
+
+            for text in split_messages(blocks, header=header.format(count=count)):
+                self.bot.outbox.notify(
+                    chat_id=user_id,
+                    text=text,
+                    parse_mode=ParseMode.MARKDOWNV2.value
+                )
+            recipients += 1
+        return recipients
+
+    @staticmethod
+    def _render_reviewable(row):
+        return f"• \\#{row.id} {escape_markdown(row.title)}\n"
+
+    @staticmethod
+    def _render_own_task(row):
+        return (
+            f"• \\#{row.id} {escape_markdown(row.title)} \\- "
+            f"✅ {row.approve_count}/{Config.REQUIRED_APPROVALS}, ❌ {row.reject_count}\n"
+        )
+
+    @staticmethod
+    def _render_task(task):
+        return (
+            f"• *Создатель:* {escape_markdown(task.creator)}\n"
+            f"• *Описание:* {escape_markdown(task.description)}\n"
+            f"• [YouTrack]({escape_url(task.youtrack_url)})\n"
+            f"• [Confluence]({escape_url(task.confluence_url)})\n\n"
+        )
@@ -0,0 +1,300 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from bot.utils.metrics import SEND_LATENCY
+from config import Config
+
+logger = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger('bot.outbox.dead_letter')
+
+PRIORITY_REPLY = 0  # Ответ пользователю, нажавшему кнопку
+PRIORITY_NOTIFICATION = 10  # Рассылки: группа, автор, другие ревьюеры
+
+_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _response_payload(response):
+    """Тело ответа API: {"ok": ..., "description": ...}; пустой dict, если это не JSON-объект"""
+    try:
+        payload = response.json()
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+class OutgoingMessage:
+    __slots__ = ('seq', 'chat_id', 'text', 'kwargs', 'priority', 'attempts', 'mergeable')
+
+    def __init__(self, seq, chat_id, text, kwargs, priority):
+        self.seq = seq
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.priority = priority
+        self.attempts = 0
+        # Простые уведомления в один чат можно склеивать в одно сообщение
+        self.mergeable = priority == PRIORITY_NOTIFICATION and not kwargs
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def acquire(self):
+        """Берет токен; возвращает 0 или время ожидания до следующего токена"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class MessageOutbox:
+    """
+    Очередь исходящих сообщений.
+
+    Обработчики ставят сообщения в очередь и сразу возвращаются,
+    отправку выполняет пул потоков с общим и per-chat ограничением
+    частоты. Ответы нажавшему пользователю идут раньше рассылок.
+    Неудачные отправки повторяются с экспоненциальной задержкой,
+    после OUTBOX_MAX_ATTEMPTS сообщение пишется в dead-letter лог.
+    """
+
+    def __init__(self, api, workers=None):
+        self.api = api
+        self.workers = workers or Config.OUTBOX_WORKERS
+
+        self._ready = []  # (priority, seq, message)
+        self._delayed = []  # (available_at, seq, message)
+        self._busy_chats = set()  # Чаты с отправкой в процессе - сохраняем порядок
+        self._merge_targets = {}  # chat_id -> ожидающее склеиваемое уведомление
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._global_bucket = TokenBucket(Config.OUTBOX_GLOBAL_RATE, Config.OUTBOX_GLOBAL_BURST)
+        self._chat_buckets = {}
+        self._in_flight = 0
+        self._running = False
+        self._threads = []
+        self._counters = {'sent': 0, 'merged': 0, 'retried': 0, 'dead': 0, 'discarded': 0}
+        self._deferred = threading.local()
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Message outbox started with %s workers", self.workers)
+
+    def reply(self, chat_id, text, **kwargs):
+        """Ответ пользователю - отправляется в первую очередь"""
+        self.send(chat_id, text, PRIORITY_REPLY, **kwargs)
+
+    def notify(self, chat_id, text, **kwargs):
+        """Фоновое уведомление"""
+        self.send(chat_id, text, PRIORITY_NOTIFICATION, **kwargs)
+
+    @contextmanager
+    def deferred(self):
+        """
+        Сообщения, поставленные в этом потоке внутри блока, уходят
+        в очередь только при успешном выходе из него (после commit
+        транзакции события); при исключении они отбрасываются.
+        """
+        buffer = []
+        self._deferred.buffer = buffer
+        try:
+            yield
+        except Exception:
+            with self._condition:
+                self._counters['discarded'] += len(buffer)
+            raise
+        else:
+            for chat_id, text, priority, kwargs in buffer:
+                self._enqueue(chat_id, text, priority, kwargs)
+        finally:
+            self._deferred.buffer = None
+
+    def deferred_replies(self, chat_id):
+        """Тексты ответов в chat_id, ожидающих выхода из deferred() в этом потоке"""
+        buffer = getattr(self._deferred, 'buffer', None) or ()
+        return [
+            text for message_chat, text, priority, _ in buffer
+            if message_chat == chat_id and priority == PRIORITY_REPLY
+        ]
+
+    def send(self, chat_id, text, priority=PRIORITY_NOTIFICATION, **kwargs):
+        buffer = getattr(self._deferred, 'buffer', None)
+        if buffer is not None:
+            buffer.append((chat_id, text, priority, kwargs))
+            return
+        self._enqueue(chat_id, text, priority, kwargs)
+
+    def _enqueue(self, chat_id, text, priority, kwargs):
+        with self._condition:
+            message = OutgoingMessage(next(self._seq), chat_id, text, kwargs, priority)
+            if message.mergeable and self._merge(message):
+                return
+            self._push(message)
+            self._condition.notify()
+
+    def stop(self, timeout=None):
+        """Дожидается отправки очереди и останавливает потоки"""
+        timeout = Config.OUTBOX_DRAIN_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while (self._ready or self._delayed or self._in_flight) and time.monotonic() < deadline:
+                self._condition.wait(0.1)
+            pending = len(self._ready) + len(self._delayed)
+            self._running = False
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join(1)
+        if pending:
+            logger.warning("Outbox stopped with %s unsent messages", pending)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._counters)
+            stats['queue_depth'] = len(self._ready) + len(self._delayed)
+        return stats
+
+    def _merge(self, message):
+        target = self._merge_targets.get(message.chat_id)
+        if target is None:
+            return False
+        text = f"{target.text}\n\n{message.text}"
+        if len(text) > Config.MAX_MESSAGE_LENGTH:
+            return False
+        target.text = text
+        self._counters['merged'] += 1
+        return True
+
+    def _push(self, message, available_at=None):
+        if available_at is None:
+            heapq.heappush(self._ready, (message.priority, message.seq, message))
+        else:
+            heapq.heappush(self._delayed, (available_at, message.seq, message))
+        if message.mergeable:
+            self._merge_targets[message.chat_id] = message
+
+    def _take(self):
+        """Берет следующее сообщение, готовое к отправке; None при остановке"""
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, seq, message = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (message.priority, seq, message))
+
+                if self._ready:
+                    _, seq, message = heapq.heappop(self._ready)
+                    if message.chat_id in self._busy_chats:
+                        wait = Config.OUTBOX_CHAT_BUSY_DELAY
+                    else:
+                        wait = self._chat_bucket(message.chat_id).acquire()
+                    if wait:
+                        # Чат занят или исчерпал лимит - откладываем, не блокируя остальные
+                        heapq.heappush(self._delayed, (now + wait, seq, message))
+                        continue
+                    if self._merge_targets.get(message.chat_id) is message:
+                        del self._merge_targets[message.chat_id]
+                    self._busy_chats.add(message.chat_id)
+                    self._in_flight += 1
+                    return message
+
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._condition.wait(timeout)
+            return None
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= Config.OUTBOX_MAX_TRACKED_CHATS:
+                self._chat_buckets.clear()
+            bucket = TokenBucket(Config.OUTBOX_CHAT_RATE, Config.OUTBOX_CHAT_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _worker(self):
+        while True:
+            message = self._take()
+            if message is None:
+                return
+            try:
+                self._throttle_global()
+                self._deliver(message)
+            finally:
+                with self._condition:
+                    self._busy_chats.discard(message.chat_id)
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _throttle_global(self):
+        while True:
+            with self._condition:
+                wait = self._global_bucket.acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def _deliver(self, message):
+        message.attempts += 1
+        error = None
+        started = time.perf_counter()
+        try:
+            response = self.api.send_text(chat_id=message.chat_id, text=message.text, **message.kwargs)
+            status_code = getattr(response, 'status_code', 200)
+            if status_code in _RETRY_STATUS_CODES:
+                error = f"HTTP {status_code}"
+            else:
+                payload = _response_payload(response)
+                if status_code < 400 and payload.get('ok'):
+                    SEND_LATENCY.observe(time.perf_counter() - started, outcome='ok')
+                    with self._condition:
+                        self._counters['sent'] += 1
+                    return
+                # Отказ API (4xx или ok=false): повтор вернет то же самое
+                SEND_LATENCY.observe(time.perf_counter() - started, outcome='error')
+                self._dead_letter(message, payload.get('description') or f"HTTP {status_code}")
+                return
+        except Exception as e:
+            error = str(e)
+        SEND_LATENCY.observe(time.perf_counter() - started, outcome='error')
+
+        if message.attempts >= Config.OUTBOX_MAX_ATTEMPTS:
+            self._dead_letter(message, error)
+            return
+
+        delay = min(Config.OUTBOX_RETRY_BASE_DELAY * 2 ** (message.attempts - 1), Config.OUTBOX_RETRY_MAX_DELAY)
+        logger.warning("Send to %s failed (%s), retry in %.1fs", message.chat_id, error, delay)
+        with self._condition:
+            self._counters['retried'] += 1
+            self._push(message, time.monotonic() + delay)
+            self._condition.notify()
+
+    def _dead_letter(self, message, error):
+        with self._condition:
+            self._counters['dead'] += 1
+        dead_letter_logger.error(json.dumps({
+            'chat_id': message.chat_id,
+            'text': message.text,
+            'attempts': message.attempts,
+            'error': error
+        }, ensure_ascii=False))
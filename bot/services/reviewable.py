@@ -0,0 +1,205 @@
+import logging
+import threading
+import uuid
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from bot.models.cache_event import (
+    ReviewCacheEvent, CACHE_EVENT_CREATED, CACHE_EVENT_VOTED, CACHE_EVENT_CLOSED
+)
+from bot.utils.cache import TTLCache
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ReviewableTask = namedtuple('ReviewableTask', ('id', 'title'))
+
+
+class ReviewableCache:
+    """
+    Кеш списков задач, доступных пользователю для ревью:
+    user_id -> кортеж ReviewableTask по возрастанию id.
+
+    Списки не сбрасываются целиком, а точечно правятся после commit
+    изменения (DatabaseManager.after_commit): новая задача добавляется
+    всем, кроме автора, голос убирает задачу у проголосовавшего,
+    завершение или снятие - у всех. Загрузка, начавшаяся до правки,
+    в кеш не попадает, поэтому устаревший список не сохраняется.
+
+    При нескольких репликах (REVIEW_CACHE_CHANGE_FEED) изменения
+    пишутся в review_cache_events в той же транзакции, а фоновый поток
+    каждой реплики применяет чужие события. id событий выдаются до
+    commit, поэтому транзакция с меньшим id может зафиксироваться
+    позже опроса: каждый опрос перечитывает REVIEW_CACHE_FEED_LOOKBACK
+    id ниже позиции, а уже примененные события пропускаются. TTL
+    ограничивает устаревание, если событие все же пропущено.
+    """
+
+    def __init__(self, db_manager=None, max_size=None, ttl=None, change_feed=None):
+        self.db = db_manager or DatabaseManager()
+        self.change_feed = Config.REVIEW_CACHE_CHANGE_FEED if change_feed is None else change_feed
+        self.origin = uuid.uuid4().hex
+        self._cache = TTLCache(
+            max_size=max_size or Config.REVIEW_CACHE_MAX_SIZE,
+            ttl=ttl or Config.REVIEW_CACHE_TTL
+        )
+        self._lock = threading.Lock()
+        self._loads = {}  # user_id -> маркер загрузки, которую еще можно сохранить
+        self._counters = {'patches': 0, 'stale_loads': 0, 'feed_events': 0}
+        self._feed_position = None
+        self._feed_seen = set()  # id примененных событий в окне перечитывания
+        self._feed_thread = None
+        self._feed_stop = threading.Event()
+
+    def get(self, user_id, loader):
+        """Список пользователя из кеша или loader() с сохранением в кеш"""
+        rows = self._cache.get(user_id)
+        if rows is not None:
+            return rows
+
+        token = object()
+        with self._lock:
+            self._loads[user_id] = token
+        rows = tuple(ReviewableTask(row.id, row.title) for row in loader())
+        with self._lock:
+            if self._loads.get(user_id) is token:
+                del self._loads[user_id]
+                self._cache.set(user_id, rows)
+            else:
+                self._counters['stale_loads'] += 1
+        return rows
+
+    # Изменения
+
+    def task_created(self, db, task_id, author_id, title):
+        self._publish(db, CACHE_EVENT_CREATED, task_id, author_id, title)
+
+    def task_voted(self, db, task_id, reviewer_id):
+        self._publish(db, CACHE_EVENT_VOTED, task_id, reviewer_id)
+
+    def task_closed(self, db, task_id):
+        self._publish(db, CACHE_EVENT_CLOSED, task_id)
+
+    def _publish(self, db, kind, task_id, user_id=None, title=None):
+        if self.change_feed:
+            db.add(ReviewCacheEvent(
+                kind=kind, task_id=task_id, user_id=user_id, title=title, origin=self.origin
+            ))
+        self.db.after_commit(db, lambda: self._apply(kind, task_id, user_id, title))
+
+    def _apply(self, kind, task_id, user_id, title):
+        with self._lock:
+            self._counters['patches'] += 1
+            if kind == CACHE_EVENT_VOTED:
+                self._loads.pop(user_id, None)
+                self._cache.update(user_id, lambda rows: _without(rows, task_id))
+                return
+
+            self._loads.clear()
+            if kind == CACHE_EVENT_CREATED:
+                task = ReviewableTask(task_id, title)
+                for key in self._cache.keys():
+                    if key != user_id:
+                        self._cache.update(key, lambda rows: _with(rows, task))
+            else:
+                for key in self._cache.keys():
+                    self._cache.update(key, lambda rows: _without(rows, task_id))
+
+    def clear(self):
+        with self._lock:
+            self._loads.clear()
+            self._cache.clear()
+
+    # Лента изменений других реплик
+
+    def start(self):
+        if not self.change_feed or self._feed_thread:
+            return
+        with self.db.session() as db:
+            self._feed_position = db.query(ReviewCacheEvent.id).order_by(
+                ReviewCacheEvent.id.desc()
+            ).limit(1).scalar() or 0
+            # События, зафиксированные до старта, уже отражены в БД
+            self._feed_seen = {
+                event_id for event_id, in db.query(ReviewCacheEvent.id).filter(
+                    ReviewCacheEvent.id > self._feed_position - Config.REVIEW_CACHE_FEED_LOOKBACK
+                )
+            }
+        self._feed_stop.clear()
+        self._feed_thread = threading.Thread(target=self._poll_feed, name='review-cache-feed', daemon=True)
+        self._feed_thread.start()
+        logger.info("Review cache change feed started at event %s", self._feed_position)
+
+    def stop(self):
+        if not self._feed_thread:
+            return
+        self._feed_stop.set()
+        self._feed_thread.join(Config.REVIEW_CACHE_FEED_INTERVAL + 1)
+        self._feed_thread = None
+
+    def _poll_feed(self):
+        while not self._feed_stop.wait(Config.REVIEW_CACHE_FEED_INTERVAL):
+            try:
+                self.apply_feed()
+            except Exception as e:
+                logger.warning("Review cache feed poll failed: %s", e)
+
+    def apply_feed(self):
+        """
+        Применяет события других реплик, записанные после прошлого опроса,
+        и зафиксированные с опозданием события из окна перечитывания
+        """
+        window_start = self._feed_position - Config.REVIEW_CACHE_FEED_LOOKBACK
+        with self.db.session() as db:
+            events = db.query(
+                ReviewCacheEvent.id, ReviewCacheEvent.kind, ReviewCacheEvent.task_id,
+                ReviewCacheEvent.user_id, ReviewCacheEvent.title, ReviewCacheEvent.origin
+            ).filter(
+                ReviewCacheEvent.id > window_start
+            ).order_by(ReviewCacheEvent.id).all()
+
+        applied = 0
+        for event in events:
+            if event.id in self._feed_seen:
+                continue
+            self._feed_seen.add(event.id)
+            applied += 1
+            if event.origin != self.origin:
+                self._apply(event.kind, event.task_id, event.user_id, event.title)
+                self._counters['feed_events'] += 1
+            self._feed_position = max(self._feed_position, event.id)
+
+        window_start = self._feed_position - Config.REVIEW_CACHE_FEED_LOOKBACK
+        self._feed_seen = {event_id for event_id in self._feed_seen if event_id > window_start}
+        return applied
+
+    def prune_feed(self, retention=None):
+        """Удаляет события ленты старше retention секунд"""
+        retention = retention or Config.REVIEW_CACHE_FEED_RETENTION
+        with self.db.session() as db:
+            removed = db.query(ReviewCacheEvent).filter(
+                ReviewCacheEvent.created_at < datetime.now() - timedelta(seconds=retention)
+            ).delete(synchronize_session=False)
+            db.commit()
+        if removed:
+            logger.info("Pruned %s review cache events", removed)
+        return removed
+
+    def stats(self):
+        stats = self._cache.stats()
+        with self._lock:
+            stats.update(self._counters)
+        return stats
+
+
+def _without(rows, task_id):
+    return tuple(row for row in rows if row.id != task_id)
+
+
+def _with(rows, task):
+    index = bisect_left([row.id for row in rows], task.id)
+    if index < len(rows) and rows[index].id == task.id:
+        return rows
+    return rows[:index] + (task,) + rows[index:]
@@ -0,0 +1,304 @@
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, time as dtime, timedelta
+
+import pytz
+
+from bot.models.job import ScheduledJob
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def utc_now():
+    """Текущее время UTC без tzinfo - в таком виде run_at хранится в БД"""
+    return datetime.now(pytz.utc).replace(tzinfo=None, microsecond=0)
+
+
+class Scheduler:
+    """
+    Планировщик отложенных задач на куче.
+
+    Задания хранятся в таблице scheduled_jobs и переживают перезапуск,
+    в памяти лежит только куча (run_at, job_id). Поток планировщика спит
+    ровно до ближайшего срока и просыпается раньше, если добавлено
+    более раннее задание. Перед запуском задание "захватывается"
+    условным UPDATE/DELETE по (id, run_at), поэтому отмененное или уже
+    выполненное другой репликой задание повторно не запускается.
+
+    Обработчики регистрируются по виду задания (kind) и получают payload;
+    выполняются в отдельном пуле, чтобы долгая задача не задерживала
+    остальные.
+    """
+
+    def __init__(self, db_manager=None, tz=None, workers=None):
+        self.db = db_manager or DatabaseManager()
+        self.tz = pytz.timezone(tz or Config.NOTIFICATION_TZ)
+        self.workers = workers or Config.SCHEDULER_WORKERS
+
+        self._handlers = {}
+        self._heap = []
+        self._jobs = {}  # job_id -> run_at актуальной записи в куче
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._executor = None
+        self._running = set()
+        self._counters = {'executed': 0, 'failed': 0, 'skipped': 0}
+
+    def register(self, kind, handler):
+        """Регистрирует обработчик handler(payload) для заданий вида kind"""
+        if kind in self._handlers:
+            raise ValueError(f"Handler for job kind '{kind}' is already registered")
+        with self._cond:
+            self._handlers[kind] = handler
+            if self._thread:
+                # Задания этого вида, сохраненные до регистрации обработчика
+                self._load(kind)
+                self._cond.notify()
+
+    def start(self):
+        with self._cond:
+            if self._thread:
+                return
+            self._stopping = False
+            self._load()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='scheduler-job'
+            )
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+        logger.info("Scheduler started with %s pending jobs", len(self._jobs))
+
+    def stop(self, timeout=None):
+        """
+        Останавливает планировщик: ожидающие задания остаются в БД,
+        уже запущенные получают timeout секунд на завершение.
+        """
+        timeout = Config.SCHEDULER_DRAIN_TIMEOUT if timeout is None else timeout
+        with self._cond:
+            if not self._thread:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        thread.join(timeout)
+        with self._cond:
+            running = list(self._running)
+        _, not_done = wait(running, timeout=timeout)
+        if not_done:
+            logger.warning("Scheduler stopped with %s jobs still running", len(not_done))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+        with self._cond:
+            self._thread = None
+            self._heap.clear()
+            self._jobs.clear()
+        logger.info("Scheduler stopped")
+
+    def schedule_at(self, kind, run_at, payload=None, key=None):
+        """
+        Однократное задание на run_at (aware datetime или naive UTC).
+        Задание с тем же key заменяется.
+        """
+        return self._save(kind, self._to_utc(run_at), payload, key, replace=True)
+
+    def schedule_in(self, kind, seconds, payload=None, key=None):
+        return self.schedule_at(kind, utc_now() + timedelta(seconds=seconds), payload, key)
+
+    def schedule_every(self, kind, seconds, payload=None, key=None):
+        """Повторяющееся задание с периодом seconds"""
+        return self._save(
+            kind, utc_now() + timedelta(seconds=seconds), payload, key,
+            interval_seconds=int(seconds)
+        )
+
+    def schedule_daily(self, kind, at, payload=None, key=None):
+        """Ежедневное задание в at ("HH:MM") по часовому поясу планировщика"""
+        return self._save(kind, self._next_daily(at, utc_now()), payload, key, daily_at=at)
+
+    def cancel(self, job_id):
+        """Отменяет задание; False, если его уже нет"""
+        with self.db.session() as db:
+            removed = db.query(ScheduledJob).filter(
+                ScheduledJob.id == job_id
+            ).delete(synchronize_session=False)
+            db.commit()
+        self._forget(job_id)
+        return bool(removed)
+
+    def cancel_key(self, key):
+        with self.db.session() as db:
+            job_id = db.query(ScheduledJob.id).filter(ScheduledJob.key == key).scalar()
+        return self.cancel(job_id) if job_id is not None else False
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats['pending'] = len(self._jobs)
+            stats['running'] = len(self._running)
+        return stats
+
+    def _save(self, kind, run_at, payload, key, interval_seconds=None, daily_at=None, replace=False):
+        with self.db.session() as db:
+            job = db.query(ScheduledJob).filter(ScheduledJob.key == key).first() if key else None
+            if job and not replace and (job.kind, job.interval_seconds, job.daily_at) == (
+                kind, interval_seconds, daily_at
+            ):
+                # Повторная регистрация при старте: сохраняем срок, в том числе пропущенный
+                return job.id
+
+            if job is None:
+                job = ScheduledJob(key=key)
+                db.add(job)
+            job.kind = kind
+            job.payload = payload or {}
+            job.run_at = run_at
+            job.interval_seconds = interval_seconds
+            job.daily_at = daily_at
+            db.commit()
+            job_id = job.id
+
+        self._push(job_id, run_at)
+        return job_id
+
+    def _load(self, kind=None):
+        """Загружает задания зарегистрированных видов (или только kind) в кучу"""
+        kinds = [kind] if kind else list(self._handlers)
+        if not kinds:
+            return
+        with self.db.session() as db:
+            rows = db.query(ScheduledJob.id, ScheduledJob.run_at).filter(
+                ScheduledJob.kind.in_(kinds)
+            ).all()
+        for job_id, run_at in rows:
+            self._jobs[job_id] = run_at
+            self._heap.append((run_at, job_id))
+        heapq.heapify(self._heap)
+
+    def _push(self, job_id, run_at):
+        with self._cond:
+            if not self._thread:
+                return
+            self._jobs[job_id] = run_at
+            heapq.heappush(self._heap, (run_at, job_id))
+            if self._heap[0] == (run_at, job_id):
+                self._cond.notify()
+
+    def _forget(self, job_id):
+        # Запись в куче удаляется лениво: она не совпадет с self._jobs
+        with self._cond:
+            self._jobs.pop(job_id, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                due = self._pop_due()
+                if not due:
+                    self._cond.wait(self._wait_timeout())
+                    continue
+
+            for job_id, run_at in due:
+                try:
+                    self._claim_and_submit(job_id, run_at)
+                except Exception as e:
+                    logger.error("Failed to start job %s: %s", job_id, e, exc_info=True)
+
+    def _pop_due(self):
+        now = utc_now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            run_at, job_id = heapq.heappop(self._heap)
+            if self._jobs.get(job_id) == run_at:
+                del self._jobs[job_id]
+                due.append((job_id, run_at))
+        return due
+
+    def _wait_timeout(self):
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - utc_now()).total_seconds(), 0)
+
+    def _claim_and_submit(self, job_id, run_at):
+        with self.db.session() as db:
+            job = db.query(ScheduledJob).filter(ScheduledJob.id == job_id).first()
+            if job is None or job.run_at != run_at:
+                return
+
+            handler = self._handlers.get(job.kind)
+            if handler is None:
+                # Задание остается в БД до регистрации обработчика своего вида
+                logger.warning("No handler for job kind '%s', job %s postponed", job.kind, job_id)
+                with self._cond:
+                    self._counters['skipped'] += 1
+                return
+
+            kind, payload = job.kind, dict(job.payload or {})
+            claim = db.query(ScheduledJob).filter(
+                ScheduledJob.id == job_id,
+                ScheduledJob.run_at == run_at
+            )
+            next_run = self._next_run(job, run_at)
+            if next_run is None:
+                claimed = claim.delete(synchronize_session=False)
+            else:
+                claimed = claim.update({ScheduledJob.run_at: next_run}, synchronize_session=False)
+            db.commit()
+
+        if not claimed:
+            return
+        if next_run is not None:
+            self._push(job_id, next_run)
+
+        with self._cond:
+            if self._stopping:
+                return
+            future = self._executor.submit(self._execute, job_id, kind, handler, payload)
+            self._running.add(future)
+        future.add_done_callback(self._discard_running)
+
+    def _execute(self, job_id, kind, handler, payload):
+        try:
+            handler(payload)
+            counter = 'executed'
+        except Exception as e:
+            logger.error("Job %s (%s) failed: %s", job_id, kind, e, exc_info=True)
+            counter = 'failed'
+        with self._cond:
+            self._counters[counter] += 1
+
+    def _discard_running(self, future):
+        with self._cond:
+            self._running.discard(future)
+
+    def _next_run(self, job, run_at):
+        """Следующий срок повторяющегося задания; пропущенные сроки не накапливаются"""
+        now = utc_now()
+        if job.daily_at:
+            return self._next_daily(job.daily_at, now)
+        if job.interval_seconds:
+            return max(run_at + timedelta(seconds=job.interval_seconds), now)
+        return None
+
+    def _next_daily(self, at, after):
+        hour, minute = (int(part) for part in at.split(':'))
+        local_after = pytz.utc.localize(after).astimezone(self.tz)
+        day = local_after.date()
+        while True:
+            # localize учитывает переход на летнее/зимнее время в выбранный день
+            candidate = self.tz.localize(datetime.combine(day, dtime(hour, minute)))
+            if candidate > local_after:
+                return candidate.astimezone(pytz.utc).replace(tzinfo=None)
+            day += timedelta(days=1)
+
+    def _to_utc(self, value):
+        if value.tzinfo is None:
+            return value.replace(microsecond=0)
+        return value.astimezone(pytz.utc).replace(tzinfo=None, microsecond=0)
@@ -0,0 +1,176 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import exists, select, update
+
+from bot.keyboards.builder import KeyboardBuilder
+from bot.models.task import Task
+from bot.models.assignment import TaskAssignment
+from bot.models.sla import SlaReminder
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SLA_TARGETS = ('author', 'assignees', 'group')
+
+
+@dataclass(frozen=True)
+class SlaRule:
+    """Правило SLA из Config.SLA_RULES"""
+    name: str
+    after_hours: float  # Задача открыта дольше, часов с момента создания
+    no_votes: bool = False  # Ни одного голоса
+    approvals: Optional[int] = None  # Ровно столько одобрений
+    notify: Tuple[str, ...] = ('assignees',)
+    repeat_hours: Optional[float] = None  # Повтор напоминания; None - одно напоминание
+
+    def __post_init__(self):
+        unknown = set(self.notify) - set(SLA_TARGETS)
+        if unknown:
+            raise ValueError(f"SLA rule '{self.name}': unknown notify targets {sorted(unknown)}")
+        object.__setattr__(self, 'notify', tuple(self.notify))
+
+
+class SlaMonitor:
+    """
+    Напоминания по задачам, нарушившим правила SLA.
+
+    Запускается заданием планировщика (одна реплика на запуск). Для
+    каждого правила открытые задачи старше after_hours выбираются по
+    частичному индексу ix_tasks_open_created_at, а уже получившие
+    напоминание отсекаются анти-join'ом по sla_reminders. Пачка задач
+    обрабатывается в одной транзакции: отметка о напоминании и
+    сообщения через outbox (лимиты частоты отправки) фиксируются
+    вместе, поэтому напоминание не теряется и не повторяется.
+    """
+
+    def __init__(self, db_manager=None, outbox=None, audit=None, rules=None, batch_size=None):
+        self.db = db_manager or DatabaseManager()
+        self.outbox = outbox
+        self.audit = audit
+        self.rules = [SlaRule(**rule) for rule in (Config.SLA_RULES if rules is None else rules)]
+        self.batch_size = batch_size or Config.SLA_BATCH_SIZE
+        self.keyboards = KeyboardBuilder()
+
+    def run(self):
+        """Проверяет все правила; возвращает число задач, по которым отправлены напоминания"""
+        reminded = 0
+        for rule in self.rules:
+            while True:
+                count = self._remind_batch(rule)
+                reminded += count
+                if count < self.batch_size:
+                    break
+        if reminded:
+            logger.info("SLA reminders sent for %s tasks", reminded)
+        return reminded
+
+    def breaching(self, db, rule, now=None, limit=None):
+        """Открытые задачи, нарушившие правило и еще не получившие по нему напоминание"""
+        now = now or datetime.now()
+        reminded = select(SlaReminder.id).where(
+            SlaReminder.task_id == Task.id,
+            SlaReminder.rule == rule.name
+        )
+        if rule.repeat_hours:
+            reminded = reminded.where(SlaReminder.sent_at > now - timedelta(hours=rule.repeat_hours))
+
+        query = select(
+            Task.id, Task.user_id, Task.creator, Task.description, Task.youtrack_url,
+            Task.approve_count, Task.reject_count, Task.created_at
+        ).where(
+            Task.status == False,
+            Task.created_at < now - timedelta(hours=rule.after_hours),
+            ~exists(reminded)
+        )
+        if rule.no_votes:
+            query = query.where(Task.approve_count == 0, Task.reject_count == 0)
+        if rule.approvals is not None:
+            query = query.where(Task.approve_count == rule.approvals)
+        return db.execute(query.order_by(Task.created_at).limit(limit or self.batch_size)).all()
+
+    def _remind_batch(self, rule):
+        now = datetime.now()
+        # Как при обработке события: сообщения уходят в outbox после commit
+        with self.outbox.deferred(), self.db.event_session() as db:
+            tasks = self.breaching(db, rule, now)
+            if not tasks:
+                return 0
+
+            task_ids = [task.id for task in tasks]
+            assignees = {}
+            if 'assignees' in rule.notify:
+                for task_id, reviewer_id in db.execute(
+                    select(TaskAssignment.task_id, TaskAssignment.reviewer_id).where(
+                        TaskAssignment.task_id.in_(task_ids),
+                        TaskAssignment.completed_at.is_(None)
+                    ).order_by(TaskAssignment.id)
+                ):
+                    assignees.setdefault(task_id, []).append(reviewer_id)
+
+            for task in tasks:
+                self._notify(rule, task, assignees.get(task.id, ()), now)
+                self._mark(db, rule, task.id, now)
+        return len(tasks)
+
+    def _notify(self, rule, task, assignees, now):
+        hours = int((now - task.created_at).total_seconds() // 3600)
+        progress = f"✅ {task.approve_count}/{Config.REQUIRED_APPROVALS}, ❌ {task.reject_count}"
+        for target, chat_id in self._recipients(rule, task, assignees):
+            if target == 'author':
+                self._send(rule, task.id, target, chat_id,
+                           f"⏰ Ваша задача #{task.id} ждет ревью {hours} ч\n\n"
+                           f"Описание: {task.description}\n"
+                           f"Статус: {progress}")
+            elif target == 'assignee':
+                self._send(rule, task.id, target, chat_id,
+                           f"⏰ Напоминание: задача #{task.id} ждет вашего ревью {hours} ч\n\n"
+                           f"Автор: {task.creator}\n"
+                           f"Описание: {task.description}\n"
+                           f"YouTrack: {task.youtrack_url}\n"
+                           f"Статус: {progress}",
+                           inline_keyboard_markup=self.keyboards.get_task_keyboard(task.id))
+            else:
+                self._send(rule, task.id, target, chat_id,
+                           f"⏰ Задача #{task.id} ждет ревью {hours} ч\n\n"
+                           f"Автор: {task.creator}\n"
+                           f"Описание: {task.description}\n"
+                           f"YouTrack: {task.youtrack_url}\n"
+                           f"Статус: {progress}")
+
+    @staticmethod
+    def _recipients(rule, task, assignees):
+        """
+        (цель, chat_id) напоминания. Если по правилу получателей нет
+        (никто не назначен, группа не настроена), напоминание уходит в
+        группу, а без нее - автору: отметка в sla_reminders всегда
+        означает хотя бы одно отправленное сообщение.
+        """
+        recipients = []
+        if 'author' in rule.notify:
+            recipients.append(('author', task.user_id))
+        if 'assignees' in rule.notify:
+            recipients += [('assignee', reviewer_id) for reviewer_id in assignees]
+        if 'group' in rule.notify and Config.GROUP_CHAT_ID:
+            recipients.append(('group', Config.GROUP_CHAT_ID))
+        if not recipients:
+            recipients.append(('group', Config.GROUP_CHAT_ID) if Config.GROUP_CHAT_ID else ('author', task.user_id))
+        return recipients
+
+    def _send(self, rule, task_id, target, chat_id, text, **kwargs):
+        self.outbox.notify(chat_id=chat_id, text=text, **kwargs)
+        if self.audit:
+            self.audit.notification(task_id, f"sla_{rule.name}_{target}", chat_id)
+
+    def _mark(self, db, rule, task_id, now):
+        updated = db.execute(
+            update(SlaReminder).where(
+                SlaReminder.task_id == task_id,
+                SlaReminder.rule == rule.name
+            ).values(sent_at=now, sent_count=SlaReminder.sent_count + 1)
+        ).rowcount
+        if not updated:
+            db.add(SlaReminder(task_id=task_id, rule=rule.name, sent_at=now))
@@ -0,0 +1,240 @@
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, true, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from bot.models.task import Task
+from bot.models.vote import ReviewVote, VERDICT_APPROVE
+from bot.models.archive import ArchivedTask, ArchivedVote
+from bot.models.stats import ReviewerStats, AuthorStats, WeeklyStats, TurnaroundStats
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин времени до завершения, секунд
+TURNAROUND_BUCKETS = tuple(hours * 3600 for hours in (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720))
+TURNAROUND_OVERFLOW = 0
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def week_start(moment):
+    """Понедельник недели, к которой относится moment"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+
+def turnaround_bucket(seconds):
+    index = bisect_left(TURNAROUND_BUCKETS, seconds)
+    return TURNAROUND_BUCKETS[index] if index < len(TURNAROUND_BUCKETS) else TURNAROUND_OVERFLOW
+
+
+def format_turnaround(bound):
+    """Граница корзины для отчета: "до 8 ч", "до 3 дн." """
+    if bound is None:
+        return f"больше {TURNAROUND_BUCKETS[-1] // 86400} дн."
+    hours = bound // 3600
+    return f"до {hours} ч" if hours < 48 else f"до {hours // 24} дн."
+
+
+class StatsService:
+    """
+    Статистика ревью по агрегатным таблицам.
+
+    Счетчики обновляются в транзакции того же события, что и сами
+    данные (создание, голос, завершение, снятие), поэтому отчеты
+    читают только небольшие агрегаты и не сканируют tasks/review_votes.
+    rebuild() пересчитывает агрегаты из исходных данных (включая архив)
+    и сообщает о расхождениях.
+    """
+
+    # Обновление
+
+    def task_created(self, db, task):
+        self._add(db, AuthorStats, {'author_id': task.user_id}, open_tasks=1)
+        self._add(db, WeeklyStats, {'week_start': week_start(task.created_at or datetime.now())}, created=1)
+
+    def vote_recorded(self, db, result, reviewer_id):
+        """Засчитанный голос (VoteResult) и завершение/снятие задачи им"""
+        if result.verdict == VERDICT_APPROVE:
+            self._add(db, ReviewerStats, {'reviewer_id': reviewer_id}, approvals=1)
+        else:
+            self._add(db, ReviewerStats, {'reviewer_id': reviewer_id}, rejections=1)
+
+        if result.completed:
+            self._add(db, AuthorStats, {'author_id': result.author_id}, open_tasks=-1, completed=1)
+            self._add(db, WeeklyStats, {'week_start': week_start(result.closed_at)}, completed=1)
+            if result.created_at:
+                seconds = (result.closed_at - result.created_at).total_seconds()
+                self._add(db, TurnaroundStats, {'bucket': turnaround_bucket(seconds)}, count=1)
+        elif result.removed:
+            self._add(db, AuthorStats, {'author_id': result.author_id}, open_tasks=-1, removed=1)
+            self._add(db, WeeklyStats, {'week_start': week_start(result.closed_at)}, auto_removed=1)
+
+    def task_removed(self, db, task):
+        self._add(db, AuthorStats, {'author_id': task.user_id}, open_tasks=-1, removed=1)
+        self._add(db, WeeklyStats, {'week_start': week_start(task.removed_at or datetime.now())}, removed=1)
+
+    def _add(self, db, model, key, **deltas):
+        """value = value + delta для строки key, со вставкой при отсутствии"""
+        table = model.__table__
+        make_insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+        if make_insert is not None:
+            statement = make_insert(table).values(**key, **deltas)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: table.c[name] + statement.excluded[name] for name in deltas}
+            )
+            db.execute(statement)
+            return
+
+        condition = [table.c[name] == value for name, value in key.items()]
+        values = {name: table.c[name] + delta for name, delta in deltas.items()}
+        if not db.execute(update(table).where(*condition).values(values)).rowcount:
+            db.execute(table.insert().values(**key, **deltas))
+
+    # Чтение: строки колонок, а не объекты - их можно использовать после commit
+
+    def reviewer(self, db, reviewer_id):
+        return db.query(*_columns(ReviewerStats)).filter(ReviewerStats.reviewer_id == reviewer_id).first()
+
+    def author(self, db, author_id):
+        return db.query(*_columns(AuthorStats)).filter(AuthorStats.author_id == author_id).first()
+
+    def top_reviewers(self, db, limit=None):
+        total = ReviewerStats.approvals + ReviewerStats.rejections
+        return db.query(*_columns(ReviewerStats)).order_by(total.desc(), ReviewerStats.reviewer_id).limit(
+            limit or Config.STATS_TOP_LIMIT
+        ).all()
+
+    def backlog(self, db, limit=None):
+        """(всего открытых задач, авторы с наибольшим числом открытых)"""
+        total = db.query(func.coalesce(func.sum(AuthorStats.open_tasks), 0)).scalar()
+        authors = db.query(*_columns(AuthorStats)).filter(AuthorStats.open_tasks > 0).order_by(
+            AuthorStats.open_tasks.desc(), AuthorStats.author_id
+        ).limit(limit or Config.STATS_TOP_LIMIT).all()
+        return total, authors
+
+    def weeks(self, db, count=None):
+        """Последние count недель, от новых к старым"""
+        since = week_start(datetime.now()) - timedelta(weeks=(count or Config.STATS_REPORT_WEEKS) - 1)
+        return db.query(*_columns(WeeklyStats)).filter(WeeklyStats.week_start >= since).order_by(
+            WeeklyStats.week_start.desc()
+        ).all()
+
+    def median_turnaround(self, db):
+        """(верхняя граница корзины медианы в секундах или None, число задач)"""
+        counts = dict(db.query(TurnaroundStats.bucket, TurnaroundStats.count).all())
+        total = sum(counts.values())
+        if not total:
+            return None, 0
+        cumulative = 0
+        for bound in TURNAROUND_BUCKETS + (TURNAROUND_OVERFLOW,):
+            cumulative += counts.get(bound, 0)
+            if cumulative * 2 >= total:
+                return (bound or None), total
+        return None, total
+
+    # Пересчет
+
+    def rebuild(self, db, apply=True):
+        """
+        Пересчитывает агрегаты из tasks, review_votes и архива.
+        Возвращает список расхождений с текущими значениями; при apply
+        агрегаты заменяются пересчитанными (фиксирует вызывающий код).
+        """
+        expected = compute_stats(db)
+        differences = []
+        for model, rows in expected.items():
+            current = _read_table(db, model)
+            for key in sorted(set(rows) | set(current), key=str):
+                want = rows.get(key, {})
+                have = current.get(key, {})
+                for column in sorted(set(want) | set(have)):
+                    if want.get(column, 0) != have.get(column, 0):
+                        differences.append(
+                            f"{model.__tablename__}[{key}].{column}: {have.get(column, 0)} -> {want.get(column, 0)}"
+                        )
+
+        if apply:
+            for model, rows in expected.items():
+                db.execute(delete(model))
+                key_name = _key_column(model).name
+                if rows:
+                    db.execute(model.__table__.insert(), [
+                        {key_name: key, **values} for key, values in rows.items()
+                    ])
+        return differences
+
+
+def _columns(model):
+    return model.__table__.columns.values()
+
+
+def _key_column(model):
+    return model.__table__.primary_key.columns.values()[0]
+
+
+def _read_table(db, model):
+    key = _key_column(model)
+    columns = [column for column in model.__table__.columns if column is not key]
+    return {
+        row[0]: {column.name: value for column, value in zip(columns, row[1:])}
+        for row in db.execute(select(key, *columns))
+    }
+
+
+def compute_stats(db):
+    """Агрегаты из исходных данных: {модель: {ключ: {колонка: значение}}}"""
+    reviewers = defaultdict(lambda: {'approvals': 0, 'rejections': 0})
+    authors = defaultdict(lambda: {'open_tasks': 0, 'completed': 0, 'removed': 0})
+    weeks = defaultdict(lambda: {'created': 0, 'completed': 0, 'removed': 0, 'auto_removed': 0})
+    turnaround = defaultdict(lambda: {'count': 0})
+
+    votes = union_all(
+        select(ReviewVote.reviewer_id, ReviewVote.verdict),
+        select(ArchivedVote.reviewer_id, ArchivedVote.verdict)
+    ).subquery()
+    for reviewer_id, verdict, count in db.execute(
+        select(votes.c.reviewer_id, votes.c.verdict, func.count()).group_by(votes.c.reviewer_id, votes.c.verdict)
+    ):
+        reviewers[reviewer_id]['approvals' if verdict == VERDICT_APPROVE else 'rejections'] += count
+
+    columns = ('user_id', 'status', 'reject_count', 'created_at', 'completed_at', 'removed_at')
+    tasks = union_all(
+        select(*(getattr(Task, name) for name in columns)),
+        select(
+            ArchivedTask.user_id, true().label('status'),
+            *(getattr(ArchivedTask, name) for name in columns[2:])
+        )
+    ).subquery()
+    rows = db.execute(select(tasks).execution_options(yield_per=Config.DIGEST_BATCH_SIZE))
+    for user_id, status, reject_count, created_at, completed_at, removed_at in rows:
+        author = authors[user_id]
+        if created_at:
+            weeks[week_start(created_at)]['created'] += 1
+        if removed_at:
+            author['removed'] += 1
+            auto = (reject_count or 0) >= Config.MAX_REJECTIONS
+            weeks[week_start(removed_at)]['auto_removed' if auto else 'removed'] += 1
+        elif completed_at:
+            author['completed'] += 1
+            weeks[week_start(completed_at)]['completed'] += 1
+            if created_at:
+                bucket = turnaround_bucket((completed_at - created_at).total_seconds())
+                turnaround[bucket]['count'] += 1
+        elif not status:
+            author['open_tasks'] += 1
+        else:
+            # Закрыта до появления completed_at/removed_at - учитывается как завершенная
+            author['completed'] += 1
+
+    return {
+        ReviewerStats: dict(reviewers),
+        AuthorStats: dict(authors),
+        WeeklyStats: dict(weeks),
+        TurnaroundStats: dict(turnaround),
+    }
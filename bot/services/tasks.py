@@ -1,14 +1,61 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, literal, select, union
+from sqlalchemy.exc import IntegrityError
 
 from bot.models.task import Task
+from bot.models.vote import ReviewVote, VERDICT_APPROVE, VERDICT_REJECT
 from database.manager import DatabaseManager
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class VoteResult:
+    """Состояние задачи после попытки голосования"""
+    task_id: int
+    verdict: str
+    recorded: bool  # Голос засчитан
+    duplicate: bool = False  # Пользователь уже голосовал за задачу
+    closed: bool = False  # Задача уже завершена или снята
+    completed: bool = False  # Этот голос завершил задачу
+    removed: bool = False  # Этот голос снял задачу по лимиту отклонений
+    approve_count: int = 0
+    reject_count: int = 0
+    author_id: str = None
+    creator: str = None
+    description: str = None
+    youtrack_url: str = None
+    created_at: datetime = None
+    closed_at: datetime = None  # completed_at или removed_at, если задачу закрыл этот голос
+    approvers: List[str] = field(default_factory=list)  # Заполняется при completed/removed
+    rejecters: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TaskPage:
+    """Страница списка задач при keyset-пагинации по Task.id"""
+    items: List[Tuple]  # Строки с выбранными колонками, по возрастанию id
+    prev_cursor: Optional[int] = None  # id для перехода назад, если есть предыдущая страница
+    next_cursor: Optional[int] = None  # id для перехода вперед, если есть следующая страница
+
+
 class TaskService:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db_manager=None, reviewable_cache=None, audit=None, stats=None, assigner=None):
+        self.db = db_manager or DatabaseManager()
+        # ReviewableCache: списки "Провести ревью" без запроса к БД на каждое нажатие
+        self.reviewable_cache = reviewable_cache
+        # AuditLog: журнал создания, голосов и снятия задач
+        self.audit = audit
+        # StatsService: агрегаты статистики в той же транзакции
+        self.stats = stats
+        # ReviewerAssigner: закрытие назначений ревьюеров голосом или снятием задачи
+        self.assigner = assigner
 
     def create_task(self, db_session, task_data):
         """Создает задачу с проверкой данных"""
@@ -16,24 +63,83 @@ class TaskService:
             if not task_data.get('creator'):
                 task_data['creator'] = 'Unknown'  # Значение по умолчанию
 
-            task = Task(**task_data)
-            db_session.add(task)
-            db_session.commit()
+            # Точка сохранения: при ошибке откатывается только создание задачи,
+            # остальные изменения события остаются
+            with db_session.begin_nested():
+                task = Task(**task_data)
+                db_session.add(task)
+                db_session.flush()  # Получаем id; фиксирует транзакцию вызывающий код
+                if self.reviewable_cache:
+                    self.reviewable_cache.task_created(
+                        db_session, task.id, task.user_id,
+                        (task.description or '')[:Config.TASK_TITLE_LENGTH]
+                    )
+                if self.audit:
+                    self.audit.task_created(task)
+                if self.stats:
+                    self.stats.task_created(db_session, task)
             return task
 
         except Exception as e:
-            db_session.rollback()
-            logger.error(f"Ошибка создания задачи: {str(e)}")
+            logger.error("Ошибка создания задачи: %s", e)
             raise
 
 
-    def get_pending_tasks(self):
-        try:
-            with self.db.session() as session:
-                return session.query(Task).filter_by(status=False).all()
-        except Exception as e:
-            logger.error(f"Error getting tasks: {str(e)}")
-            return []
+    def get_pending_tasks(self, db):
+        """Все открытые задачи"""
+        return db.query(Task).filter_by(status=False).all()
+
+    def iter_pending_digest(self, batch_size=None):
+        """
+        Открытые задачи для дайджеста: только нужные колонки,
+        строки читаются с сервера пачками по batch_size.
+        """
+        query = select(
+            Task.id, Task.creator, Task.description, Task.youtrack_url, Task.confluence_url
+        ).where(Task.status == False).order_by(Task.id).execution_options(
+            yield_per=batch_size or Config.DIGEST_BATCH_SIZE
+        )
+        with self.db.session() as session:
+            yield from session.execute(query)
+
+    def iter_reviewer_digest(self, batch_size=None, reviewers=None):
+        """
+        Пары (reviewer_id, задача) для персональных дайджестов одним запросом:
+        каждому участнику - открытые чужие задачи, за которые он еще не
+        голосовал (правила get_reviewable_tasks). Участники - постоянные
+        ревьюеры (reviewers, по умолчанию Config.REVIEWERS), все, кто
+        голосовал, и авторы открытых задач. Строки упорядочены по reviewer_id.
+        """
+        reviewers = Config.REVIEWERS if reviewers is None else reviewers
+        members = union(
+            select(ReviewVote.reviewer_id.label('user_id')),
+            select(Task.user_id.label('user_id')).where(Task.status == False),
+            *(select(literal(reviewer_id).label('user_id')) for reviewer_id in reviewers)
+        ).subquery('members')
+        voted = select(ReviewVote.id).where(
+            ReviewVote.task_id == Task.id,
+            ReviewVote.reviewer_id == members.c.user_id
+        ).exists()
+
+        query = select(
+            members.c.user_id.label('reviewer_id'), Task.id, self._title_column()
+        ).join(
+            Task, and_(Task.status == False, Task.user_id != members.c.user_id)
+        ).where(~voted).order_by(members.c.user_id, Task.id).execution_options(
+            yield_per=batch_size or Config.DIGEST_BATCH_SIZE
+        )
+        with self.db.session() as session:
+            yield from session.execute(query)
+
+    def iter_author_digest(self, batch_size=None):
+        """Открытые задачи со счетчиками голосов, упорядоченные по автору"""
+        query = select(
+            Task.user_id, Task.id, self._title_column(), Task.approve_count, Task.reject_count
+        ).where(Task.status == False).order_by(Task.user_id, Task.id).execution_options(
+            yield_per=batch_size or Config.DIGEST_BATCH_SIZE
+        )
+        with self.db.session() as session:
+            yield from session.execute(query)
 
     def get_user_tasks(self, db, user_id):
         """Получает все задачи пользователя"""
@@ -44,19 +150,286 @@ class TaskService:
 
     def get_reviewable_tasks(self, db, user_id):
         """Получает задачи для ревью, исключая свои и отклоненные/одобренные пользователем"""
+        # Анти-join по индексу ix_review_votes_reviewer_task
+        voted = db.query(ReviewVote.id).filter(
+            ReviewVote.task_id == Task.id,
+            ReviewVote.reviewer_id == user_id
+        ).exists()
+
         return db.query(Task).filter(
             Task.status == False,
             Task.user_id != user_id,
-            ~Task.rejected_by.contains([user_id]),  # Исключаем отклоненные пользователем
-            ~Task.approved_by.contains([user_id])   # Исключаем уже одобренные
+            ~voted
         ).all()
 
+    def get_reviewable_page(self, db, user_id, cursor=None, direction='next'):
+        """Страница задач для ревью: id и начало описания"""
+        if self.reviewable_cache:
+            rows = self.reviewable_cache.get(user_id, lambda: self._load_reviewable(user_id))
+            return self._paginate_rows(rows, cursor, direction)
+        return self._paginate(self._reviewable_query(db, user_id), cursor, direction)
+
+    def _reviewable_query(self, db, user_id):
+        voted = db.query(ReviewVote.id).filter(
+            ReviewVote.task_id == Task.id,
+            ReviewVote.reviewer_id == user_id
+        ).exists()
+
+        return db.query(Task.id, self._title_column()).filter(
+            Task.status == False,
+            Task.user_id != user_id,
+            ~voted
+        )
+
+    def _load_reviewable(self, user_id):
+        """
+        Полный список для кеша. Читается отдельной сессией: снимок
+        транзакции события мог начаться раньше регистрации загрузки
+        в кеше и не увидеть уже примененные к нему изменения.
+        """
+        with self.db.session() as session:
+            return self._reviewable_query(session, user_id).order_by(Task.id).all()
+
+    def get_user_tasks_page(self, db, user_id, cursor=None, direction='next'):
+        """Страница открытых задач автора: id, начало описания и счетчики голосов"""
+        query = db.query(
+            Task.id, self._title_column(), Task.approve_count, Task.reject_count
+        ).filter(
+            Task.user_id == user_id,
+            Task.status == False
+        )
+        return self._paginate(query, cursor, direction)
+
+    def _title_column(self):
+        return func.substr(Task.description, 1, Config.TASK_TITLE_LENGTH).label('title')
+
+    def _paginate(self, query, cursor, direction):
+        """
+        Keyset-пагинация по Task.id: WHERE id > cursor ORDER BY id LIMIT n
+        (или id < cursor в обратную сторону). Одна лишняя строка
+        показывает, есть ли следующая страница.
+        """
+        limit = Config.TASKS_PAGE_SIZE
+        backwards = direction == 'prev' and cursor is not None
+
+        if backwards:
+            query = query.filter(Task.id < cursor).order_by(Task.id.desc())
+        else:
+            if cursor is not None:
+                query = query.filter(Task.id > cursor)
+            query = query.order_by(Task.id)
+
+        rows = query.limit(limit + 1).all()
+        return self._page(rows, cursor, backwards)
+
+    def _paginate_rows(self, rows, cursor, direction):
+        """То же, что _paginate, по списку строк в памяти (по возрастанию id)"""
+        limit = Config.TASKS_PAGE_SIZE
+        backwards = direction == 'prev' and cursor is not None
+        ids = [row.id for row in rows]  # bisect с key= есть только с Python 3.10
+
+        if backwards:
+            end = bisect_left(ids, cursor)
+            rows = list(reversed(rows[max(end - limit - 1, 0):end]))
+        else:
+            start = 0
+            if cursor is not None:
+                start = bisect_right(ids, cursor)
+            rows = list(rows[start:start + limit + 1])
+        return self._page(rows, cursor, backwards)
+
+    def _page(self, rows, cursor, backwards):
+        """TaskPage из limit + 1 строк в порядке выборки"""
+        limit = Config.TASKS_PAGE_SIZE
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if backwards:
+            rows.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = cursor is not None, has_more
+
+        if not rows:
+            return TaskPage(items=[])
+
+        return TaskPage(
+            items=rows,
+            prev_cursor=rows[0].id if has_prev else None,
+            next_cursor=rows[-1].id if has_next else None
+        )
+
     def get_task(self, db, task_id):
-        return db.query(Task).filter()
+        """Задача из живой таблицы; с учетом архива - TaskArchive.get_task"""
+        return db.query(Task).filter(Task.id == task_id).first()
 
     def get_task_for_removal(self, db, task_id, user_id):
-        """Получает задачу для снятия с проверкой владельца"""
+        """Получает открытую задачу для снятия с проверкой владельца"""
         return db.query(Task).filter(
             Task.id == task_id,
-            Task.user_id == user_id
-        ).first()
\ No newline at end of file
+            Task.user_id == user_id,
+            Task.status == False
+        ).first()
+
+    def get_task_voters(self, db, task_id):
+        """Возвращает (одобрившие, отклонившие) в порядке голосования"""
+        votes = db.query(ReviewVote.reviewer_id, ReviewVote.verdict).filter(
+            ReviewVote.task_id == task_id
+        ).order_by(ReviewVote.created_at, ReviewVote.id).all()
+
+        approvers = [reviewer for reviewer, verdict in votes if verdict == VERDICT_APPROVE]
+        rejecters = [reviewer for reviewer, verdict in votes if verdict == VERDICT_REJECT]
+        return approvers, rejecters
+
+    def record_vote(self, db, task_id, reviewer_id, verdict, comment=None):
+        """
+        Атомарно записывает голос и обновляет счетчики/статус задачи
+        в транзакции db; фиксирует ее вызывающий код (event_session).
+
+        Строка задачи блокируется (SELECT ... FOR UPDATE), счетчики
+        пересчитываются из review_votes одним UPDATE, а смена статуса
+        выполняется условным UPDATE - так при одновременных голосах
+        задачу завершает ровно один из них.
+        """
+        task = db.query(Task).filter(Task.id == task_id).with_for_update().first()
+        if not task:
+            raise ValueError(f"Task {task_id} not found")
+
+        if task.status:
+            return VoteResult(task_id=task_id, verdict=verdict, recorded=False, closed=True)
+
+        if self._has_vote(db, task_id, reviewer_id):
+            result = self._vote_state(db, task_id, verdict, recorded=False)
+            result.duplicate = True
+            return result
+
+        # Конфликт откатывает только точку сохранения, а не всю транзакцию события
+        savepoint = db.begin_nested()
+        try:
+            db.add(ReviewVote(
+                task_id=task_id,
+                reviewer_id=reviewer_id,
+                verdict=verdict,
+                comment=comment
+            ))
+            db.flush()
+        except IntegrityError:
+            # Голос пришел параллельно (другая реплика)
+            savepoint.rollback()
+            result = self._vote_state(db, task_id, verdict, recorded=False)
+            result.duplicate = True
+            return result
+
+        counters = {
+            Task.approve_count: self._vote_count_subquery(db, VERDICT_APPROVE),
+            Task.reject_count: self._vote_count_subquery(db, VERDICT_REJECT)
+        }
+        updated = db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == False
+        ).update(counters, synchronize_session=False)
+
+        if not updated:
+            # Задачу закрыли или удалили параллельно - голос не сохраняется
+            savepoint.rollback()
+            return VoteResult(task_id=task_id, verdict=verdict, recorded=False, closed=True)
+        savepoint.commit()
+
+        result = self._vote_state(db, task_id, verdict, recorded=True)
+
+        now = datetime.now()
+        if verdict == VERDICT_APPROVE and result.approve_count >= Config.REQUIRED_APPROVALS:
+            result.completed = bool(db.query(Task).filter(
+                Task.id == task_id,
+                Task.status == False
+            ).update(
+                {Task.status: True, Task.completed_at: now},
+                synchronize_session=False
+            ))
+        elif verdict == VERDICT_REJECT and result.reject_count >= Config.MAX_REJECTIONS:
+            result.removed = self._close_removed(db, task_id, now)
+
+        if result.completed or result.removed:
+            result.closed_at = now
+            result.approvers, result.rejecters = self.get_task_voters(db, task_id)
+
+        if self.reviewable_cache:
+            if result.completed or result.removed:
+                self.reviewable_cache.task_closed(db, task_id)
+            else:
+                self.reviewable_cache.task_voted(db, task_id, reviewer_id)
+        if self.audit:
+            self.audit.vote(result, reviewer_id)
+        if self.stats:
+            self.stats.vote_recorded(db, result, reviewer_id)
+        if self.assigner:
+            self.assigner.vote_recorded(db, result, reviewer_id)
+
+        return result
+
+    def _has_vote(self, db, task_id, reviewer_id):
+        return db.query(
+            db.query(ReviewVote.id).filter(
+                ReviewVote.reviewer_id == reviewer_id,
+                ReviewVote.task_id == task_id
+            ).exists()
+        ).scalar()
+
+    def _vote_count_subquery(self, db, verdict):
+        return db.query(func.count(ReviewVote.id)).filter(
+            ReviewVote.task_id == Task.id,
+            ReviewVote.verdict == verdict
+        ).scalar_subquery()
+
+    def _vote_state(self, db, task_id, verdict, recorded):
+        """Читает актуальные счетчики задачи минуя identity map сессии"""
+        row = db.query(
+            Task.approve_count, Task.reject_count, Task.status,
+            Task.user_id, Task.creator, Task.description, Task.youtrack_url, Task.created_at
+        ).filter(Task.id == task_id).first()
+
+        if not row:
+            return VoteResult(task_id=task_id, verdict=verdict, recorded=False, closed=True)
+
+        return VoteResult(
+            task_id=task_id,
+            verdict=verdict,
+            recorded=recorded,
+            closed=bool(row.status),
+            approve_count=row.approve_count or 0,
+            reject_count=row.reject_count or 0,
+            author_id=row.user_id,
+            creator=row.creator,
+            description=row.description,
+            youtrack_url=row.youtrack_url,
+            created_at=row.created_at
+        )
+
+    def _close_removed(self, db, task_id, removed_at):
+        """
+        Снимает открытую задачу: строка и голоса остаются в tasks до
+        переноса архиватором (TaskArchive). False, если задача уже закрыта.
+        """
+        return bool(db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == False
+        ).update(
+            {Task.status: True, Task.removed_at: removed_at},
+            synchronize_session=False
+        ))
+
+    def remove_task(self, db, task):
+        """Снимает задачу с ревью по решению автора; False, если она уже закрыта"""
+        removed_at = datetime.now()
+        if not self._close_removed(db, task.id, removed_at):
+            return False
+        task.removed_at = removed_at
+        if self.reviewable_cache:
+            self.reviewable_cache.task_closed(db, task.id)
+        if self.audit:
+            self.audit.task_removed(task, task.user_id)
+        if self.stats:
+            self.stats.task_removed(db, task)
+        if self.assigner:
+            self.assigner.task_closed(db, task.id)
+        return True
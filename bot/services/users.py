@@ -0,0 +1,90 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.utils.cache import TTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_NOT_FOUND = object()
+
+
+class UserDirectory:
+    """
+    Общий для процесса справочник имен пользователей.
+
+    Имена кешируются в LRU с TTL, неудачные запросы кешируются
+    отдельно на NEGATIVE_TTL, чтобы не повторять их на каждом событии.
+    Кеш бесплатно прогревается данными 'from' из входящих событий.
+    """
+
+    def __init__(self, api, max_size=None, ttl=None, negative_ttl=None, workers=None):
+        self.api = api
+        self.negative_ttl = negative_ttl or Config.USER_DIRECTORY_NEGATIVE_TTL
+        self._cache = TTLCache(
+            max_size=max_size or Config.USER_DIRECTORY_MAX_SIZE,
+            ttl=ttl or Config.USER_DIRECTORY_TTL
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or Config.USER_DIRECTORY_FETCH_WORKERS,
+            thread_name_prefix='user-directory'
+        )
+
+    @staticmethod
+    def format_name(user_data):
+        first_name = (user_data.get('firstName') or '').strip()
+        last_name = (user_data.get('lastName') or '').strip()
+        return f"{first_name} {last_name}".strip()
+
+    def remember(self, user_data):
+        """Запоминает имя из payload события ('from')"""
+        if not user_data or not user_data.get('userId'):
+            return
+        name = self.format_name(user_data)
+        if name:
+            self._cache.set(user_data['userId'], name)
+
+    def resolve(self, user_id):
+        """Возвращает имя пользователя или его ID, если имя неизвестно"""
+        return self.resolve_many([user_id])[user_id]
+
+    def resolve_many(self, user_ids):
+        """
+        Возвращает {user_id: имя} для всех user_ids.
+        Отсутствующие в кеше имена запрашиваются параллельно.
+        """
+        names = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            name = self._cache.get(user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = user_id if name is _NOT_FOUND else name
+
+        if missing:
+            for user_id, name in zip(missing, self._executor.map(self._fetch, missing)):
+                names[user_id] = name
+
+        return names
+
+    def _fetch(self, user_id):
+        try:
+            user_info = self.api.get_chat_info(chat_id=user_id)
+            name = self.format_name(user_info) if user_info.get('ok', True) else ''
+        except Exception as e:
+            logger.warning("Failed to get user info for %s: %s", user_id, e)
+            name = ''
+
+        if name:
+            self._cache.set(user_id, name)
+            return name
+
+        self._cache.set(user_id, _NOT_FOUND, ttl=self.negative_ttl)
+        return user_id
+
+    def stats(self):
+        return self._cache.stats()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
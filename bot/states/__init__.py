@@ -1,3 +1,9 @@
 from .user import UserStateManager
+from .backends import (
+    StateBackend, MemoryStateBackend, SqlStateBackend, RedisStateBackend, create_state_backend
+)
 
-__all__ = ['UserStateManager']
\ No newline at end of file
+__all__ = [
+    'UserStateManager', 'StateBackend', 'MemoryStateBackend',
+    'SqlStateBackend', 'RedisStateBackend', 'create_state_backend'
+]
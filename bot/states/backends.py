@@ -0,0 +1,210 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from bot.models.state import UserState
+from bot.utils.cache import TTLCache
+from database.manager import DatabaseManager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def encode_state(state):
+    """Компактная запись состояния: короткие ключи, без пробелов"""
+    return json.dumps(
+        {'s': state['step'], 'd': state['data'], 'c': state.get('chat_id')},
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+
+def decode_state(payload):
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    record = json.loads(payload)
+    return {'step': record['s'], 'data': record['d'], 'chat_id': record.get('c')}
+
+
+class StateBackend:
+    """Интерфейс хранилища состояний диалога пользователя"""
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def set(self, user_id, state):
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def sweep(self):
+        """Удаляет просроченные состояния, возвращает их количество"""
+        return 0
+
+    def stats(self):
+        """
+        Метрики хранилища: live - число живых состояний,
+        evictions - удаленные по TTL/размеру
+        """
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """Состояния в памяти процесса с TTL и ограничением размера"""
+
+    def __init__(self, ttl=None, max_size=None):
+        self._cache = TTLCache(
+            max_size=max_size or Config.STATE_MAX_SIZE,
+            ttl=ttl or Config.STATE_TTL
+        )
+
+    def get(self, user_id):
+        payload = self._cache.get(user_id)
+        return decode_state(payload) if payload else None
+
+    def set(self, user_id, state):
+        self._cache.set(user_id, encode_state(state))
+
+    def delete(self, user_id):
+        self._cache.pop(user_id)
+
+    def sweep(self):
+        return self._cache.sweep()
+
+    def stats(self):
+        stats = self._cache.stats()
+        return {'live': stats['size'], 'evictions': stats['evictions'] + stats['expirations']}
+
+
+class SqlStateBackend(StateBackend):
+    """
+    Состояния в таблице user_states общей БД.
+    Переживают перезапуск и доступны всем репликам бота.
+    """
+
+    def __init__(self, db_manager, ttl=None):
+        self.db = db_manager
+        self.ttl = ttl or Config.STATE_TTL
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get(self, user_id):
+        self._maybe_sweep()
+        with self.db.session_scope() as db:
+            row = db.query(UserState.payload, UserState.expires_at).filter(
+                UserState.user_id == user_id
+            ).first()
+        if not row:
+            return None
+        if row.expires_at <= datetime.now():
+            self.delete(user_id)
+            self._count_evictions(1)
+            return None
+        return decode_state(row.payload)
+
+    def set(self, user_id, state):
+        with self.db.session_scope() as db:
+            db.merge(UserState(
+                user_id=user_id,
+                payload=encode_state(state),
+                expires_at=datetime.now() + timedelta(seconds=self.ttl)
+            ))
+
+    def delete(self, user_id):
+        with self.db.session_scope() as db:
+            db.query(UserState).filter(UserState.user_id == user_id).delete(synchronize_session=False)
+
+    def sweep(self):
+        """Удаляет просроченные состояния одним запросом по индексу expires_at"""
+        with self.db.session_scope() as db:
+            removed = db.query(UserState).filter(
+                UserState.expires_at <= datetime.now()
+            ).delete(synchronize_session=False)
+        self._count_evictions(removed)
+        return removed
+
+    def stats(self):
+        with self.db.session_scope() as db:
+            live = db.query(func.count(UserState.user_id)).filter(
+                UserState.expires_at > datetime.now()
+            ).scalar()
+        with self._lock:
+            return {'live': live, 'evictions': self._evictions}
+
+    def _maybe_sweep(self):
+        with self._lock:
+            if time.monotonic() - self._last_sweep < Config.STATE_SWEEP_INTERVAL:
+                return
+            self._last_sweep = time.monotonic()
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.error("State sweep failed: %s", e)
+
+    def _count_evictions(self, count):
+        with self._lock:
+            self._evictions += count
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Состояния в Redis (или совместимом по протоколу хранилище).
+    Истечение TTL выполняет сам сервер (SET ... EX). Для live рядом
+    ведется sorted set user_id -> время истечения: ZCOUNT по нему
+    не требует обхода ключей (SCAN). evictions берутся из INFO stats
+    (expired_keys + evicted_keys) и относятся ко всему серверу Redis.
+    """
+
+    def __init__(self, client, ttl=None, prefix='review-bot:state:'):
+        self.client = client
+        self.ttl = ttl or Config.STATE_TTL
+        self.prefix = prefix
+        self._index = f"{prefix}expires"
+
+    def get(self, user_id):
+        payload = self.client.get(self._key(user_id))
+        return decode_state(payload) if payload else None
+
+    def set(self, user_id, state):
+        self.client.set(self._key(user_id), encode_state(state), ex=self.ttl)
+        self.client.zadd(self._index, {user_id: time.time() + self.ttl})
+
+    def delete(self, user_id):
+        self.client.delete(self._key(user_id))
+        self.client.zrem(self._index, user_id)
+
+    def sweep(self):
+        """Убирает из индекса состояния, ключи которых уже истекли на сервере"""
+        return self.client.zremrangebyscore(self._index, '-inf', time.time())
+
+    def stats(self):
+        info = self.client.info('stats')
+        return {
+            'live': self.client.zcount(self._index, f"({time.time()}", '+inf'),
+            'evictions': info.get('expired_keys', 0) + info.get('evicted_keys', 0)
+        }
+
+    def _key(self, user_id):
+        return f"{self.prefix}{user_id}"
+
+
+def create_state_backend(db_manager=None):
+    """Создает хранилище состояний по Config.STATE_BACKEND"""
+    backend = Config.STATE_BACKEND
+    if backend == 'memory':
+        return MemoryStateBackend()
+    if backend == 'sql':
+        return SqlStateBackend(db_manager or DatabaseManager())
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND = 'redis' requires the redis package")
+        return RedisStateBackend(redis.Redis.from_url(Config.REDIS_URL))
+    raise ValueError(f"Unknown state backend: {backend}")
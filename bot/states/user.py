@@ -1,31 +1,45 @@
 import logging
 
+from .backends import create_state_backend
+
 logger = logging.getLogger(__name__)
 
 
 class UserStateManager:
-    def __init__(self):
-        self.states = {}
+    """
+    Состояния пошагового диалога пользователей.
+    Хранение делегируется StateBackend (память, SQL или Redis).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_state_backend()
 
     def set_state(self, user_id, step, data=None):
-        self.states[user_id] = {
+        self.backend.set(user_id, {
             'step': step,
             'data': data or {},
             'chat_id': None
-        }
+        })
 
     def get_state(self, user_id):
-        return self.states.get(user_id)
+        return self.backend.get(user_id)
 
     def update_state(self, user_id, step=None, data=None):
-        if user_id not in self.states:
+        state = self.backend.get(user_id)
+        if not state:
             return
 
         if step:
-            self.states[user_id]['step'] = step
+            state['step'] = step
         if data:
-            self.states[user_id]['data'].update(data)
+            state['data'].update(data)
+        self.backend.set(user_id, state)
 
     def clear_state(self, user_id):
-        if user_id in self.states:
-            del self.states[user_id]
\ No newline at end of file
+        self.backend.delete(user_id)
+
+    def sweep(self):
+        return self.backend.sweep()
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,4 @@
+from .cache import TTLCache
+from .markdown import escape_markdown, escape_url, split_messages
+
+__all__ = ['TTLCache', 'escape_markdown', 'escape_url', 'split_messages']
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Потокобезопасный LRU-кеш с ограничением размера и временем жизни записей.
+
+    Просроченные записи удаляются лениво: при обращении к ним
+    и периодическим проходом sweep() не чаще раза в sweep_interval секунд.
+    """
+
+    def __init__(self, max_size, ttl, sweep_interval=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sweep_interval = ttl if sweep_interval is None else sweep_interval
+
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Вытеснены по размеру
+        self.expirations = 0  # Удалены по TTL
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._maybe_sweep()
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key, func):
+        """
+        Заменяет живое значение на func(value), не продлевая TTL.
+        Возвращает False, если записи нет или она просрочена.
+        """
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] <= time.monotonic():
+                return False
+            self._data[key] = (item[0], func(item[1]))
+            return True
+
+    def keys(self):
+        """Снимок ключей живых записей"""
+        return [key for key, _ in self.items()]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            if item is _MISSING or item[0] <= time.monotonic():
+                return default
+            return item[1]
+
+    def items(self):
+        """Снимок живых записей"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def sweep(self):
+        """Удаляет все просроченные записи, возвращает их количество"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+            self._last_sweep = now
+            return len(expired)
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
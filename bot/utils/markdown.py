@@ -0,0 +1,42 @@
+"""Форматирование текста сообщений в MarkdownV2"""
+from config import Config
+
+_SPECIAL_CHARS = set('_*[]()~`>#+-=|{}.!\\')
+_URL_SPECIAL_CHARS = set(')\\')
+
+
+def escape_markdown(text):
+    """Экранирует служебные символы MarkdownV2 в обычном тексте"""
+    return ''.join(f'\\{char}' if char in _SPECIAL_CHARS else char for char in str(text or ''))
+
+
+def escape_url(url):
+    """Экранирует URL внутри (...) ссылки MarkdownV2"""
+    return ''.join(f'\\{char}' if char in _URL_SPECIAL_CHARS else char for char in str(url or ''))
+
+
+def split_messages(blocks, header='', limit=None):
+    """
+    Склеивает блоки текста в сообщения не длиннее limit символов.
+    Блоки не разрываются (кроме единичного блока длиннее лимита);
+    header добавляется только в первое сообщение. Генератор: блоки
+    читаются по одному, в памяти держится только текущее сообщение.
+    """
+    limit = limit or Config.MAX_MESSAGE_LENGTH
+    parts = [header] if header else []
+    size = len(header)
+
+    for block in blocks:
+        if parts and size + len(block) > limit:
+            yield ''.join(parts)
+            parts, size = [], 0
+        while len(block) > limit:
+            # Не разрываем экранирующую пару "\x"
+            cut = limit - 1 if block[limit - 1] == '\\' else limit
+            yield block[:cut]
+            block = block[cut:]
+        parts.append(block)
+        size += len(block)
+
+    if parts and size:
+        yield ''.join(parts)
@@ -0,0 +1,282 @@
+"""
+Метрики процесса в формате Prometheus (text exposition 0.0.4).
+
+Гистограммы пишутся с горячего пути (маршруты callback, send_text,
+обработка событий, запросы к БД), остальное - снимки stats()
+компонентов, которые собираются только в момент запроса /metrics.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'review_bot'
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин и метками"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # значения меток -> [счетчики корзин..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def summary(self, quantile=0.95):
+        """{метки: (count, sum, квантиль)} - квантиль оценивается по границам корзин"""
+        with self._lock:
+            return {
+                key: (series[-1], series[-2], self._quantile(series, quantile))
+                for key, series in self._series.items()
+            }
+
+    def _quantile(self, series, quantile):
+        threshold = quantile * series[-1]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, series):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return bound
+        return float('inf')
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in sorted(self._series.items())]
+        for key, series in items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр гистограмм и источников stats().
+    Источник - функция без аргументов, возвращающая словарь чисел;
+    каждое значение публикуется как gauge <PREFIX>_<source>_<key>.
+    """
+
+    def __init__(self):
+        self._histograms = []
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        histogram = Histogram(f"{PREFIX}_{name}", help_text, labelnames, buckets)
+        with self._lock:
+            self._histograms.append(histogram)
+        return histogram
+
+    def register_source(self, name, stats_func):
+        with self._lock:
+            self._sources[name] = stats_func
+
+    def unregister_source(self, name):
+        with self._lock:
+            self._sources.pop(name, None)
+
+    def collect_sources(self):
+        with self._lock:
+            sources = list(self._sources.items())
+        collected = {}
+        for name, stats_func in sources:
+            try:
+                collected[name] = stats_func()
+            except Exception as e:
+                logger.warning("Metrics source %s failed: %s", name, e)
+        return collected
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = list(self._histograms)
+        for histogram in histograms:
+            lines.extend(histogram.render())
+
+        for source, stats in sorted(self.collect_sources().items()):
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{PREFIX}_{source}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+CALLBACK_LATENCY = REGISTRY.histogram(
+    'callback_route_seconds', "Callback handler latency by route", ('route',)
+)
+SEND_LATENCY = REGISTRY.histogram(
+    'send_text_seconds', "messages/sendText call latency by outcome", ('outcome',)
+)
+EVENT_LATENCY = REGISTRY.histogram(
+    'event_handle_seconds', "Event handler latency in dispatcher workers"
+)
+EVENT_DB_QUERIES = REGISTRY.histogram(
+    'event_db_queries', "DB queries per handled event", buckets=COUNT_BUCKETS
+)
+EVENT_DB_TIME = REGISTRY.histogram(
+    'event_db_seconds', "Total DB time per handled event"
+)
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    'db_query_seconds', "Single DB statement latency"
+)
+
+_event_scope = threading.local()
+
+
+@contextmanager
+def track_event():
+    """
+    Учитывает время обработки события и число/время запросов к БД,
+    выполненных в этом потоке за время обработки.
+    """
+    _event_scope.queries = 0
+    _event_scope.db_time = 0.0
+    _event_scope.active = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _event_scope.active = False
+        EVENT_LATENCY.observe(time.perf_counter() - started)
+        EVENT_DB_QUERIES.observe(_event_scope.queries)
+        EVENT_DB_TIME.observe(_event_scope.db_time)
+
+
+def instrument_engine(engine):
+    """Подключает счетчики запросов к событиям engine"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        elapsed = time.perf_counter() - started
+        DB_QUERY_LATENCY.observe(elapsed)
+        if getattr(_event_scope, 'active', False):
+            _event_scope.queries += 1
+            _event_scope.db_time += elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        # Запрос завершился ошибкой - after_cursor_execute не вызывается
+        if context.connection is not None:
+            stack = context.connection.info.get('query_started')
+            if stack:
+                stack.pop()
+
+
+def summary_line(registry=REGISTRY):
+    """Короткая сводка для периодического лога"""
+    parts = []
+    for name, histogram in (('event', EVENT_LATENCY), ('send', SEND_LATENCY)):
+        count = sum(c for c, _, _ in histogram.summary().values())
+        p95 = max((p for _, _, p in histogram.summary().values()), default=0)
+        parts.append(f"{name}s={count} {name}_p95<={_format_value(p95)}s")
+
+    queries = EVENT_DB_QUERIES.summary().get((), (0, 0, 0))
+    if queries[0]:
+        parts.append(f"db_queries/event={queries[1] / queries[0]:.1f}")
+
+    for source, stats in sorted(registry.collect_sources().items()):
+        if 'queue_depth' in stats:
+            parts.append(f"{source}_queue={stats['queue_depth']}")
+        if 'hit_ratio' in stats:
+            parts.append(f"{source}_hit_ratio={stats['hit_ratio']:.2f}")
+    return ' '.join(parts)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics " + format, *args)
+
+
+class MetricsServer:
+    """HTTP-эндпоинт /metrics в фоновом потоке"""
+
+    def __init__(self, host, port, registry=REGISTRY):
+        handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'registry': registry})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name='metrics-server',
+            daemon=True
+        )
+        self._thread.start()
+        logger.info("Metrics endpoint listening on port %s", self.port)
+
+    def stop(self):
+        if self._thread:
+            self._server.shutdown()
+            self._thread.join(1)
+            self._thread = None
+        self._server.server_close()
@@ -1,30 +1,117 @@
 import logging
+import os
 import sys
-import io
 
-# Фикс кодировки для Windows
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+from logging_setup import setup_logging
+
+# Фикс кодировки консоли для Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
 
 class Config:
     BOT_TOKEN = ""
     API_URL = ""
     DB_URL = "sqlite:///tasks.db"
+    DB_POOL_SIZE = 10  # Постоянные соединения в пуле (кроме SQLite)
+    DB_MAX_OVERFLOW = 20  # Дополнительные соединения при пиковой нагрузке
+    DB_POOL_RECYCLE = 1800  # Пересоздание соединения через N секунд
+    DB_POOL_PRE_PING = True  # Проверка соединения перед выдачей из пула
+    DB_AUTO_MIGRATE = True  # Применять миграции при старте (иначе - только migration.py)
+    DB_SQLITE_TIMEOUT = 30  # Ожидание блокировки записи SQLite, секунд
     LOGGING = True
-    LOG_LEVEL = logging.DEBUG
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FILE = os.environ.get('LOG_FILE', 'bot.log')  # Пустая строка - только консоль
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))  # Ротация файла
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    LOG_JSON = os.environ.get('LOG_JSON', '').lower() in ('1', 'true', 'yes')  # Строки JSON вместо текста
     GROUP_CHAT_ID = ""
     NOTIFICATION_TIME = "09:00"
     NOTIFICATION_TZ = "Europe/Moscow"
     NOTIFICATION_ENABLED = True
     REQUIRED_APPROVALS = 2  # Количество необходимых одобрений
     MAX_REJECTIONS = 3  # Максимальное количество отклонений перед снятием с ревью
+    TASKS_PAGE_SIZE = 10  # Задач на странице списка
+    TASK_TITLE_LENGTH = 30  # Длина описания задачи в списках
+    DISPATCHER_WORKERS = 8  # Потоки обработки событий
+    DISPATCHER_QUEUE_SIZE = 100  # Размер очереди событий на поток
+    DISPATCHER_PUT_TIMEOUT = 5  # Ожидание места в очереди, секунд
+    DISPATCHER_DRAIN_TIMEOUT = 30  # Ожидание обработки очереди при остановке, секунд
+    STATE_BACKEND = "memory"  # Хранилище состояний диалога: memory, sql, redis
+    STATE_TTL = 3600  # Время жизни незавершенного диалога, секунд
+    STATE_MAX_SIZE = 10000  # Лимит состояний в памяти (memory)
+    STATE_SWEEP_INTERVAL = 300  # Период очистки просроченных состояний, секунд
+    REDIS_URL = "redis://localhost:6379/0"
+    USER_DIRECTORY_MAX_SIZE = 5000  # Кеш имен пользователей
+    USER_DIRECTORY_TTL = 86400  # Время жизни имени в кеше, секунд
+    USER_DIRECTORY_NEGATIVE_TTL = 300  # Повторный запрос неизвестного пользователя, секунд
+    USER_DIRECTORY_FETCH_WORKERS = 8  # Параллельные запросы имен
+    OUTBOX_WORKERS = 4  # Потоки отправки сообщений
+    OUTBOX_GLOBAL_RATE = 20  # Сообщений в секунду на всего бота
+    OUTBOX_GLOBAL_BURST = 20
+    OUTBOX_CHAT_RATE = 1  # Сообщений в секунду в один чат
+    OUTBOX_CHAT_BURST = 5
+    OUTBOX_CHAT_BUSY_DELAY = 0.05  # Пауза, пока в чат уходит предыдущее сообщение
+    OUTBOX_MAX_TRACKED_CHATS = 10000  # Лимит хранимых per-chat ограничителей
+    OUTBOX_MAX_ATTEMPTS = 5  # Попыток отправки до dead-letter лога
+    OUTBOX_RETRY_BASE_DELAY = 1  # Первая задержка повтора, секунд
+    OUTBOX_RETRY_MAX_DELAY = 60
+    OUTBOX_DRAIN_TIMEOUT = 30  # Ожидание отправки очереди при остановке, секунд
+    SCHEDULER_WORKERS = 2  # Потоки выполнения заданий планировщика
+    SCHEDULER_DRAIN_TIMEOUT = 30  # Ожидание запущенных заданий при остановке, секунд
+    PERSONAL_DIGEST_ENABLED = True  # Личные дайджесты ревьюерам и авторам в NOTIFICATION_TIME
+    DIGEST_MAX_TASKS = 20  # Задач в личном дайджесте, остальные - счетчиком
+    DIGEST_BATCH_SIZE = 500  # Строк за одну выборку при формировании дайджеста
+    CALLBACK_DEDUP_WINDOW = 10  # Окно подавления повторного нажатия той же кнопки, секунд
+    CALLBACK_QUERY_TTL = 600  # Хранение queryId обработанных событий (повторная доставка), секунд
+    CALLBACK_DEDUP_MAX_SIZE = 10000  # Лимит ключей в каждом из кешей дедупликации
+    CALLBACK_ANSWER_LENGTH = 200  # Длина всплывающего ответа на повторное нажатие
+    AUDIT_BATCH_SIZE = 200  # Записей журнала действий в одном INSERT
+    AUDIT_FLUSH_INTERVAL = 2  # Максимальная задержка записи журнала, секунд
+    AUDIT_MAX_BUFFER = 50000  # Лимит записей в памяти при недоступной БД
+    AUDIT_PAGE_SIZE = 50  # Записей на странице истории задачи
+    ARCHIVE_AFTER_DAYS = 7  # Закрытые задачи старше N дней переносятся в архив
+    ARCHIVE_BATCH_SIZE = 500  # Задач в одной транзакции переноса
+    ARCHIVE_MAX_BATCHES = 20  # Пачек за один запуск
+    ARCHIVE_INTERVAL = 3600  # Период запуска архиватора, секунд
+    ASSIGNMENT_ENABLED = True  # Автоматическое назначение REQUIRED_APPROVALS ревьюеров на новую задачу
+    REVIEWERS = []  # userId постоянных ревьюеров; к ним добавляются недавно голосовавшие
+    ASSIGNMENT_ACTIVE_DAYS = 14  # Голосовавший за N дней считается активным ревьюером
+    ASSIGNMENT_REFRESH_INTERVAL = 300  # Перечитывание нагрузки ревьюеров из БД, секунд
+    SLA_ENABLED = True  # Напоминания по задачам, нарушившим правила SLA
+    SLA_CHECK_INTERVAL = 900  # Период проверки, секунд
+    SLA_BATCH_SIZE = 100  # Задач в одной транзакции проверки
+    # Правила: задача открыта дольше after_hours с момента создания и
+    # no_votes - без голосов / approvals - ровно столько одобрений.
+    # notify: author, assignees, group; repeat_hours - повтор напоминания
+    SLA_RULES = [
+        {'name': 'no_votes', 'after_hours': 24, 'no_votes': True, 'notify': ['assignees', 'author']},
+        {'name': 'partial_approval', 'after_hours': 48, 'approvals': 1, 'notify': ['assignees']},
+        {'name': 'stale', 'after_hours': 120, 'notify': ['group'], 'repeat_hours': 72},
+    ]
+    STATS_TOP_LIMIT = 10  # Ревьюеров и авторов в рейтингах отчета
+    STATS_REPORT_ENABLED = True  # Еженедельный отчет по статистике в групповой чат
+    STATS_REPORT_WEEKDAY = 0  # День отчета: 0 - понедельник ... 6 - воскресенье (NOTIFICATION_TZ)
+    STATS_REPORT_TIME = "10:00"
+    STATS_REPORT_WEEKS = 4  # Недель в отчете
+    REVIEW_CACHE_ENABLED = True  # Кеш списков "Провести ревью" с точечной инвалидацией
+    REVIEW_CACHE_MAX_SIZE = 5000  # Пользователей в кеше
+    REVIEW_CACHE_TTL = 600  # Время жизни списка, секунд
+    REVIEW_CACHE_CHANGE_FEED = False  # Лента изменений в БД для нескольких реплик бота
+    REVIEW_CACHE_FEED_INTERVAL = 2  # Период опроса ленты, секунд
+    REVIEW_CACHE_FEED_RETENTION = 3600  # Хранение событий ленты, секунд
+    REVIEW_CACHE_FEED_LOOKBACK = 200  # Событий ниже позиции, перечитываемых при опросе (поздний commit)
+    METRICS_ENABLED = True  # HTTP-эндпоинт /metrics в формате Prometheus
+    METRICS_HOST = "127.0.0.1"
+    METRICS_PORT = 9108
+    METRICS_LOG_INTERVAL = 0  # Период сводки метрик в лог, секунд (0 - выключено)
+    MAX_MESSAGE_LENGTH = 4096  # Лимит длины текста сообщения в API
 
-logging.basicConfig(
+setup_logging(
     level=Config.LOG_LEVEL,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("bot.log", encoding='utf-8')
-    ]
+    log_file=Config.LOG_FILE if Config.LOGGING else None,
+    max_bytes=Config.LOG_MAX_BYTES,
+    backup_count=Config.LOG_BACKUP_COUNT,
+    json_format=Config.LOG_JSON
 )
 logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -1,3 +1,4 @@
 from .manager import DatabaseManager
+from .migrations import MigrationRunner
 
-__all__ = ['DatabaseManager']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'MigrationRunner']
@@ -1,72 +1,208 @@
 # database/manager.py
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.orm import sessionmaker, scoped_session
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from database.migrations import MigrationRunner
+from bot.utils.metrics import instrument_engine
 from config import Config
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+_AFTER_COMMIT_KEY = 'after_commit_callbacks'
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session):
+    for _, callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        try:
+            callback()
+        except Exception as e:
+            logger.error("After-commit callback failed: %s", e, exc_info=True)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_after_commit(session, previous_transaction):
+    """
+    Rollback отменяет все callback'и, откат точки сохранения
+    (begin_nested) - только добавленные внутри нее.
+    """
+    if previous_transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_KEY, None)
+    elif previous_transaction.nested and _AFTER_COMMIT_KEY in session.info:
+        session.info[_AFTER_COMMIT_KEY] = [
+            (transaction, callback) for transaction, callback in session.info[_AFTER_COMMIT_KEY]
+            if not _inside(transaction, previous_transaction)
+        ]
+
+
+def _inside(transaction, savepoint):
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _begin_before_savepoint(conn, name):
+    """
+    pysqlite открывает транзакцию только перед первым изменением данных;
+    SAVEPOINT вне транзакции открыл бы собственную, и RELEASE
+    зафиксировал бы ее раньше commit события.
+    """
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql('BEGIN')
+
 
 class DatabaseManager:
+    """
+    Доступ к БД для всего процесса.
+    Engine, пул соединений и фабрика сессий создаются один раз
+    и разделяются всеми экземплярами DatabaseManager.
+    """
+
+    _engine = None
+    _session_factory = None
+    _lock = threading.Lock()
+    _event_scope = threading.local()
+
     def __init__(self):
-        self.engine = create_engine(Config.DB_URL)
-        self.Session = scoped_session(
-            sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self.engine
-            )
+        self.engine, self.Session = self._get_shared()
+
+    @classmethod
+    def _get_shared(cls):
+        if cls._engine is None:
+            with cls._lock:
+                if cls._engine is None:
+                    engine = create_engine(Config.DB_URL, **cls._engine_options())
+                    instrument_engine(engine)
+                    if engine.dialect.name == 'sqlite':
+                        event.listen(engine, 'savepoint', _begin_before_savepoint)
+                    cls._session_factory = scoped_session(
+                        sessionmaker(
+                            autocommit=False,
+                            autoflush=False,
+                            bind=engine
+                        )
+                    )
+                    cls._engine = engine
+                    logger.info("Database engine created")
+        return cls._engine, cls._session_factory
+
+    @staticmethod
+    def _engine_options():
+        """Параметры пула соединений из Config"""
+        options = {'pool_pre_ping': Config.DB_POOL_PRE_PING}
+
+        if Config.DB_URL.startswith('sqlite'):
+            # Соединения используются из потоков обработчиков
+            options['connect_args'] = {
+                'check_same_thread': False,
+                'timeout': Config.DB_SQLITE_TIMEOUT
+            }
+            return options
+
+        options.update(
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_recycle=Config.DB_POOL_RECYCLE
         )
-        logger.info("Database manager initialized")
-        self._check_and_upgrade_db()
+        return options
+
+    @classmethod
+    def setup(cls):
+        """
+        Инициализирует общий engine и приводит схему БД в актуальное состояние.
+        Вызывается один раз при старте процесса.
+        """
+        manager = cls()
+        if Config.DB_AUTO_MIGRATE:
+            manager.init_db()
+        else:
+            MigrationRunner(manager.engine).check()
+        return manager
+
+    @classmethod
+    def dispose(cls):
+        """Закрывает все соединения пула"""
+        with cls._lock:
+            if cls._engine is None:
+                return
+            cls._session_factory.remove()
+            cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
+            logger.info("Database engine disposed")
 
     def init_db(self):
-        """Основной метод инициализации базы данных"""
+        """Основной метод инициализации базы данных: применяет миграции"""
         try:
-            from bot.models.task import Base
-            Base.metadata.create_all(self.engine)
-            logger.info("Database tables created successfully")
+            MigrationRunner(self.engine).run()
         except Exception as e:
-            logger.error(f"Error initializing database: {str(e)}")
+            logger.error("Error initializing database: %s", e)
             raise
 
-    def _check_and_upgrade_db(self):
-        """Проверяет и обновляет структуру БД при необходимости"""
-        inspector = inspect(self.engine)
+    def session(self):
+        """Новая самостоятельная сессия (фоновые задания, скрипты)"""
+        return self.Session.session_factory()
+
+    @contextmanager
+    def event_session(self):
+        """
+        Сессия на время обработки одного события: одна на поток,
+        один commit (или rollback при ошибке) в конце, после чего
+        сессия удаляется из реестра scoped_session и соединение
+        возвращается в пул.
+        """
+        session = self.Session()
+        self._event_scope.active = True
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self._event_scope.active = False
+            self.Session.remove()
 
-        if not inspector.has_table('tasks'):
-            self.init_db()
+    @contextmanager
+    def session_scope(self):
+        """
+        Сессия текущего события, если оно обрабатывается в этом потоке
+        (фиксацию выполнит event_session), иначе - новая сессия
+        с commit/rollback на выходе.
+        """
+        if getattr(self._event_scope, 'active', False):
+            yield self.Session()
             return
 
-        # Проверка отсутствующих колонок
-        existing_columns = [col['name'] for col in inspector.get_columns('tasks')]
-        required_columns = [
-            'id', 'user_id', 'creator', 'description',
-            'youtrack_url', 'confluence_url', 'status',
-            'approve_count', 'approved_by', 'reject_count',
-            'rejected_by', 'created_at', 'completed_at'
-        ]
+        session = self.session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
-        missing_columns = [col for col in required_columns if col not in existing_columns]
-
-        if missing_columns:
-            self._upgrade_db(missing_columns)
-
-    def _upgrade_db(self, missing_columns):
-        """Добавляет отсутствующие колонки в существующую таблицу"""
-        with self.engine.connect() as conn:
-            for column in missing_columns:
-                try:
-                    if column == 'reject_count':
-                        conn.execute(text("ALTER TABLE tasks ADD COLUMN reject_count INTEGER DEFAULT 0"))
-                    elif column == 'rejected_by':
-                        conn.execute(text("ALTER TABLE tasks ADD COLUMN rejected_by JSON DEFAULT '[]'"))
-                    # ... остальные условия для миграций
-                except Exception as e:
-                    logger.error(f"Ошибка добавления колонки {column}: {str(e)}")
-                    raise
-            conn.commit()
+    @staticmethod
+    def after_commit(session, callback):
+        """
+        Выполняет callback() после успешного commit транзакции session;
+        при rollback вызов отменяется, при откате точки сохранения
+        (begin_nested) - если он добавлен внутри нее. Для изменений
+        в памяти процесса (кеши), которые нельзя применять до фиксации
+        данных в БД.
+        """
+        session.info.setdefault(_AFTER_COMMIT_KEY, []).append((session.get_nested_transaction(), callback))
 
-    def session(self):
-        """Возвращает новую сессию БД"""
-        return self.Session()
\ No newline at end of file
+    def pool_stats(self):
+        """Соединения пула: выданные, открытые сверх pool_size"""
+        pool = self.engine.pool
+        return {
+            'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else 0,
+            'overflow': max(pool.overflow(), 0) if hasattr(pool, 'overflow') else 0,
+        }
@@ -0,0 +1,400 @@
+# database/migrations.py
+"""
+Версионированные миграции схемы БД.
+
+Текущая версия хранится в таблице schema_migrations. Миграции
+выполняются один раз - при старте (DatabaseManager.setup) или из
+migration.py, а не на пути обработки запросов. Чтобы добавить
+таблицу или индекс, допишите Migration в конец MIGRATIONS.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, select, text
+)
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+_PG_LOCK_ID = 7341209  # pg_advisory_lock: миграции выполняет одна реплика
+
+_version_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+# Колонки tasks, по которым строятся индексы. Индексные миграции создают
+# зафиксированные ниже определения, а не текущие индексы модели Task:
+# модель описывает только схему новой БД (create_all), и ее изменение
+# не должно менять то, что делает уже выпущенная миграция
+_tasks = Table(
+    'tasks', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('user_id', String(50)),
+    Column('status', Boolean),
+    Column('created_at', DateTime)
+)
+
+
+def _partial_index(name, *columns, where):
+    return Index(name, *columns, sqlite_where=where, postgresql_where=where)
+
+
+# Миграция 3: открытые задачи
+_OPEN_TASK_INDEXES = [
+    _partial_index('ix_tasks_open_id', _tasks.c.id, where=_tasks.c.status == False),
+    _partial_index('ix_tasks_open_user_id', _tasks.c.user_id, _tasks.c.id, where=_tasks.c.status == False),
+]
+# Миграция 8: закрытые задачи для архивации
+_CLOSED_TASK_INDEXES = [
+    _partial_index('ix_tasks_closed_id', _tasks.c.id, where=_tasks.c.status == True),
+]
+# Миграция 11: открытые задачи по времени создания (SLA)
+_SLA_TASK_INDEXES = [
+    _partial_index('ix_tasks_open_created_at', _tasks.c.created_at, where=_tasks.c.status == False),
+]
+# Миграция 12: дайджест ревьюера
+_STATUS_TASK_INDEXES = [
+    Index('ix_tasks_status_id', _tasks.c.status, _tasks.c.id),
+]
+
+
+class Migration:
+    """
+    Шаг миграции. upgrade(conn) получает соединение внутри транзакции;
+    при transactional=False - соединение в режиме AUTOCOMMIT
+    (нужно, например, для CREATE INDEX CONCURRENTLY в PostgreSQL).
+    """
+
+    def __init__(self, version, description, upgrade, transactional=True):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.transactional = transactional
+
+
+def create_table(conn, table):
+    """Создает таблицу, если ее нет"""
+    table.create(conn, checkfirst=True)
+
+
+def create_indexes(conn, indexes):
+    """
+    Создает отсутствующие индексы из списка.
+    В PostgreSQL - CONCURRENTLY, без блокировки записи в большую таблицу.
+    """
+    inspector = inspect(conn)
+    for index in indexes:
+        existing = {item['name'] for item in inspector.get_indexes(index.table.name)}
+        if index.name in existing:
+            continue
+        logger.info("Creating index %s", index.name)
+        if conn.dialect.name == 'postgresql':
+            index.dialect_options['postgresql']['concurrently'] = True
+        index.create(conn)
+
+
+def _legacy_task_columns(conn):
+    from bot.models.task import Task
+
+    inspector = inspect(conn)
+    if not inspector.has_table('tasks'):
+        Task.__table__.create(conn)
+        return
+
+    existing_columns = {col['name'] for col in inspector.get_columns('tasks')}
+    legacy_columns = {
+        'reject_count': "reject_count INTEGER DEFAULT 0",
+        'rejected_by': "rejected_by JSON DEFAULT '[]'",
+        'completed_at': "completed_at TIMESTAMP",
+    }
+    for name, definition in legacy_columns.items():
+        if name not in existing_columns:
+            conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {definition}"))
+
+
+def _review_votes(conn):
+    """Таблица review_votes и перенос голосов из JSON-колонок пачками"""
+    from bot.models import Task, ReviewVote, VERDICT_APPROVE, VERDICT_REJECT
+
+    create_table(conn, ReviewVote.__table__)
+
+    tasks = Task.__table__
+    votes = ReviewVote.__table__
+    last_id = 0
+    migrated = 0
+    while True:
+        rows = conn.execute(
+            select(tasks.c.id, tasks.c.approved_by, tasks.c.rejected_by)
+            .where(tasks.c.id > last_id)
+            .order_by(tasks.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        batch = []
+        for task_id, approved_by, rejected_by in rows:
+            seen = set()
+            for verdict, reviewers in (
+                (VERDICT_APPROVE, approved_by or []),
+                (VERDICT_REJECT, rejected_by or [])
+            ):
+                for reviewer_id in reviewers:
+                    if reviewer_id in seen:
+                        continue
+                    seen.add(reviewer_id)
+                    batch.append({
+                        'task_id': task_id,
+                        'reviewer_id': reviewer_id,
+                        'verdict': verdict,
+                        'created_at': datetime.now()
+                    })
+
+        if batch:
+            conn.execute(votes.insert(), batch)
+            migrated += len(batch)
+
+        # Счетчики в tasks приводятся к фактическому числу голосов
+        batch_filter = tasks.c.id.between(rows[0].id, rows[-1].id)
+        conn.execute(tasks.update().where(batch_filter).values(
+            approve_count=_vote_count(votes, tasks, VERDICT_APPROVE),
+            reject_count=_vote_count(votes, tasks, VERDICT_REJECT)
+        ))
+        last_id = rows[-1].id
+
+    logger.info("Migrated %s votes to review_votes", migrated)
+
+
+def _vote_count(votes, tasks, verdict):
+    return select(func.count(votes.c.id)).where(
+        votes.c.task_id == tasks.c.id,
+        votes.c.verdict == verdict
+    ).scalar_subquery()
+
+
+def _task_indexes(conn):
+    create_indexes(conn, _OPEN_TASK_INDEXES)
+
+
+def _user_states(conn):
+    from bot.models.state import UserState
+
+    create_table(conn, UserState.__table__)
+
+
+def _scheduled_jobs(conn):
+    from bot.models.job import ScheduledJob
+
+    create_table(conn, ScheduledJob.__table__)
+
+
+def _review_cache_events(conn):
+    from bot.models.cache_event import ReviewCacheEvent
+
+    create_table(conn, ReviewCacheEvent.__table__)
+
+
+def _audit_events(conn):
+    from bot.models.audit import AuditEvent
+
+    create_table(conn, AuditEvent.__table__)
+
+
+def _task_archive(conn):
+    """
+    Колонка tasks.removed_at (снятие вместо удаления), индекс закрытых
+    задач и архивные таблицы. Все шаги повторяемы - миграция выполняется
+    без общей транзакции ради CREATE INDEX CONCURRENTLY.
+    """
+    from bot.models.archive import ArchivedTask, ArchivedVote
+
+    existing_columns = {col['name'] for col in inspect(conn).get_columns('tasks')}
+    if 'removed_at' not in existing_columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN removed_at TIMESTAMP"))
+    create_indexes(conn, _CLOSED_TASK_INDEXES)
+    create_table(conn, ArchivedTask.__table__)
+    create_table(conn, ArchivedVote.__table__)
+
+
+def _stats_tables(conn):
+    """Агрегаты статистики с заполнением из задач, голосов и архива"""
+    from sqlalchemy.orm import Session
+    from bot.models.stats import ReviewerStats, AuthorStats, WeeklyStats, TurnaroundStats
+    from bot.services.stats import StatsService
+
+    for model in (ReviewerStats, AuthorStats, WeeklyStats, TurnaroundStats):
+        create_table(conn, model.__table__)
+    with Session(bind=conn) as session:
+        StatsService().rebuild(session)
+
+
+def _task_assignments(conn):
+    from bot.models.assignment import TaskAssignment
+
+    create_table(conn, TaskAssignment.__table__)
+
+
+def _sla_reminders(conn):
+    """Индекс открытых задач по created_at и таблица отправленных напоминаний"""
+    from bot.models.sla import SlaReminder
+
+    create_indexes(conn, _SLA_TASK_INDEXES)
+    create_table(conn, SlaReminder.__table__)
+
+
+def _task_status_index(conn):
+    create_indexes(conn, _STATUS_TASK_INDEXES)
+
+
+def _sqlite_autoincrement(conn):
+    """
+    AUTOINCREMENT для tasks и review_votes в SQLite: без него новая строка
+    получает max(id) + 1 и может повторить id строки, перенесенной в архив.
+    Таблица пересоздается с копированием данных и индексов; счетчик
+    начинается не ниже наибольшего id в архиве. В PostgreSQL
+    последовательности id не переиспользуют - миграция ничего не делает.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+
+    for name, archive in (('tasks', 'tasks_archive'), ('review_votes', 'review_votes_archive')):
+        table_sql = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': name}
+        ).scalar()
+        if 'AUTOINCREMENT' in table_sql.upper():
+            continue
+
+        index_sql = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"
+        ), {'name': name}).scalars().all()
+        reflected = MetaData()
+        rebuilt = Table(name, reflected, autoload_with=conn).to_metadata(reflected, name=f'{name}_rebuild')
+        rebuilt.dialect_options['sqlite']['autoincrement'] = True
+
+        logger.info("Rebuilding %s with AUTOINCREMENT", name)
+        conn.execute(text(f"DROP TABLE IF EXISTS {rebuilt.name}"))
+        conn.execute(CreateTable(rebuilt))
+        conn.execute(text(f"INSERT INTO {rebuilt.name} SELECT * FROM {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {name}"))
+        for sql in index_sql:
+            conn.execute(text(sql))
+
+        conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ), {'name': name})
+        conn.execute(text(
+            f"UPDATE sqlite_sequence SET seq = max(seq, (SELECT coalesce(max(id), 0) FROM {archive})) "
+            "WHERE name = :name"
+        ), {'name': name})
+
+
+MIGRATIONS = [
+    Migration(1, "tasks table and legacy columns", _legacy_task_columns),
+    Migration(2, "review_votes table with backfill from JSON lists", _review_votes),
+    Migration(3, "partial indexes on open tasks", _task_indexes, transactional=False),
+    Migration(4, "user_states table", _user_states),
+    Migration(5, "scheduled_jobs table", _scheduled_jobs),
+    Migration(6, "review_cache_events table", _review_cache_events),
+    Migration(7, "audit_events table", _audit_events),
+    Migration(8, "tasks.removed_at and archive tables", _task_archive, transactional=False),
+    Migration(9, "statistics aggregate tables", _stats_tables),
+    Migration(10, "task_assignments table", _task_assignments),
+    Migration(11, "sla_reminders table and open tasks created_at index", _sla_reminders, transactional=False),
+    Migration(12, "tasks (status, id) index for reviewer digest", _task_status_index, transactional=False),
+    Migration(13, "AUTOINCREMENT ids for tasks and review_votes on SQLite", _sqlite_autoincrement),
+]
+
+
+class MigrationRunner:
+    def __init__(self, engine, migrations=None):
+        self.engine = engine
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self):
+        with self.engine.connect() as conn:
+            if not inspect(conn).has_table(schema_migrations.name):
+                return 0
+            return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+    def pending(self):
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+
+    def run(self):
+        """Применяет невыполненные миграции по порядку"""
+        with self._exclusive():
+            _version_metadata.create_all(self.engine)
+
+            if self._is_empty_database():
+                self._create_schema()
+                return
+
+            for migration in self.pending():
+                logger.info("Applying migration %s: %s", migration.version, migration.description)
+                if migration.transactional:
+                    with self.engine.begin() as conn:
+                        migration.upgrade(conn)
+                        self._stamp(conn, migration)
+                else:
+                    with self.engine.connect() as conn:
+                        migration.upgrade(conn.execution_options(isolation_level='AUTOCOMMIT'))
+                    with self.engine.begin() as conn:
+                        self._stamp(conn, migration)
+
+        logger.info("Database schema is at version %s", self.current_version())
+
+    def check(self):
+        """Проверяет, что схема актуальна (для запуска без автомиграций)"""
+        pending = self.pending()
+        if pending:
+            raise RuntimeError(
+                f"Database schema is outdated: {len(pending)} pending migrations, run migration.py"
+            )
+
+    def _is_empty_database(self):
+        with self.engine.connect() as conn:
+            return not inspect(conn).has_table('tasks')
+
+    def _create_schema(self):
+        """Новая БД: схема создается по моделям сразу в последней версии"""
+        from bot.models import Base
+
+        with self.engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            for migration in self.migrations:
+                self._stamp(conn, migration)
+        logger.info("Database schema created at version %s", self.latest_version)
+
+    def _stamp(self, conn, migration):
+        conn.execute(schema_migrations.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.now()
+        ))
+
+    @contextmanager
+    def _exclusive(self):
+        if self.engine.dialect.name != 'postgresql':
+            yield
+            return
+
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {'id': _PG_LOCK_ID})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': _PG_LOCK_ID})
@@ -0,0 +1,78 @@
+"""
+Неблокирующее логирование.
+
+Потоки бота только кладут записи в очередь (QueueHandler), запись
+в консоль и ротируемый файл выполняет отдельный поток QueueListener.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # В вызывающем потоке только подставляются аргументы (объекты в args
+        # могут измениться до записи); форматирование и traceback - в потоке listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level, log_file=None, max_bytes=0, backup_count=0, json_format=False):
+    """Настраивает корневой логгер; повторный вызов ничего не делает"""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
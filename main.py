@@ -8,5 +8,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.critical(f"Fatal error: {str(e)}", exc_info=True)
+        logger.critical("Fatal error: %s", e, exc_info=True)
         exit(1)
\ No newline at end of file
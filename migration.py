@@ -1,5 +1,10 @@
 from database.manager import DatabaseManager
+from database.migrations import MigrationRunner
+from config import logger
 
 
 db = DatabaseManager()
-db._check_migrations()
\ No newline at end of file
+runner = MigrationRunner(db.engine)
+logger.info("Schema version %s, %s pending migrations", runner.current_version(), len(runner.pending()))
+db.init_db()
+DatabaseManager.dispose()
@@ -1,41 +1,71 @@
-import threading
-import schedule
-import time
-import pytz
 from datetime import datetime
+
 from config import Config, logger
 from bot.core import ReviewBot
 
+DAILY_DIGEST_JOB = 'daily_digest'
+PERSONAL_DIGEST_JOB = 'personal_digest'
+WEEKLY_REPORT_JOB = 'weekly_stats_report'
+
+
 class TaskNotifier:
+    """
+    Ежедневная рассылка списка задач в групповой чат
+    и личных дайджестов ревьюерам и авторам, еженедельный отчет
+    по статистике в STATS_REPORT_WEEKDAY в STATS_REPORT_TIME.
+    Задания хранятся в планировщике бота (ReviewBot.scheduler)
+    и выполняется в NOTIFICATION_TIME по NOTIFICATION_TZ.
+    """
+
     def __init__(self, bot: ReviewBot):
+        self.bot = bot
+        self.scheduler = bot.scheduler
+
         if not Config.NOTIFICATION_ENABLED:
+            self.scheduler.cancel_key(DAILY_DIGEST_JOB)
+            self.scheduler.cancel_key(PERSONAL_DIGEST_JOB)
+            self.scheduler.cancel_key(WEEKLY_REPORT_JOB)
             logger.info("Notifications disabled")
             return
 
-        self.bot = bot
-        self._running = True
-        self._setup_scheduler()
+        self.scheduler.register(DAILY_DIGEST_JOB, self._send_daily_notifications)
+        self.scheduler.schedule_daily(
+            DAILY_DIGEST_JOB,
+            Config.NOTIFICATION_TIME,
+            key=DAILY_DIGEST_JOB
+        )
 
-    def _setup_scheduler(self):
-        def run_continuously():
-            schedule.every().day.at(
+        if Config.PERSONAL_DIGEST_ENABLED:
+            self.scheduler.register(PERSONAL_DIGEST_JOB, self._send_personal_digests)
+            self.scheduler.schedule_daily(
+                PERSONAL_DIGEST_JOB,
                 Config.NOTIFICATION_TIME,
-                Config.NOTIFICATION_TZ
-            ).do(self._send_daily_notifications)
-
-            while self._running:
-                schedule.run_pending()
-                time.sleep(60)
+                key=PERSONAL_DIGEST_JOB
+            )
+        else:
+            self.scheduler.cancel_key(PERSONAL_DIGEST_JOB)
 
-        self.thread = threading.Thread(
-            target=run_continuously,
-            daemon=True
-        )
-        self.thread.start()
+        # Планировщик повторяет задания ежедневно, день недели проверяет обработчик
+        if Config.STATS_REPORT_ENABLED:
+            self.scheduler.register(WEEKLY_REPORT_JOB, self._send_weekly_report)
+            self.scheduler.schedule_daily(
+                WEEKLY_REPORT_JOB,
+                Config.STATS_REPORT_TIME,
+                key=WEEKLY_REPORT_JOB
+            )
+        else:
+            self.scheduler.cancel_key(WEEKLY_REPORT_JOB)
 
-    def _send_daily_notifications(self):
+    def _send_daily_notifications(self, payload):
         self.bot.notification_service.send_daily_notification()
 
+    def _send_personal_digests(self, payload):
+        self.bot.notification_service.send_personal_digests()
+
+    def _send_weekly_report(self, payload):
+        if datetime.now(self.scheduler.tz).weekday() != Config.STATS_REPORT_WEEKDAY:
+            return
+        self.bot.notification_service.send_weekly_report()
+
     def stop(self):
-        self._running = False
-        schedule.clear()
\ No newline at end of file
+        self.scheduler.stop()
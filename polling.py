@@ -2,15 +2,15 @@ from bot.core import ReviewBot
 from database.manager import DatabaseManager
 from config import Config, logger
 from notifier import TaskNotifier
+from bot.utils.metrics import MetricsServer
 import time  # Добавьте этот импорт
 import atexit
 import sys
 
 def run_polling():
     try:
-        # Инициализация БД
-        db_manager = DatabaseManager()
-        db_manager.init_db()
+        # Инициализация БД: общий engine и пул соединений на весь процесс
+        DatabaseManager.setup()
         logger.info("Database initialized")
 
         # Создание бота
@@ -18,12 +18,21 @@ def run_polling():
         logger.info("Bot instance created")
 
         # Запуск уведомлений
-        notifier = TaskNotifier(bot) if Config.NOTIFICATION_ENABLED else None
+        notifier = TaskNotifier(bot)
+
+        # Эндпоинт метрик
+        metrics_server = None
+        if Config.METRICS_ENABLED:
+            metrics_server = MetricsServer(Config.METRICS_HOST, Config.METRICS_PORT)
+            metrics_server.start()
 
         # Обработка завершения
         def on_exit():
-            if notifier:
-                notifier.stop()
+            notifier.stop()
+            bot.stop()
+            if metrics_server:
+                metrics_server.stop()
+            DatabaseManager.dispose()
             logger.info("Application shutdown complete")
 
         atexit.register(on_exit)
@@ -33,7 +42,7 @@ def run_polling():
         if not bot_info.get('ok', False):
             raise ConnectionError("Failed to connect to bot API")
 
-        logger.info(f"Bot connected: {bot_info.get('nick')}")
+        logger.info("Bot connected: %s", bot_info.get('nick'))
         bot.bot.start_polling()
         logger.info("Polling started")
 
@@ -44,5 +53,5 @@ def run_polling():
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.critical(f"Critical error: {str(e)}", exc_info=True)
+        logger.critical("Critical error: %s", e, exc_info=True)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import argparse
+import sys
+
+from database.manager import DatabaseManager
+from database.migrations import MigrationRunner
+from bot.services.stats import StatsService
+from config import logger
+
+
+parser = argparse.ArgumentParser(description="Пересчет агрегатов статистики из задач, голосов и архива")
+parser.add_argument('--check', action='store_true', help="только показать расхождения, не изменяя агрегаты")
+args = parser.parse_args()
+
+db = DatabaseManager()
+if args.check:
+    # Проверка ничего не меняет в БД, в том числе схему
+    try:
+        MigrationRunner(db.engine).check()
+    except RuntimeError as e:
+        logger.error("%s", e)
+        DatabaseManager.dispose()
+        sys.exit(2)
+else:
+    db.init_db()
+with db.session() as session:
+    differences = StatsService().rebuild(session, apply=not args.check)
+    if not args.check:
+        session.commit()
+DatabaseManager.dispose()
+
+for line in differences:
+    print(line)
+logger.info("Statistics %s: %s differences", "checked" if args.check else "rebuilt", len(differences))
+sys.exit(1 if args.check and differences else 0)
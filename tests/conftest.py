@@ -0,0 +1,40 @@
+import os
+
+# Тесты пишут лог только в консоль
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest  # noqa: E402
+
+from config import Config  # noqa: E402
+from database.manager import DatabaseManager  # noqa: E402
+from bot.services.tasks import TaskService  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Общий engine на временной SQLite БД со схемой последней версии"""
+    monkeypatch.setattr(Config, 'DB_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    manager = DatabaseManager.setup()
+    yield manager
+    DatabaseManager.dispose()
+
+
+@pytest.fixture
+def create_task(db):
+    """create_task(user_id='author', service=None, **поля) -> id новой открытой задачи"""
+    default_service = TaskService(db)
+
+    def create(user_id='author', service=None, **fields):
+        with db.session_scope() as session:
+            task = (service or default_service).create_task(session, {
+                'user_id': user_id,
+                'creator': user_id.title(),
+                'description': f"Task of {user_id}",
+                'youtrack_url': 'https://youtrack.example/T-1',
+                'confluence_url': 'https://confluence.example/T-1',
+                **fields
+            })
+            return task.id
+
+    return create
@@ -0,0 +1,58 @@
+from bot.models import Task, ReviewVote, ArchivedTask, ArchivedVote, VERDICT_APPROVE
+from bot.services.archive import TaskArchive
+from bot.services.tasks import TaskService
+
+
+def _close(db, task_id, reviewers=('r1', 'r2')):
+    service = TaskService(db)
+    for reviewer in reviewers:
+        with db.event_session() as session:
+            service.record_vote(session, task_id, reviewer, VERDICT_APPROVE)
+
+
+def _counts(db):
+    with db.session() as session:
+        return (
+            session.query(Task).count(), session.query(ReviewVote).count(),
+            session.query(ArchivedTask).count(), session.query(ArchivedVote).count()
+        )
+
+
+def test_closed_tasks_move_with_votes(db, create_task):
+    closed = create_task()
+    _close(db, closed)
+    open_task = create_task()
+    _close(db, open_task, ('r3',))
+
+    assert TaskArchive(db, after_days=0).run() == 1
+    assert _counts(db) == (1, 1, 1, 2)
+
+    archive = TaskArchive(db)
+    with db.session() as session:
+        assert archive.get_task(session, closed).closed_at is not None
+        assert archive.get_task(session, open_task).status is False
+        assert archive.get_task_voters(session, closed) == (['r1', 'r2'], [])
+
+
+def test_recent_closed_tasks_stay(db, create_task):
+    first = create_task()
+    _close(db, first)
+    assert TaskArchive(db, after_days=7).run() == 0
+    assert TaskArchive(db, after_days=0).run() == 1
+    assert _counts(db) == (0, 0, 1, 2)
+
+
+def test_ids_are_not_reused_after_archiving(db, create_task):
+    archive = TaskArchive(db, after_days=0)
+    first = create_task()
+    _close(db, first)
+    # Архивируются и последняя задача, и задача последнего голоса
+    assert archive.run() == 1
+
+    second = create_task()
+    assert second > first
+    _close(db, second)
+    assert archive.run() == 1
+    with db.session() as session:
+        assert sorted(vote.task_id for vote in session.query(ArchivedVote)) == [first, first, second, second]
+        assert session.query(ArchivedVote.id).distinct().count() == 4
@@ -0,0 +1,32 @@
+import pytest
+
+from bot.keyboards.callback_data import ACTION_CODES, CallbackData, decode_callback, encode_callback
+
+
+@pytest.mark.parametrize('data', [
+    CallbackData('on_review'),
+    CallbackData('confirm_approve', task_id=42),
+    CallbackData('do_review', cursor=17),
+    CallbackData('do_review', cursor=17, direction='prev'),
+    CallbackData('select_task', task_id=5, cursor=3),
+])
+def test_round_trip(data):
+    raw = data.encode()
+    assert len(raw) <= 64
+    assert decode_callback(raw) == data
+
+
+def test_every_action_has_unique_code():
+    assert len(set(ACTION_CODES.values())) == len(ACTION_CODES)
+    for action in ACTION_CODES:
+        assert decode_callback(encode_callback(action)).action == action
+
+
+def test_legacy_buttons():
+    assert decode_callback('my_tasks') == CallbackData('my_tasks')
+    assert decode_callback('confirm_revision_12') == CallbackData('confirm_revision', task_id=12)
+
+
+@pytest.mark.parametrize('raw', [None, '', 'garbage', '1|zz|1', '1|ca|x', 'confirm_approve_x', 'review_page_next_5'])
+def test_unknown_formats(raw):
+    assert decode_callback(raw) is None
@@ -0,0 +1,182 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core.bot import ReviewBot
+from bot.handlers.callbacks import CallbackHandler
+from bot.handlers.commands import CommandHandler
+from bot.keyboards.callback_data import decode_callback, encode_callback
+from bot.models import Task, ReviewVote, VERDICT_APPROVE
+from bot.services.archive import TaskArchive
+from bot.services.audit import AuditLog
+from bot.services.idempotency import CallbackDeduplicator
+from bot.services.outbox import MessageOutbox
+from bot.services.tasks import TaskService
+from bot.states.backends import MemoryStateBackend
+from bot.states.user import UserStateManager
+from config import Config
+
+
+class RecordingOutbox(MessageOutbox):
+    """Outbox без отправки: сообщения, вышедшие из deferred() (после commit события)"""
+
+    def __init__(self):
+        super().__init__(api=None)
+        self.sent = []
+
+    def _enqueue(self, chat_id, text, priority, kwargs):
+        self.sent.append((chat_id, text))
+
+
+class FakeUsers:
+    def resolve_many(self, user_ids):
+        return {user_id: user_id.title() for user_id in user_ids}
+
+
+@pytest.fixture
+def bot(db):
+    audit = AuditLog(db)
+    return SimpleNamespace(
+        bot=None, state_manager=UserStateManager(MemoryStateBackend()), db=db,
+        task_service=TaskService(db, audit=audit), notification_service=None,
+        outbox=RecordingOutbox(), user_directory=FakeUsers(),
+        audit=audit, assigner=None, archive=TaskArchive(db, after_days=0),
+        callback_dedup=CallbackDeduplicator()
+    )
+
+
+@pytest.fixture
+def handler(bot):
+    return CallbackHandler(bot)
+
+
+def _press(handler, callback, query_id, user_id='author'):
+    """Нажатие кнопки через обертку события ReviewBot; возвращает ответы в чат"""
+    event = SimpleNamespace(data={
+        'callbackData': callback,
+        'queryId': query_id,
+        'from': {'userId': user_id},
+        'message': {'msgId': 'm1', 'chat': {'chatId': 'chat'}},
+    })
+    bot = ReviewBot.__new__(ReviewBot)
+    bot.outbox, bot.db = handler.outbox, handler.db
+    handler.outbox.sent.clear()
+    bot._handle_event(handler.handle, event)
+    return [text for chat_id, text in handler.outbox.sent if chat_id == 'chat']
+
+
+def test_failed_callback_is_not_remembered(handler, create_task, monkeypatch):
+    task_id = create_task()
+    callback = encode_callback('confirm_remove', task_id)
+    remove_task = handler.tasks.remove_task
+
+    def broken(db, task):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(handler.tasks, 'remove_task', broken)
+    assert _press(handler, callback, 'q1') == ["❌ Ошибка при снятии задачи"]
+    assert handler.dedup.lookup('q1', 'author', decode_callback(callback)) is None
+    assert handler.router.stats()['confirm_remove']['errors'] == 1
+
+    # Повторное нажатие выполняется заново, а не получает ошибку из кеша
+    monkeypatch.setattr(handler.tasks, 'remove_task', remove_task)
+    assert _press(handler, callback, 'q2') == ["✅ Задача успешно снята с ревью!"]
+
+
+def test_successful_callback_is_remembered(handler, create_task):
+    task_id = create_task()
+    callback = encode_callback('confirm_remove', task_id)
+    assert _press(handler, callback, 'q1') == ["✅ Задача успешно снята с ревью!"]
+    assert handler.dedup.lookup('q1', 'author', decode_callback(callback)) == "✅ Задача успешно снята с ревью!"
+
+
+def test_failed_vote_leaves_nothing_behind(handler, create_task, monkeypatch):
+    task_id = create_task()
+    callback = encode_callback('confirm_approve', task_id)
+
+    def broken(result, reviewer_id):
+        raise RuntimeError("audit is down")
+
+    monkeypatch.setattr(handler.tasks.audit, 'vote', broken)
+    assert _press(handler, callback, 'q1', user_id='reviewer') == ["❌ Ошибка при одобрении задачи"]
+    with handler.db.session() as session:
+        assert session.query(ReviewVote).count() == 0
+        assert session.get(Task, task_id).approve_count == 0
+
+    monkeypatch.undo()
+    [reply] = _press(handler, callback, 'q2', user_id='reviewer')
+    assert reply.startswith(f"✅ Вы одобрили задачу #{task_id}")
+
+
+def test_failed_assignment_does_not_duplicate_task(handler, monkeypatch):
+    handler.state.set_state('author', 'confirm', {
+        'chat_id': 'chat', 'description': 'Task', 'youtrack_url': 'https://youtrack.example/T-1'
+    })
+
+    def broken(db, task_id, author_id):
+        raise RuntimeError("assigner is down")
+
+    monkeypatch.setattr(handler, 'assigner', SimpleNamespace(assign=broken))
+    callback = encode_callback('confirm_task')
+    assert _press(handler, callback, 'q1') == ["❌ Ошибка при сохранении задачи"]
+    assert handler.state.get_state('author') is not None
+
+    monkeypatch.setattr(handler, 'assigner', None)
+    assert "✅ Задача #1 успешно создана!" in _press(handler, callback, 'q2')
+    with handler.db.session() as session:
+        assert session.query(Task).count() == 1
+
+
+def _completed_and_archived(handler, create_task, monkeypatch):
+    """Завершенная задача, перенесенная в архив"""
+    monkeypatch.setattr(Config, 'REQUIRED_APPROVALS', 2)
+    task_id = create_task(service=handler.tasks)
+    newer = create_task(service=handler.tasks)
+    for task, reviewer in ((task_id, 'r1'), (task_id, 'r2'), (newer, 'r3')):
+        with handler.db.event_session() as session:
+            handler.tasks.record_vote(session, task, reviewer, VERDICT_APPROVE)
+    assert handler.archive.run() == 1
+    handler.audit.flush()
+    return task_id
+
+
+def test_archived_task_is_shown_with_history(handler, create_task, monkeypatch):
+    task_id = _completed_and_archived(handler, create_task, monkeypatch)
+
+    # Кнопка задачи из старого сообщения
+    [reply] = _press(handler, encode_callback('review_task', task_id), 'q1', user_id='r3')
+    assert reply.startswith("📁 Задача закрыта")
+    assert "Одобрили: R1, R2" in reply
+
+    [history] = _press(handler, encode_callback('task_history', task_id), 'q2', user_id='r3')
+    lines = history.splitlines()
+    assert lines[0] == f"📜 История задачи #{task_id}"
+    assert [line.split(' ', 2)[2] for line in lines[2:]] == [
+        "🚀 Author: задача создана",
+        f"🗳 R1: одобрение (✅ 1/2, ❌ 0/{Config.MAX_REJECTIONS})",
+        f"🗳 R2: одобрение (✅ 2/2, ❌ 0/{Config.MAX_REJECTIONS})",
+        "🎉 задача завершена",
+    ]
+
+
+def test_removal_of_archived_task_reports_closed(handler, create_task, monkeypatch):
+    task_id = _completed_and_archived(handler, create_task, monkeypatch)
+    assert _press(handler, encode_callback('confirm_remove', task_id), 'q1') == [f"ℹ️ Задача #{task_id} уже закрыта"]
+
+
+def test_history_command(bot, create_task, monkeypatch):
+    monkeypatch.setattr(Config, 'AUDIT_PAGE_SIZE', 1)
+    task_id = create_task(service=bot.task_service)
+    bot.audit.flush()
+    handler = CommandHandler(bot)
+
+    def command(text):
+        event = SimpleNamespace(text=text, from_chat='chat', data={'chat': {'type': 'private'}})
+        bot.outbox.sent.clear()
+        with bot.outbox.deferred(), bot.db.event_session():
+            handler.handle_history(event)
+        return [text for _, text in bot.outbox.sent]
+
+    assert command("/history") == ["Укажите номер задачи: /history 42"]
+    assert command(f"/history #{task_id}")[0].endswith("🚀 Author: задача создана")
+    assert command("/history 999") == ["История задачи #999 пуста"]
@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+
+from bot.core.dispatcher import EventDispatcher, _STOP
+
+
+def test_events_of_one_user_are_processed_in_order():
+    dispatcher = EventDispatcher(workers=4, queue_size=1000)
+    dispatcher.start()
+    seen = {}
+    lock = threading.Lock()
+
+    def handle(user, n):
+        time.sleep(0.001 * (n % 3))
+        with lock:
+            seen.setdefault(user, []).append(n)
+
+    for n in range(50):
+        for user in ('u1', 'u2', 'u3'):
+            assert dispatcher.submit(user, handle, user, n)
+    dispatcher.stop(timeout=10)
+
+    assert seen == {user: list(range(50)) for user in ('u1', 'u2', 'u3')}
+    assert dispatcher.stats()['processed'] == 150
+
+
+def test_stop_with_full_queue_drains_without_blocking():
+    dispatcher = EventDispatcher(workers=1, queue_size=2, put_timeout=0)
+    dispatcher.start()
+    release = threading.Event()
+    processed = []
+
+    assert dispatcher.submit('u', release.wait)
+    time.sleep(0.1)
+    assert dispatcher.submit('u', processed.append, 1)
+    assert dispatcher.submit('u', processed.append, 2)
+    assert not dispatcher.submit('u', processed.append, 3)  # Очередь полна
+
+    threading.Timer(0.5, release.set).start()
+    started = time.monotonic()
+    dispatcher.stop(timeout=5)
+
+    assert time.monotonic() - started < 4
+    assert processed == [1, 2]
+    assert not dispatcher.submit('u', processed.append, 4)
+
+
+class _SlowQueue(queue.Queue):
+    """Очередь, put() которой ждет сигнала: submit() прерван между проверкой и постановкой"""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.entered = threading.Event()
+        self.resume = threading.Event()
+
+    def put(self, item, block=True, timeout=None):
+        if item is not _STOP:
+            self.entered.set()
+            self.resume.wait(5)
+        super().put(item, block, timeout)
+
+
+def test_event_accepted_during_stop_is_processed():
+    dispatcher = EventDispatcher(workers=1, queue_size=10)
+    slow_queue = dispatcher._queues[0] = _SlowQueue(10)
+    dispatcher.start()
+    processed = []
+
+    submitter = threading.Thread(target=dispatcher.submit, args=('u', processed.append, 1))
+    submitter.start()
+    assert slow_queue.entered.wait(5)
+    stopper = threading.Thread(target=dispatcher.stop, kwargs={'timeout': 5})
+    stopper.start()
+    time.sleep(0.1)
+    slow_queue.resume.set()
+    submitter.join()
+    stopper.join()
+
+    # Принятое событие не остается в очереди за маркером остановки
+    assert processed == [1]
+    assert dispatcher.stats()['queue_depth'] == 0
+
+
+def test_handler_errors_do_not_stop_worker():
+    dispatcher = EventDispatcher(workers=1)
+    dispatcher.start()
+    done = []
+    dispatcher.submit('u', lambda: 1 / 0)
+    dispatcher.submit('u', done.append, 'ok')
+    dispatcher.stop(timeout=5)
+    assert done == ['ok']
+    assert dispatcher.stats()['failed'] == 1
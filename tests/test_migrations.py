@@ -0,0 +1,113 @@
+from datetime import datetime
+
+from sqlalchemy import MetaData, inspect, text
+
+from database.migrations import MIGRATIONS, MigrationRunner
+from bot.models import Task, ReviewVote, VERDICT_APPROVE
+
+LATEST = max(migration.version for migration in MIGRATIONS)
+
+
+def test_new_database_is_created_at_latest_version(db):
+    runner = MigrationRunner(db.engine)
+    assert runner.current_version() == LATEST
+    assert runner.pending() == []
+    runner.check()
+
+
+def test_upgrade_applies_pending_migrations(db):
+    with db.session() as session:
+        session.add(Task(user_id='author', creator='Author', description='d', status=True,
+                         approve_count=1, completed_at=datetime.now()))
+        session.flush()
+        session.add(ReviewVote(task_id=1, reviewer_id='reviewer', verdict=VERDICT_APPROVE))
+        session.commit()
+
+    # Схема как до миграции 9
+    with db.engine.begin() as conn:
+        for table in ('sla_reminders', 'task_assignments', 'reviewer_stats', 'author_stats',
+                      'weekly_stats', 'turnaround_stats'):
+            conn.execute(text(f"DROP TABLE {table}"))
+        conn.execute(text("DROP INDEX ix_tasks_open_created_at"))
+        conn.execute(text("DROP INDEX ix_tasks_status_id"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version >= 9"))
+
+    runner = MigrationRunner(db.engine)
+    assert [migration.version for migration in runner.pending()] == list(range(9, LATEST + 1))
+    runner.run()
+
+    assert runner.current_version() == LATEST
+    inspector = inspect(db.engine)
+    assert inspector.has_table('task_assignments') and inspector.has_table('sla_reminders')
+    assert {'ix_tasks_open_created_at', 'ix_tasks_status_id'} <= {index['name'] for index in inspector.get_indexes('tasks')}
+    with db.engine.connect() as conn:
+        # Миграция 9 заполняет агрегаты из существующих данных
+        assert conn.execute(text("SELECT approvals FROM reviewer_stats")).all() == [(1,)]
+
+
+def test_migrations_are_idempotent(db):
+    runner = MigrationRunner(db.engine)
+    runner.run()
+    assert runner.current_version() == LATEST
+
+
+def test_index_migrations_create_only_their_own_indexes(db):
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_tasks_open_created_at"))
+        conn.execute(text("DROP INDEX ix_tasks_status_id"))
+
+    # Миграция 11 не создает индекс, добавленный в модель позже
+    [sla_migration] = [migration for migration in MIGRATIONS if migration.version == 11]
+    with db.engine.connect() as conn:
+        sla_migration.upgrade(conn.execution_options(isolation_level='AUTOCOMMIT'))
+    names = {index['name'] for index in inspect(db.engine).get_indexes('tasks')}
+    assert 'ix_tasks_open_created_at' in names
+    assert 'ix_tasks_status_id' not in names
+
+
+def _task_index_sql(db):
+    with db.engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks' AND sql IS NOT NULL"
+        )).all())
+
+
+def test_upgraded_task_indexes_match_new_database(db):
+    created = _task_index_sql(db)
+    with db.engine.begin() as conn:
+        for name in created:
+            conn.execute(text(f"DROP INDEX {name}"))
+        for migration in MIGRATIONS:
+            if migration.version in (3, 8, 11, 12):
+                migration.upgrade(conn)
+    assert _task_index_sql(db) == created
+
+
+def test_sqlite_tables_are_rebuilt_with_autoincrement(db):
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO tasks_archive (id, user_id, creator, description, archived_at) "
+                          "VALUES (7, 'author', 'Author', 'd', CURRENT_TIMESTAMP)"))
+        # Схема как до миграции 13: tasks без AUTOINCREMENT
+        conn.execute(text("DROP TABLE tasks"))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version >= 13"))
+    legacy = Task.__table__.to_metadata(MetaData())
+    legacy.dialect_options['sqlite']['autoincrement'] = False
+    with db.engine.begin() as conn:
+        legacy.create(conn)
+    with db.session() as session:
+        session.add(Task(id=3, user_id='author', creator='Author', description='d'))
+        session.commit()
+    created = _task_index_sql(db)
+
+    runner = MigrationRunner(db.engine)
+    runner.run()
+    assert runner.current_version() == LATEST
+    assert _task_index_sql(db) == created
+    with db.session() as session:
+        assert session.query(Task.id).scalar() == 3
+        # Новый id больше архивного, а не max(id) + 1 по tasks
+        task = Task(user_id='author', creator='Author', description='d')
+        session.add(task)
+        session.commit()
+        assert task.id == 8
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+from bot.services.outbox import MessageOutbox
+from config import Config
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.payload = payload if payload is not None else {'ok': status_code == 200}
+
+    def json(self):
+        return self.payload
+
+
+class FakeApi:
+    def __init__(self, statuses=()):
+        self.sent = []
+        self.statuses = list(statuses)
+        self.lock = threading.Lock()
+        self.delivered = threading.Event()
+
+    def send_text(self, chat_id, text, **kwargs):
+        with self.lock:
+            status = self.statuses.pop(0) if self.statuses else 200
+            response = status if isinstance(status, FakeResponse) else FakeResponse(status)
+            if response.payload.get('ok'):
+                self.sent.append((chat_id, text))
+                self.delivered.set()
+        return response
+
+
+@pytest.fixture
+def api():
+    return FakeApi()
+
+
+def _drain(outbox):
+    outbox.stop(timeout=5)
+    assert outbox.stats()['queue_depth'] == 0
+
+
+def test_replies_go_before_notifications(api):
+    outbox = MessageOutbox(api, workers=1)
+    outbox.notify('group', "digest")
+    outbox.notify('author', "status", inline_keyboard_markup='{}')
+    outbox.reply('user', "answer")
+    outbox.start()
+    _drain(outbox)
+    assert api.sent[0] == ('user', "answer")
+    assert len(api.sent) == 3
+
+
+def test_notifications_to_one_chat_are_merged(api):
+    outbox = MessageOutbox(api, workers=1)
+    outbox.notify('author', "first")
+    outbox.notify('author', "second")
+    outbox.start()
+    _drain(outbox)
+    assert api.sent == [('author', "first\n\nsecond")]
+    assert outbox.stats()['merged'] == 1
+
+
+def test_deferred_messages_are_sent_only_on_success(api):
+    outbox = MessageOutbox(api, workers=1)
+    with outbox.deferred():
+        outbox.reply('user', "kept")
+        assert outbox.deferred_replies('user') == ["kept"]
+        assert outbox.stats()['queue_depth'] == 0
+    with pytest.raises(RuntimeError):
+        with outbox.deferred():
+            outbox.reply('user', "dropped")
+            raise RuntimeError
+    outbox.start()
+    _drain(outbox)
+    assert api.sent == [('user', "kept")]
+    assert outbox.stats()['discarded'] == 1
+
+
+def test_failed_send_is_retried(monkeypatch):
+    monkeypatch.setattr(Config, 'OUTBOX_RETRY_BASE_DELAY', 0.01)
+    api = FakeApi(statuses=[503, 429])
+    outbox = MessageOutbox(api, workers=1)
+    outbox.start()
+    outbox.reply('user', "hello")
+    assert api.delivered.wait(5)
+    _drain(outbox)
+    assert api.sent == [('user', "hello")]
+    assert outbox.stats()['retried'] == 2
+
+
+def test_rejected_send_goes_to_dead_letter(caplog):
+    api = FakeApi(statuses=[
+        FakeResponse(200, {'ok': False, 'description': "Chat not found"}),
+        FakeResponse(400, {'ok': False, 'description': "Invalid inline keyboard"}),
+    ])
+    outbox = MessageOutbox(api, workers=1)
+    outbox.reply('gone', "first")
+    outbox.reply('user', "second", inline_keyboard_markup='[')
+    with caplog.at_level('ERROR', logger='bot.outbox.dead_letter'):
+        outbox.start()
+        _drain(outbox)
+    assert api.sent == []
+    assert outbox.stats()['dead'] == 2
+    assert outbox.stats()['retried'] == 0
+    assert "Chat not found" in caplog.text
+    assert "Invalid inline keyboard" in caplog.text
@@ -0,0 +1,85 @@
+import pytest
+
+from config import Config
+from bot.models import VERDICT_APPROVE
+from bot.models.cache_event import ReviewCacheEvent, CACHE_EVENT_CREATED
+from bot.services.reviewable import ReviewableCache, ReviewableTask
+from bot.services.tasks import TaskService
+
+
+def _walk(service, db, user_id):
+    """Все страницы вперед, затем назад; возвращает id по страницам"""
+    forward, backward = [], []
+    with db.session() as session:
+        page = service.get_reviewable_page(session, user_id)
+        forward.append([row.id for row in page.items])
+        while page.next_cursor is not None:
+            page = service.get_reviewable_page(session, user_id, page.next_cursor, 'next')
+            forward.append([row.id for row in page.items])
+        while page.prev_cursor is not None:
+            page = service.get_reviewable_page(session, user_id, page.prev_cursor, 'prev')
+            backward.append([row.id for row in page.items])
+    return forward, backward
+
+
+@pytest.fixture
+def page_size(monkeypatch):
+    monkeypatch.setattr(Config, 'TASKS_PAGE_SIZE', 3)
+    return 3
+
+
+def test_cached_pages_match_query_pages(db, create_task, page_size):
+    cached = TaskService(db, reviewable_cache=ReviewableCache(db, change_feed=False))
+    for _ in range(7):
+        create_task(service=cached)
+
+    expected = _walk(TaskService(db), db, 'reviewer')
+    assert _walk(cached, db, 'reviewer') == expected
+    assert [len(ids) for ids in expected[0]] == [3, 3, 1]
+    assert expected[1] == expected[0][-2::-1]
+
+
+def test_created_task_is_inserted_into_cached_list(db, create_task, page_size):
+    cache = ReviewableCache(db, change_feed=False)
+    cached = TaskService(db, reviewable_cache=cache)
+    task_ids = [create_task(service=cached) for _ in range(4)]
+    _walk(cached, db, 'reviewer')  # Список reviewer попадает в кеш
+
+    task_ids.append(create_task(service=cached))
+    forward, _ = _walk(cached, db, 'reviewer')
+    assert sum(forward, []) == task_ids
+    assert cache.stats()['patches'] >= 1
+
+
+def test_change_feed_applies_late_committed_events(db):
+    cache = ReviewableCache(db, change_feed=True)
+    cache.start()
+    cache.stop()  # Опрос вручную
+    cache.get('reviewer', lambda: [])
+
+    def other_replica(event_id, task_id):
+        with db.session() as session:
+            session.add(ReviewCacheEvent(id=event_id, kind=CACHE_EVENT_CREATED, task_id=task_id,
+                                         user_id='author', title=f"Task {task_id}", origin='other'))
+            session.commit()
+
+    other_replica(2, 2)
+    assert cache.apply_feed() == 1
+    # Транзакция с меньшим id зафиксирована после опроса
+    other_replica(1, 1)
+    assert cache.apply_feed() == 1
+    assert cache.apply_feed() == 0
+    assert cache.get('reviewer', lambda: []) == (ReviewableTask(1, "Task 1"), ReviewableTask(2, "Task 2"))
+    assert cache.stats()['feed_events'] == 2
+
+
+def test_reviewer_digest_includes_configured_reviewers(db, create_task, monkeypatch):
+    # lead еще не голосовал и не создавал задач
+    monkeypatch.setattr(Config, 'REVIEWERS', ['lead', 'author'])
+    service = TaskService(db)
+    first, second = create_task(), create_task()
+    with db.event_session() as session:
+        service.record_vote(session, first, 'r1', VERDICT_APPROVE)
+
+    digest = [(row.reviewer_id, row.id) for row in service.iter_reviewer_digest()]
+    assert digest == [('lead', first), ('lead', second), ('r1', second)]
@@ -0,0 +1,28 @@
+from benchmarks.query_plans import check_plans, sqlite_plan_problems
+from bot.services.assignment import ReviewerAssigner
+from bot.services.tasks import TaskService
+
+
+def test_plan_problems_are_detected():
+    assert sqlite_plan_problems([
+        'SCAN tasks',
+        'SCAN TABLE review_votes',
+        'SEARCH tasks USING AUTOMATIC PARTIAL COVERING INDEX (status=?)',
+        'SCAN tasks USING INDEX ix_tasks_open_id',
+        'SEARCH review_votes USING COVERING INDEX ix_review_votes_reviewer_task (reviewer_id=?)',
+        'SCAN members',
+        'USE TEMP B-TREE FOR ORDER BY',
+    ]) == [
+        'SCAN tasks',
+        'SCAN TABLE review_votes',
+        'SEARCH tasks USING AUTOMATIC PARTIAL COVERING INDEX (status=?)',
+    ]
+
+
+def test_hot_queries_use_indexes(db):
+    service = TaskService(db, assigner=ReviewerAssigner(db, reviewers=['reviewer']))
+    service.assigner.refresh()
+
+    results = check_plans(service)
+    assert len(results) > 30
+    assert [(statement, problems) for statement, problems in results if problems] == []
@@ -0,0 +1,53 @@
+import pytest
+
+from bot.models import Task
+
+
+def test_event_session_commits_once_and_releases_connection(db, create_task):
+    with db.event_session() as session:
+        task_id = create_task()
+        # session_scope внутри события отдает ту же сессию и не фиксирует ее
+        with db.session_scope() as inner:
+            assert inner is session
+        assert db.pool_stats()['checked_out'] == 1
+    assert db.pool_stats()['checked_out'] == 0
+
+    with db.session() as session:
+        assert session.get(Task, task_id) is not None
+
+
+def test_event_session_rolls_back_and_releases_on_error(db, create_task):
+    with pytest.raises(RuntimeError):
+        with db.event_session():
+            create_task()
+            raise RuntimeError
+    assert db.pool_stats()['checked_out'] == 0
+    with db.session() as session:
+        assert session.query(Task).count() == 0
+
+
+def test_after_commit_callbacks(db):
+    calls = []
+    with db.event_session() as session:
+        db.after_commit(session, lambda: calls.append('committed'))
+        assert calls == []
+    assert calls == ['committed']
+
+    with pytest.raises(RuntimeError):
+        with db.event_session() as session:
+            db.after_commit(session, lambda: calls.append('rolled back'))
+            raise RuntimeError
+    with db.event_session():
+        pass
+    assert calls == ['committed']
+
+
+def test_savepoint_rollback_drops_only_its_callbacks(db, create_task):
+    calls = []
+    with db.event_session() as session:
+        db.after_commit(session, lambda: calls.append('event'))
+        savepoint = session.begin_nested()
+        db.after_commit(session, lambda: calls.append('savepoint'))
+        savepoint.rollback()
+    assert calls == ['event']
+
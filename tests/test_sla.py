@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from bot.models import TaskAssignment
+from bot.services.sla import SlaMonitor
+from config import Config
+
+RULE = {'name': 'no_votes', 'after_hours': 1, 'no_votes': True, 'notify': ('assignees',)}
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.sent = []
+
+    @contextmanager
+    def deferred(self):
+        yield
+
+    def notify(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+
+
+@pytest.fixture
+def monitor(db):
+    return SlaMonitor(db, FakeOutbox(), rules=[RULE], batch_size=2)
+
+
+@pytest.fixture
+def stale_task(create_task):
+    def create():
+        return create_task(created_at=datetime.now() - timedelta(hours=2))
+    return create
+
+
+def test_assignees_are_reminded_once(monitor, stale_task, db):
+    task_id = stale_task()
+    with db.session_scope() as session:
+        session.add(TaskAssignment(task_id=task_id, reviewer_id='reviewer'))
+
+    assert monitor.run() == 1
+    assert monitor.outbox.sent == ['reviewer']
+    assert monitor.run() == 0
+
+
+@pytest.mark.parametrize('group_chat, recipient', [('group', 'group'), ('', 'author')])
+def test_unassigned_tasks_fall_back_to_group_or_author(monitor, stale_task, monkeypatch, group_chat, recipient):
+    monkeypatch.setattr(Config, 'GROUP_CHAT_ID', group_chat)
+    for _ in range(5):
+        stale_task()
+
+    # Пачки по 2 задачи: каждая задача отмечается, цикл run() завершается
+    assert monitor.run() == 5
+    assert monitor.outbox.sent == [recipient] * 5
+    assert monitor.run() == 0
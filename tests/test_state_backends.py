@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.states import backends as state_backends
+from bot.states.backends import MemoryStateBackend, RedisStateBackend, SqlStateBackend
+
+
+class FakeRedis:
+    """Подмножество команд redis.Redis на словаре; текущее время - атрибут now"""
+
+    def __init__(self):
+        self.data = {}
+        self.sorted_sets = {}
+        self.now = 0.0
+        self.expired_keys = 0
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.now:
+            del self.data[key]
+            self.expired_keys += 1
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value.encode('utf-8'), self.now + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        return sum(self.sorted_sets.get(key, {}).pop(member, None) is not None for member in members)
+
+    def zcount(self, key, low, high):
+        return sum(_score_in(score, low, high) for score in self.sorted_sets.get(key, {}).values())
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.sorted_sets.get(key, {})
+        removed = [member for member, score in members.items() if _score_in(score, low, high)]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    def info(self, section=None):
+        return {'expired_keys': self.expired_keys, 'evicted_keys': 0}
+
+    def scan_iter(self, *args, **kwargs):
+        raise AssertionError("stats() must not scan the keyspace")
+
+
+def _score_in(score, low, high):
+    """Границы как в Redis: "(" - исключающая"""
+    low, high = str(low), str(high)
+    above = score > float(low[1:]) if low.startswith('(') else score >= float(low)
+    below = score < float(high[1:]) if high.startswith('(') else score <= float(high)
+    return above and below
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """FakeRedis, часы которого использует и RedisStateBackend"""
+    client = FakeRedis()
+    monkeypatch.setattr(state_backends, 'time', SimpleNamespace(time=lambda: client.now))
+    return client
+
+
+STATE = {'step': 'description', 'data': {'youtrack_url': 'https://youtrack.example/T-1'}, 'chat_id': None}
+
+
+def test_redis_set_get_and_clear(client):
+    backend = RedisStateBackend(client, ttl=60)
+
+    assert backend.get('u1') is None
+    backend.set('u1', STATE)
+    assert backend.get('u1') == STATE
+    assert list(client.data) == ['review-bot:state:u1']
+    assert backend.stats() == {'live': 1, 'evictions': 0}
+
+    backend.delete('u1')
+    assert backend.get('u1') is None
+    assert backend.stats() == {'live': 0, 'evictions': 0}
+
+
+def test_redis_state_expires(client):
+    backend = RedisStateBackend(client, ttl=60)
+    backend.set('u1', STATE)
+
+    client.now = 59
+    assert backend.get('u1') == STATE
+    # Повторная запись продлевает TTL
+    backend.set('u1', STATE)
+    client.now = 118
+    assert backend.get('u1') == STATE
+    client.now = 119
+    assert backend.get('u1') is None
+    assert backend.stats() == {'live': 0, 'evictions': 1}
+    assert backend.sweep() == 1
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def backend(request, db):
+    if request.param == 'memory':
+        return MemoryStateBackend(ttl=60, max_size=10)
+    return SqlStateBackend(db, ttl=60)
+
+
+def test_set_get_and_clear(backend):
+    backend.set('u1', STATE)
+    assert backend.get('u1') == STATE
+    assert backend.stats()['live'] == 1
+
+    backend.delete('u1')
+    assert backend.get('u1') is None
+    assert backend.stats()['live'] == 0
@@ -0,0 +1,108 @@
+"""Параллельное голосование за одну задачу (pytest-версия benchmarks/vote_stress.py)"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bot.models import Task, ReviewVote, VERDICT_APPROVE, VERDICT_REJECT
+from bot.services.stats import StatsService
+from bot.services.tasks import TaskService
+from config import Config
+
+REVIEWERS = 20
+
+
+@pytest.fixture
+def service(db):
+    return TaskService(db, stats=StatsService())
+
+
+def _vote_in_parallel(service, task_id, verdict=VERDICT_APPROVE, reviewers=REVIEWERS):
+    barrier = threading.Barrier(reviewers)
+
+    def vote(n):
+        barrier.wait()
+        with service.db.event_session() as session:
+            return service.record_vote(session, task_id, f"reviewer-{n}", verdict)
+
+    with ThreadPoolExecutor(max_workers=reviewers) as pool:
+        return list(pool.map(vote, range(reviewers)))
+
+
+def _task_and_votes(service, task_id):
+    with service.db.session() as session:
+        task = session.query(Task).filter(Task.id == task_id).one()
+        votes = session.query(ReviewVote).filter(ReviewVote.task_id == task_id).count()
+        session.expunge(task)
+    return task, votes
+
+
+def test_no_vote_is_lost(service, create_task, monkeypatch):
+    monkeypatch.setattr(Config, 'REQUIRED_APPROVALS', REVIEWERS + 1)
+    task_id = create_task(service=service)
+
+    results = _vote_in_parallel(service, task_id)
+    task, votes = _task_and_votes(service, task_id)
+
+    assert all(result.recorded for result in results)
+    assert task.approve_count == votes == REVIEWERS
+    assert not task.status
+    assert sorted(result.approve_count for result in results) == list(range(1, REVIEWERS + 1))
+
+
+def test_task_is_completed_by_exactly_one_vote(service, create_task, monkeypatch):
+    monkeypatch.setattr(Config, 'REQUIRED_APPROVALS', 2)
+    task_id = create_task(service=service)
+
+    results = _vote_in_parallel(service, task_id)
+    task, votes = _task_and_votes(service, task_id)
+
+    assert sum(result.completed for result in results) == 1
+    assert task.status and task.completed_at
+    assert task.approve_count == votes == sum(result.recorded for result in results)
+    with service.db.session() as session:
+        assert service.stats.rebuild(session, apply=False) == []
+    assert service.db.pool_stats()['checked_out'] == 0
+
+
+def test_reject_limit_removes_task_once(service, create_task, monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_REJECTIONS', 3)
+    task_id = create_task(service=service)
+
+    results = _vote_in_parallel(service, task_id, VERDICT_REJECT)
+    task, _ = _task_and_votes(service, task_id)
+
+    assert sum(result.removed for result in results) == 1
+    assert task.status and task.removed_at
+    assert service.db.pool_stats()['checked_out'] == 0
+
+
+def test_repeated_vote_is_reported_as_duplicate(service, create_task):
+    task_id = create_task(service=service)
+    with service.db.event_session() as session:
+        assert service.record_vote(session, task_id, 'reviewer', VERDICT_APPROVE).recorded
+    with service.db.event_session() as session:
+        result = service.record_vote(session, task_id, 'reviewer', VERDICT_REJECT)
+    assert result.duplicate and not result.recorded
+    assert _task_and_votes(service, task_id)[0].approve_count == 1
+
+
+def test_vote_conflict_keeps_rest_of_event(service, create_task, monkeypatch):
+    task_id = create_task(service=service)
+    with service.db.event_session() as session:
+        service.record_vote(session, task_id, 'reviewer', VERDICT_APPROVE)
+
+    # Голос другой реплики не виден проверке - вставка упирается в уникальный индекс
+    monkeypatch.setattr(service, '_has_vote', lambda db, task_id, reviewer_id: False)
+    calls = []
+    with service.db.event_session() as session:
+        other_id = create_task('other', service=service)
+        service.db.after_commit(session, lambda: calls.append('committed'))
+        result = service.record_vote(session, task_id, 'reviewer', VERDICT_REJECT)
+
+    assert result.duplicate and not result.recorded
+    assert calls == ['committed']
+    with service.db.session() as session:
+        assert session.get(Task, other_id) is not None
+    task, votes = _task_and_votes(service, task_id)
+    assert (task.approve_count, task.reject_count, votes) == (1, 0, 1)